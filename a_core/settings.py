@@ -114,6 +114,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # The threaded tests need a file database: the default in-memory test
+        # database fails concurrent writers at once instead of letting them wait.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 # if 'RENDER' in os.environ:
@@ -140,10 +143,55 @@ DATABASES = {
 #     }
 
 
+# Cache
+# Local memory by default; point CACHE_BACKEND at
+# django.core.cache.backends.filebased.FileBasedCache and CACHE_LOCATION at a
+# directory to share the cache between worker processes on one host.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'property-hub'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '10000')),
+        },
+    }
+}
+
+# Seconds a cached dashboard stats entry is kept before it is recomputed.
+DASHBOARD_STATS_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_STATS_CACHE_TIMEOUT', '300'))
+
+# Seconds a response is replayed for a repeated Idempotency-Key header. Use a
+# cache shared by all workers for the keys to deduplicate across processes.
+IDEMPOTENCY_KEY_TIMEOUT = int(os.getenv('IDEMPOTENCY_KEY_TIMEOUT', str(24 * 60 * 60)))
+
+# Days visitor records (and their gate events) are kept before purge_visitors
+# deletes them.
+VISITOR_RETENTION_DAYS = int(os.getenv('VISITOR_RETENTION_DAYS', '365'))
+
+# Pub/sub behind the notification event stream. The in-process broker only
+# reaches clients connected to the same worker; with several workers set
+# EVENT_BROKER=utils.events.RedisEventBroker and EVENT_BROKER_URL.
+EVENT_BROKER = os.getenv('EVENT_BROKER', 'utils.events.InProcessEventBroker')
+EVENT_BROKER_OPTIONS = {'url': os.environ['EVENT_BROKER_URL']} if os.getenv('EVENT_BROKER_URL') else {}
+# Seconds between keep-alive comments on an idle event stream.
+EVENT_STREAM_KEEPALIVE = int(os.getenv('EVENT_STREAM_KEEPALIVE', '15'))
+# Seconds a stream ticket from notifications/stream/ticket/ stays valid. The
+# stream itself is only served by the ASGI application (a_core.asgi).
+EVENT_STREAM_TICKET_MAX_AGE = int(os.getenv('EVENT_STREAM_TICKET_MAX_AGE', '60'))
+
+# With JWT_CLAIMS_AUTHENTICATION=True API requests take the user from the
+# token's claims (a_users.authentication.ClaimsJWTAuthentication) instead of
+# loading it on every request. Deactivations and role changes are checked
+# against a per-process cache kept for JWT_CLAIMS_CACHE_TTL seconds.
+JWT_CLAIMS_AUTHENTICATION = os.getenv('JWT_CLAIMS_AUTHENTICATION', 'False') == 'True'
+JWT_CLAIMS_CACHE_TTL = int(os.getenv('JWT_CLAIMS_CACHE_TTL', '30'))
+
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'a_users.authentication.ClaimsJWTAuthentication' if JWT_CLAIMS_AUTHENTICATION
+        else 'rest_framework_simplejwt.authentication.JWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -0,0 +1,162 @@
+import json
+import math
+import os
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from a_users.models import CustomUser
+from dashboard_stats.models import Notification
+from property.models import Property, Unit
+from tenant.models import Payment, Tenant, VisitEvent, Visitor
+
+# Rows seeded per model for the small run; the large run seeds ten times as many.
+BENCHMARK_N = int(os.getenv('QUERY_BENCHMARK_N', '5'))
+BENCHMARK_REPEATS = int(os.getenv('QUERY_BENCHMARK_REPEATS', '5'))
+# Path to write the timings report to; without it the test only checks the query counts.
+BENCHMARK_OUTPUT = os.getenv('QUERY_BENCHMARK_OUTPUT')
+
+
+def percentile(samples, percent):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryCountBenchmarkTests(TestCase):
+    """
+    Hit every list and detail endpoint with N and with 10N rows seeded, fail
+    when an endpoint's query count grows with the data, and record latency
+    percentiles per endpoint to BENCHMARK_REPORT for comparison between
+    commits.
+    """
+
+    def setUp(self):
+        self.admin = self.create_user('admin', 'admin')
+        self.tenant_user = self.create_user('tenant', 'tenant')
+        self.seeded = 0
+
+    def create_user(self, name, role):
+        return CustomUser.objects.create_user(
+            email=f'{name}@example.com', username=name, password='pass', role=role
+        )
+
+    def seed(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(count):
+                self.seeded += 1
+                number = self.seeded
+                landlord = self.create_user(f'landlord{number}', 'landlord')
+                property_obj = Property.objects.create(name=f'Block {number}', address='Nairobi', owner=landlord)
+                unit = Unit.objects.create(
+                    property=property_obj, unit_number='1', monthly_rent=Decimal('1000.00'), is_occupied=True
+                )
+                tenant = Tenant.objects.create(user=self.create_user(f'tenant{number}', 'tenant'), unit=unit)
+                Payment.objects.create(
+                    tenant=tenant, unit=unit, amount_due=Decimal('1000.00'), amount_paid=Decimal('500.00'),
+                    billing_period=timezone.now().strftime('%Y-%m'),
+                )
+                visitor = Visitor.objects.create(tenant=tenant, unit=unit, visitor_name=f'Guest {number}')
+                VisitEvent.objects.create(
+                    event_id=uuid.uuid4(), visitor=visitor, unit=unit,
+                    event_type=VisitEvent.CHECK_IN, occurred_at=timezone.now(),
+                )
+                notification = Notification.objects.create(message=f'Notice {number}')
+                notification.recipients.set([self.tenant_user, tenant.user])
+
+    def endpoints(self):
+        tenant = Tenant.objects.order_by('id').first()
+        unit = tenant.unit
+        return [
+            ('property-list', self.admin, reverse('property-list-create')),
+            ('property-detail', self.admin, reverse('property-detail', args=[unit.property_id])),
+            ('unit-list', self.admin, reverse('unit-list-create') + '?page_size=100'),
+            ('unit-detail', self.admin, reverse('unit-detail', args=[unit.id])),
+            ('tenant-list', self.admin, reverse('tenant-list-create') + '?page_size=100'),
+            ('tenant-detail', self.admin, reverse('tenant-detail', args=[tenant.id])),
+            ('tenant-balance', self.admin, reverse('tenant-balance', args=[tenant.id])),
+            ('payment-list', self.admin, reverse('payment-list-create') + '?page_size=100'),
+            ('payment-detail', self.admin, reverse('payment-detail', args=[tenant.payments.first().id])),
+            ('visitor-list', self.admin, reverse('visitor-list-create') + '?page_size=100'),
+            ('visitor-detail', self.admin, reverse(
+                'visitor-retrieve-update-destroy', args=[tenant.visitors.first().id]
+            )),
+            ('visit-event-list', self.admin, reverse('visit-event-list-create') + '?page_size=100'),
+            ('auth-payments', self.admin, reverse('get-payments') + '?page_size=100'),
+            ('auth-payments-stream', self.admin, reverse('get-payments') + '?stream=1'),
+            ('auth-user', self.tenant_user, '/api/auth/user/'),
+            ('dashboard-stats', self.admin, reverse('dashboard-stats')),
+            ('dashboard-stats-export', self.admin, reverse('dashboard-stats-export')),
+            ('dashboard-stats-trends', self.admin, reverse('dashboard-stats-trends')),
+            ('notification-list', self.admin, reverse('list-notifications') + '?page_size=100'),
+            ('tenant-notification-list', self.tenant_user, reverse('tenant-list-notifications')),
+            ('tenant-unread-count', self.tenant_user, reverse('tenant-unread-notification-count')),
+        ]
+
+    def request(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        # Measure cold requests; cached responses would hide the queries.
+        cache.clear()
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def measure(self):
+        results = {}
+        for name, user, url in self.endpoints():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.request(user, url)
+            self.assertEqual(response.status_code, 200, f'{name}: {url}')
+            # Read the count now; later requests reset the connection's query log.
+            query_count = len(queries)
+            timings = []
+            for _ in range(BENCHMARK_REPEATS):
+                started = time.perf_counter()
+                self.request(user, url)
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {
+                'queries': query_count,
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p90_ms': round(percentile(timings, 90), 3),
+                'p99_ms': round(percentile(timings, 99), 3),
+                'max_ms': round(max(timings), 3),
+            }
+        return results
+
+    def test_query_counts_do_not_grow_with_data(self):
+        self.seed(BENCHMARK_N)
+        small = self.measure()
+        self.seed(BENCHMARK_N * 9)
+        large = self.measure()
+
+        if BENCHMARK_OUTPUT:
+            report = {
+                'generated_at': timezone.now().isoformat(),
+                'n': BENCHMARK_N,
+                'repeats': BENCHMARK_REPEATS,
+                'endpoints': {
+                    name: {str(BENCHMARK_N): small[name], str(BENCHMARK_N * 10): large[name]}
+                    for name in small
+                },
+            }
+            with open(BENCHMARK_OUTPUT, 'w') as report_file:
+                json.dump(report, report_file, indent=2, sort_keys=True)
+
+        for name in small:
+            with self.subTest(endpoint=name):
+                self.assertEqual(
+                    large[name]['queries'], small[name]['queries'],
+                    f'{name} ran {small[name]["queries"]} queries with {BENCHMARK_N} rows '
+                    f'and {large[name]["queries"]} with {BENCHMARK_N * 10}'
+                )
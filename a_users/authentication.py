@@ -0,0 +1,100 @@
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import CustomUser
+
+# Fields of a user kept in the cache; the rest are loaded on access.
+STATE_FIELDS = ('is_active', 'role', 'username', 'email')
+MAX_CACHED_USERS = 10000
+
+
+class UserStateCache:
+    """
+    Per-process cache of ``user_id -> {is_active, role, username, email}``,
+    or None for a user that no longer exists, kept for JWT_CLAIMS_CACHE_TTL
+    seconds.
+
+    Saving or deleting a CustomUser evicts its entry in this process once
+    the transaction commits (see ``a_users.signals``). Other workers, and
+    bulk ``update()`` calls that send no signals, see the change when the
+    entry expires.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_USERS):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        state = CustomUser.objects.filter(pk=user_id).values(*STATE_FIELDS).first()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {key: value for key, value in self._entries.items() if value[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[user_id] = (now + settings.JWT_CLAIMS_CACHE_TTL, state)
+        return state
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_states = UserStateCache()
+
+
+def claims_user(user_id, state):
+    """
+    A CustomUser built from the token's user id and the cached state without
+    a query. Its other fields are deferred, so reading one (``phone_number``,
+    ``is_staff``...) loads it from the database like any deferred field.
+    """
+    values = {'id': user_id, **state}
+    fields = [field.attname for field in CustomUser._meta.concrete_fields if field.attname in values]
+    return CustomUser.from_db('default', fields, [values[field] for field in fields])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that takes the user from the verified token and
+    :data:`user_states` instead of loading it on every request.
+
+    The token supplies the user id and the role it was issued for; whether
+    the user is still active, their current role, username and email come
+    from the cache, so a warm cache authenticates with no queries and edits
+    show up once the entry is evicted or expires. A deactivated user, or one
+    whose role changed, is refused and has to log in again. Tokens without
+    the ``role`` claim fall back to the database lookup of JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_FIELD != 'id' or 'role' not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            # simplejwt writes the id as a string.
+            user_id = CustomUser._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        state = user_states.get(user_id)
+        if state is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not state['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if state['role'] != validated_token['role']:
+            raise AuthenticationFailed(_('Token role is out of date'), code='token_role_changed')
+        return claims_user(user_id, state)
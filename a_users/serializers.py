@@ -1,8 +1,11 @@
+import json
+
 from django.db import IntegrityError
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import authenticate
 
+from property.models import Unit
 from property.serializers import UnitSerializer
 from tenant.models import Payment, Tenant
 from tenant.serializers import TenantSerializer
@@ -20,21 +23,32 @@ class CustomUserSerializer(serializers.ModelSerializer):
     
     def get_unit(self, obj):
         """Get unit data through tenant relationship with optimized query"""
-        if obj.role == 'tenant':
+        if obj.role != 'tenant':
+            return None
+        if CustomUser.tenant_profile.is_cached(obj):
+            # The queryset selected tenant_profile__unit__property.
             try:
-                tenant = Tenant.objects.select_related('unit__property').get(user=obj)
-                if tenant.unit:
-                    return {
-                        'id': tenant.unit.id,
-                        'unit_number': tenant.unit.unit_number,
-                        'property': {
-                            'id': tenant.unit.property.id,
-                            'name': tenant.unit.property.name
-                        } if tenant.unit.property else None
-                    }
+                unit = obj.tenant_profile.unit
             except Tenant.DoesNotExist:
-                pass
-        return None
+                return None
+            if unit is None:
+                return None
+            return {
+                'id': unit.id,
+                'unit_number': unit.unit_number,
+                'property': {'id': unit.property.id, 'name': unit.property.name},
+            }
+        row = Tenant.objects.filter(user=obj, unit__isnull=False).values(
+            'unit_id', 'unit__unit_number', 'unit__property_id', 'unit__property__name'
+        ).first()
+        if row is None:
+            return None
+        return {
+            'id': row['unit_id'],
+            'unit_number': row['unit__unit_number'],
+            'property': {'id': row['unit__property_id'], 'name': row['unit__property__name']},
+        }
+
     @property
     def tenant_unit(self):
         """Get the unit for tenant users"""
@@ -132,4 +146,90 @@ class PaymentSerializer(serializers.ModelSerializer):
         representation = super().to_representation(instance)
         representation['amount_due'] = float(instance.amount_due) if instance.amount_due is not None else 0.0
         representation['amount_paid'] = float(instance.amount_paid) if instance.amount_paid is not None else 0.0
-        return representation
\ No newline at end of file
+        return representation
+
+
+# Field formatters shared with PaymentSerializer's nested output, so the
+# streaming path renders dates and decimals exactly like the serializer.
+_date = serializers.DateField()
+_datetime = serializers.DateTimeField()
+_decimal = serializers.DecimalField(max_digits=10, decimal_places=2)
+_unit_types = {code: str(label) for code, label in Unit.UNIT_TYPES}
+
+PAYMENT_STREAM_VALUES = [
+    'id', 'amount_due', 'amount_paid', 'billing_period',
+    'tenant_id', 'tenant__user_id', 'tenant__user__email', 'tenant__user__username',
+    'tenant__user__first_name', 'tenant__user__last_name', 'tenant__user__phone_number',
+    'tenant__unit_id', 'tenant__unit__unit_number', 'tenant__unit__property_id',
+    'tenant__unit__property__name', 'tenant__lease_start_date', 'tenant__lease_end_date',
+    'tenant__created_at', 'tenant__updated_at',
+    'unit_id', 'unit__property_id', 'unit__property__name', 'unit__unit_number', 'unit__unit_type',
+    'unit__monthly_rent', 'unit__description', 'unit__is_occupied', 'unit__created_at', 'unit__updated_at',
+]
+
+
+def _optional(field, value):
+    return None if value is None else field.to_representation(value)
+
+
+def payment_row_representation(row):
+    """
+    Render a ``values(*PAYMENT_STREAM_VALUES)`` row in the shape of
+    PaymentSerializer, without building model or serializer instances.
+    """
+    tenant_unit = None
+    if row['tenant__unit_id'] is not None:
+        tenant_unit = {
+            'id': row['tenant__unit_id'],
+            'unit_number': row['tenant__unit__unit_number'],
+            'property': {'id': row['tenant__unit__property_id'], 'name': row['tenant__unit__property__name']},
+        }
+    return {
+        'id': row['id'],
+        'tenant': {
+            'id': row['tenant_id'],
+            'user': {
+                'id': row['tenant__user_id'],
+                'email': row['tenant__user__email'],
+                'username': row['tenant__user__username'],
+                'first_name': row['tenant__user__first_name'],
+                'last_name': row['tenant__user__last_name'],
+                'phone_number': row['tenant__user__phone_number'],
+            },
+            'unit': tenant_unit,
+            'lease_start_date': _optional(_date, row['tenant__lease_start_date']),
+            'lease_end_date': _optional(_date, row['tenant__lease_end_date']),
+            'created_at': _optional(_datetime, row['tenant__created_at']),
+            'updated_at': _optional(_datetime, row['tenant__updated_at']),
+        },
+        'unit': {
+            'id': row['unit_id'],
+            'property': {'id': row['unit__property_id'], 'name': row['unit__property__name']},
+            'unit_number': row['unit__unit_number'],
+            'unit_type': row['unit__unit_type'],
+            'monthly_rent': _optional(_decimal, row['unit__monthly_rent']),
+            'description': row['unit__description'],
+            'is_occupied': row['unit__is_occupied'],
+            'created_at': _optional(_datetime, row['unit__created_at']),
+            'updated_at': _optional(_datetime, row['unit__updated_at']),
+            'unit_type_display': _unit_types.get(row['unit__unit_type'], row['unit__unit_type']),
+        },
+        'amount_due': float(row['amount_due']) if row['amount_due'] is not None else 0.0,
+        'amount_paid': float(row['amount_paid']) if row['amount_paid'] is not None else 0.0,
+        'billing_period': row['billing_period'],
+    }
+
+
+def iter_payments_json(payments, chunk_size=2000):
+    """
+    Yield the payments as one JSON array, a chunk of rows at a time, so
+    memory stays flat however many payments the queryset covers.
+    """
+    rows = payments.values(*PAYMENT_STREAM_VALUES).iterator(chunk_size=chunk_size)
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + json.dumps(payment_row_representation(row))
+        separator = ','
+    yield ']'
+
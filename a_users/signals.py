@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_states
+from .models import CustomUser
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def evict_user_state(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: user_states.evict(user_id))
@@ -1,3 +1,160 @@
-from django.test import TestCase
+import json
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from property.models import Property, Unit
+from tenant.models import Payment, Tenant
+from .authentication import ClaimsJWTAuthentication, user_states
+from .models import CustomUser
+from .serializers import CustomTokenObtainPairSerializer, CustomUserSerializer, PaymentSerializer
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class StreamingPaymentsTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            email='admin@example.com', username='admin', password='pass', role='admin'
+        )
+        property_obj = Property.objects.create(name='Block A', address='Nairobi', owner=self.admin)
+        for number in range(3):
+            unit = Unit.objects.create(
+                property=property_obj, unit_number=str(number), unit_type='1B', monthly_rent=Decimal('1000.00')
+            )
+            user = CustomUser.objects.create_user(
+                email=f'tenant{number}@example.com', username=f'tenant{number}', password='pass'
+            )
+            tenant = Tenant.objects.create(
+                user=user, unit=unit if number else None, lease_start_date=date(2025, 1, 1)
+            )
+            Payment.objects.create(
+                tenant=tenant, unit=unit, amount_due=Decimal('1000.00'),
+                amount_paid=Decimal('250.50'), billing_period='2025-06',
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_stream_matches_serializer_output(self):
+        response = self.client.get(reverse('get-payments'), {'stream': 'true'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response.streaming_content))
+        expected = PaymentSerializer(Payment.objects.order_by('-created_at', '-id'), many=True).data
+        self.assertEqual(streamed, json.loads(json.dumps(expected)))
+
+    def test_stream_is_one_query_per_chunk(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('get-payments'), {'stream': '1'})
+            self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 3)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CustomUserSerializerTests(TestCase):
+    def setUp(self):
+        owner = CustomUser.objects.create_user(email='owner@example.com', username='owner', password='pass')
+        property_obj = Property.objects.create(name='Block A', address='Nairobi', owner=owner)
+        self.unit = Unit.objects.create(property=property_obj, unit_number='1', monthly_rent=Decimal('1000.00'))
+        self.user = CustomUser.objects.create_user(email='tenant@example.com', username='tenant', password='pass')
+        Tenant.objects.create(user=self.user, unit=self.unit)
+        self.expected = {'id': self.unit.id, 'unit_number': '1', 'property': {'id': property_obj.id, 'name': 'Block A'}}
+
+    def test_unit_is_one_query(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(CustomUserSerializer(user).data['unit'], self.expected)
+
+    def test_selected_tenant_profile_is_reused(self):
+        user = CustomUser.objects.select_related('tenant_profile__unit__property').get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(CustomUserSerializer(user).data['unit'], self.expected)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ClaimsJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='tenant@example.com', username='tenant', password='pass', phone_number='0700000000'
+        )
+        user_states.clear()
+        self.addCleanup(user_states.clear)
+        self.authentication = ClaimsJWTAuthentication()
+
+    def authenticate(self, token=None):
+        token = token or CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return self.authentication.authenticate(request)[0]
+
+    def test_login_token_authenticates_from_the_claims(self):
+        response = APIClient().post(reverse('login'), {'identifier': 'tenant', 'password': 'pass'}, format='json')
+
+        user = self.authenticate(response.data['access'])
+        self.assertEqual(
+            (user.pk, user.username, user.email, user.role),
+            (self.user.pk, 'tenant', 'tenant@example.com', 'tenant'),
+        )
+
+    def test_warm_cache_authenticates_without_queries(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual(user, self.user)
+            self.assertTrue(user.is_authenticated)
+            self.assertEqual(user.role, 'tenant')
+
+    def test_username_and_email_changes_are_picked_up(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.authenticate(token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.email = 'renamed@example.com'
+            self.user.username = 'renamed'
+            self.user.save()
+
+        user = self.authenticate(token)
+        self.assertEqual((user.username, user.email), ('renamed', 'renamed@example.com'))
+
+    def test_fields_outside_the_claims_are_loaded_on_access(self):
+        user = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual(user.phone_number, '0700000000')
+
+    def test_deactivated_user_is_refused(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_role_change_revokes_older_tokens(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.authenticate(token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = 'landlord'
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+        self.assertEqual(self.authenticate().role, 'landlord')
+
+    @override_settings(JWT_CLAIMS_CACHE_TTL=0)
+    def test_bulk_updates_apply_once_the_entry_expires(self):
+        self.authenticate()
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_token_without_claims_loads_the_user(self):
+        token = RefreshToken.for_user(self.user).access_token
+
+        with self.assertNumQueries(1):
+            user = self.authenticate(token)
+        self.assertEqual(user.phone_number, '0700000000')
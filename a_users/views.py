@@ -9,12 +9,14 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
 from django.db.models import Sum, Count
+from django.http import StreamingHttpResponse
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from property.serializers import UnitSerializer
+from utils.pagination import CursorOrPagePagination
 from utils.permissions import IsAdminOrPropertyManager
-from .serializers import PaymentSerializer
+from .serializers import PaymentSerializer, iter_payments_json
 import logging
 import decimal
 
@@ -28,7 +30,7 @@ from utils.permissions import IsAdminOrPropertyManager
 @permission_classes([IsAuthenticated])
 def get_user(request):
     # Optimize the query to avoid N+1 problem
-    user = models.CustomUser.objects.select_related().prefetch_related(
+    user = models.CustomUser.objects.select_related(
         'tenant_profile__unit__property'
     ).get(id=request.user.id)
     
@@ -43,16 +45,22 @@ def get_payments(request):
         logger.debug(f"Fetching payments for user {user.email}")
 
         # Filter payments based on user role
-        if user.role == 'admin':
-            payments = Payment.objects.all()
-        else:
-            payments = Payment.objects.filter(
-                models.Q(unit__property__owner=user) | models.Q(unit__property__manager=user)
+        payments = Payment.objects.for_user(user).select_related(
+            'tenant__user', 'tenant__unit__property', 'unit__property'
+        )
+
+        if request.query_params.get('stream') in ('1', 'true'):
+            logger.info(f"Streaming payments for user {user.email}")
+            return StreamingHttpResponse(
+                iter_payments_json(payments.order_by('-created_at', '-id')),
+                content_type='application/json'
             )
 
-        serializer = PaymentSerializer(payments, many=True)
-        logger.info(f"Retrieved {len(serializer.data)} payments for user {user.email}")
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = CursorOrPagePagination()
+        page = paginator.paginate_queryset(payments, request)
+        serializer = PaymentSerializer(page, many=True)
+        logger.info(f"Retrieved {len(page)} payments for user {user.email}")
+        return paginator.get_paginated_response(serializer.data)
     except Exception as e:
         logger.error(f"Error retrieving payments for user {user.email}: {str(e)}")
         return Response(
@@ -71,7 +79,7 @@ def update_unit_rent(request, unit_id):
         unit = Unit.objects.get(id=unit_id)
         
         # Check permissions
-        if user.role != 'admin' and unit.property.owner != user and unit.property.manager != user:
+        if user.role == 'tenant' or not Unit.objects.for_user(user).filter(id=unit.id).exists():
             return Response(
                 {"detail": "You do not have permission to update this unit."},
                 status=status.HTTP_403_FORBIDDEN
@@ -0,0 +1,87 @@
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from property.models import PropertyAccess
+from utils.events import dashboard_channel, publish_events
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'dashboard_stats'
+ADMIN_SCOPE = 'all'
+# Upper bound on how long one recompute may hold the lock before another
+# reader is allowed to try.
+RECOMPUTE_LOCK_TIMEOUT = 30
+
+
+def dashboard_scope(user):
+    return ADMIN_SCOPE if user.role == 'admin' else user.pk
+
+
+def _version_key(scope):
+    return f'{KEY_PREFIX}:version:{scope}'
+
+
+def _entry_key(user):
+    return f'{KEY_PREFIX}:entry:{user.pk}:{user.role}'
+
+
+def _current_version(scope):
+    """
+    Return the version token of a scope. A missing token (never set or
+    evicted) is replaced by a fresh one, so that cached entries can never be
+    mistaken for fresh after an eviction.
+    """
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def get_cached_dashboard_stats(user, compute):
+    """
+    Return the dashboard stats of a user from the cache, calling
+    ``compute(user)`` when the entry is missing or has been invalidated.
+
+    While one request recomputes an invalidated entry, concurrent readers are
+    served the stale value instead of hitting the database as well.
+    """
+    entry_key = _entry_key(user)
+    version = _current_version(dashboard_scope(user))
+    entry = cache.get(entry_key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    lock_key = f'{entry_key}:lock'
+    locked = cache.add(lock_key, True, RECOMPUTE_LOCK_TIMEOUT)
+    if not locked and entry is not None:
+        logger.debug(f"Serving stale dashboard stats for user {user.pk}")
+        return entry[1]
+    try:
+        stats = compute(user)
+        cache.set(entry_key, (version, stats), settings.DASHBOARD_STATS_CACHE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return stats
+
+
+def invalidate_dashboard_stats(user_ids):
+    """Invalidate the entries of the given owners or managers and of every admin."""
+    scopes = {user_id for user_id in user_ids if user_id} | {ADMIN_SCOPE}
+    cache.set_many({_version_key(scope): uuid.uuid4().hex for scope in scopes}, None)
+    publish_events((dashboard_channel(scope), {'type': 'dashboard.invalidated'}) for scope in scopes)
+
+
+def invalidate_property_stats(property_ids, user_ids=()):
+    """Invalidate the entries of everyone who can see the given properties."""
+    user_ids = set(user_ids)
+    if property_ids:
+        user_ids.update(
+            PropertyAccess.objects.filter(property_id__in=property_ids).values_list('user_id', flat=True)
+        )
+    invalidate_dashboard_stats(user_ids)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard_stats.notifications import FANOUT_CHUNK_SIZE, deliver_pending_notifications
+
+
+class Command(BaseCommand):
+    help = 'Fan out queued notifications to their recipients in chunks, repeating every --interval seconds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=FANOUT_CHUNK_SIZE, help='Deliveries per transaction.')
+        parser.add_argument('--interval', type=int, default=5, help='Seconds between runs.')
+        parser.add_argument('--once', action='store_true', help='Run a single pass and exit.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            delivered = deliver_pending_notifications(chunk_size=options['chunk_size'])
+            elapsed = time.monotonic() - started
+            if delivered or options['once']:
+                self.stdout.write(self.style.SUCCESS(f"Delivered {delivered} notifications in {elapsed:.2f}s"))
+            if options['once']:
+                break
+            time.sleep(options['interval'])
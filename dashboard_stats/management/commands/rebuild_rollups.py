@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard_stats.rollups import rebuild_collection_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-property collection rollups from payments and units.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = rebuild_collection_rollups(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} rollups in {elapsed:.2f}s"))
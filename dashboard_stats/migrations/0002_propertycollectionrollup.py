@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:02
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+
+def populate_rollups(apps, schema_editor):
+    """Compute the rollup rows of every property and billing period from the
+    existing payments and units, with the current period for every property."""
+    Property = apps.get_model('property', 'Property')
+    Payment = apps.get_model('tenant', 'Payment')
+    PropertyCollectionRollup = apps.get_model('dashboard_stats', 'PropertyCollectionRollup')
+    period = timezone.now().strftime('%Y-%m')
+    unit_counts = {
+        property_id: (total_units, occupied_units)
+        for property_id, total_units, occupied_units in Property.objects.annotate(
+            total_units=Count('units'),
+            occupied_units=Count('units', filter=Q(units__is_occupied=True)),
+        ).values_list('id', 'total_units', 'occupied_units').iterator()
+    }
+    totals = Payment.objects.values('unit__property_id', 'billing_period').annotate(
+        amount_due=Sum('amount_due'),
+        amount_paid=Sum('amount_paid'),
+        payment_count=Count('id'),
+    ).order_by()
+    current_seen = set()
+
+    def rollups():
+        for row in totals.iterator(chunk_size=1000):
+            property_id = row['unit__property_id']
+            if row['billing_period'] == period:
+                current_seen.add(property_id)
+            total_units, occupied_units = unit_counts.get(property_id, (0, 0))
+            yield PropertyCollectionRollup(
+                property_id=property_id,
+                billing_period=row['billing_period'],
+                total_units=total_units,
+                occupied_units=occupied_units,
+                amount_due=row['amount_due'] or 0,
+                amount_paid=row['amount_paid'] or 0,
+                payment_count=row['payment_count'],
+            )
+        for property_id, (total_units, occupied_units) in unit_counts.items():
+            if property_id not in current_seen:
+                yield PropertyCollectionRollup(
+                    property_id=property_id,
+                    billing_period=period,
+                    total_units=total_units,
+                    occupied_units=occupied_units,
+                )
+
+    # bulk_create builds a list of what it is given, so insert a batch at a time.
+    rows = rollups()
+    while batch := list(islice(rows, 1000)):
+        PropertyCollectionRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_stats', '0001_initial'),
+        ('property', '0001_initial'),
+        ('tenant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyCollectionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('billing_period', models.CharField(max_length=7, verbose_name='billing period')),
+                ('total_units', models.PositiveIntegerField(default=0, verbose_name='total units')),
+                ('occupied_units', models.PositiveIntegerField(default=0, verbose_name='occupied units')),
+                ('amount_due', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='amount due')),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='amount paid')),
+                ('payment_count', models.PositiveIntegerField(default=0, verbose_name='payment count')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collection_rollups', to='property.property', verbose_name='property')),
+            ],
+            options={
+                'verbose_name': 'property collection rollup',
+                'verbose_name_plural': 'property collection rollups',
+                'unique_together': {('property', 'billing_period')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
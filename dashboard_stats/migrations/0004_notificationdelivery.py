@@ -0,0 +1,87 @@
+from itertools import islice
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_recipients(apps, schema_editor):
+    """Move the rows of the old recipients table to NotificationDelivery,
+    carrying each notification's shared read flag over to every recipient."""
+    Notification = apps.get_model('dashboard_stats', 'Notification')
+    NotificationDelivery = apps.get_model('dashboard_stats', 'NotificationDelivery')
+    Recipient = Notification.recipients.through
+    deliveries = (
+        NotificationDelivery(notification_id=notification_id, user_id=user_id, is_read=is_read, created_at=timestamp)
+        for notification_id, user_id, is_read, timestamp in Recipient.objects.values_list(
+            'notification_id', 'customuser_id', 'notification__is_read', 'notification__timestamp'
+        ).iterator(chunk_size=1000)
+    )
+    # bulk_create builds a list of what it is given, so insert a batch at a time.
+    while batch := list(islice(deliveries, 1000)):
+        NotificationDelivery.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_stats', '0003_notification_dashboard_s_timesta_261b2a_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_read', models.BooleanField(default=False, verbose_name='is read')),
+                ('read_at', models.DateTimeField(blank=True, null=True, verbose_name='read at')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created at')),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='dashboard_stats.notification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_deliveries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'notification delivery',
+                'verbose_name_plural': 'notification deliveries',
+                'constraints': [models.UniqueConstraint(fields=('notification', 'user'), name='unique_notification_delivery')],
+                'indexes': [
+                    models.Index(fields=['user', 'is_read', 'created_at'], name='dashboard_s_user_id_845627_idx'),
+                    models.Index(fields=['user', 'created_at', 'id'], name='dashboard_s_user_id_8842c9_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(copy_recipients, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='notification',
+            name='recipients',
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='recipients',
+            field=models.ManyToManyField(related_name='notifications', through='dashboard_stats.NotificationDelivery', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='is_read',
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='audience',
+            field=models.CharField(choices=[('LIST', 'Listed users'), ('ALL_TENANTS', 'All tenants')], default='LIST', max_length=12, verbose_name='audience'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='fanout_pending',
+            field=models.BooleanField(default=False, verbose_name='fan-out pending'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='fanout_cursor',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='fan-out cursor'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['fanout_pending', 'id'], name='dashboard_s_fanout__9a613c_idx'),
+        ),
+    ]
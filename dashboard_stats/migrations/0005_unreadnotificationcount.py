@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_unread(apps, schema_editor):
+    NotificationDelivery = apps.get_model('dashboard_stats', 'NotificationDelivery')
+    UnreadNotificationCount = apps.get_model('dashboard_stats', 'UnreadNotificationCount')
+    UnreadNotificationCount.objects.bulk_create(
+        [
+            UnreadNotificationCount(user_id=user_id, unread=unread)
+            for user_id, unread in NotificationDelivery.objects.filter(is_read=False).values('user_id').annotate(
+                unread=Count('id')
+            ).order_by().values_list('user_id', 'unread').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('a_users', '0001_initial'),
+        ('dashboard_stats', '0004_notificationdelivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadNotificationCount',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_notifications', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+                ('unread', models.IntegerField(default=0, verbose_name='unread')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'unread notification count',
+                'verbose_name_plural': 'unread notification counts',
+            },
+        ),
+        migrations.RunPython(count_unread, migrations.RunPython.noop),
+    ]
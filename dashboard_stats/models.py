@@ -1,11 +1,109 @@
 from django.db import models
+from django.utils import timezone
 from a_users.models import CustomUser
+from property.models import Property
+from django.utils.translation import gettext_lazy as _
 # Create your models here.
 class Notification(models.Model):
-    is_read = models.BooleanField(default=False)
+    LIST = 'LIST'
+    ALL_TENANTS = 'ALL_TENANTS'
+    AUDIENCES = (
+        (LIST, _('Listed users')),
+        (ALL_TENANTS, _('All tenants')),
+    )
+
     message = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
-    recipients = models.ManyToManyField(CustomUser, related_name='notifications')
+    recipients = models.ManyToManyField(CustomUser, through='NotificationDelivery', related_name='notifications')
+    audience = models.CharField(_('audience'), max_length=12, choices=AUDIENCES, default=LIST)
+    # Fan-out to an audience is done in the background by deliver_notifications,
+    # which delivers to users in id order and records the last id it reached.
+    fanout_pending = models.BooleanField(_('fan-out pending'), default=False)
+    fanout_cursor = models.PositiveBigIntegerField(_('fan-out cursor'), default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['fanout_pending', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Notification: {self.message[:50]}"
+
+
+class NotificationDelivery(models.Model):
+    """
+    One recipient of a notification and their read state. ``created_at``
+    repeats the notification's timestamp so that a user's inbox, read or
+    unread, is an index range on this table alone.
+    """
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='deliveries')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='notification_deliveries')
+    is_read = models.BooleanField(_('is read'), default=False)
+    read_at = models.DateTimeField(_('read at'), null=True, blank=True)
+    created_at = models.DateTimeField(_('created at'), default=timezone.now)
+
+    class Meta:
+        verbose_name = _('notification delivery')
+        verbose_name_plural = _('notification deliveries')
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'user'], name='unique_notification_delivery'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'is_read', 'created_at']),
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Notification {self.notification_id} to user {self.user_id}"
+
+
+class UnreadNotificationCount(models.Model):
+    """Number of unread deliveries of a user, kept in step with NotificationDelivery."""
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='unread_notifications',
+        verbose_name=_('user')
+    )
+    unread = models.IntegerField(_('unread'), default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('unread notification count')
+        verbose_name_plural = _('unread notification counts')
+
+    def __str__(self):
+        return f"{self.unread} unread for user {self.user_id}"
+
+
+class PropertyCollectionRollup(models.Model):
+    """
+    Per-property, per-billing-period totals kept in sync with Payment, Unit
+    and Tenant writes (see dashboard_stats.rollups).
+
+    Unit counts are a snapshot taken while the period was current; the row
+    for the latest period of a property always holds its current counts.
+    """
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='collection_rollups',
+        verbose_name=_('property')
+    )
+    billing_period = models.CharField(_('billing period'), max_length=7)
+    total_units = models.PositiveIntegerField(_('total units'), default=0)
+    occupied_units = models.PositiveIntegerField(_('occupied units'), default=0)
+    amount_due = models.DecimalField(_('amount due'), max_digits=14, decimal_places=2, default=0)
+    amount_paid = models.DecimalField(_('amount paid'), max_digits=14, decimal_places=2, default=0)
+    payment_count = models.PositiveIntegerField(_('payment count'), default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('property collection rollup')
+        verbose_name_plural = _('property collection rollups')
+        unique_together = ('property', 'billing_period')
 
     def __str__(self):
-        return f"Notification: {self.message[:50]}"
\ No newline at end of file
+        return f"{self.property_id} - {self.billing_period}"
@@ -0,0 +1,145 @@
+import logging
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from a_users.models import CustomUser
+from utils.events import publish_events, user_channel
+from .models import Notification, NotificationDelivery, UnreadNotificationCount
+
+logger = logging.getLogger(__name__)
+
+FANOUT_CHUNK_SIZE = 1000
+ALL_TENANTS = 'all_tenants'
+
+
+def adjust_unread_counts(deltas):
+    """
+    Move users' unread counters by ``{user_id: delta}``. Counters are created
+    on first use, and users with the same delta share one UPDATE, so a
+    fan-out chunk costs two queries. Must run in the transaction that
+    changes the deliveries.
+    """
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(user_id)
+    if not by_delta:
+        return
+    UnreadNotificationCount.objects.bulk_create(
+        [UnreadNotificationCount(user_id=user_id) for user_ids in by_delta.values() for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+    now = timezone.now()
+    for delta, user_ids in by_delta.items():
+        UnreadNotificationCount.objects.filter(user_id__in=user_ids).update(
+            unread=F('unread') + delta, updated_at=now
+        )
+
+
+def record_deliveries(deliveries):
+    """Insert new NotificationDelivery rows, count them as unread and push them to connected clients."""
+    NotificationDelivery.objects.bulk_create(deliveries, batch_size=FANOUT_CHUNK_SIZE)
+    deltas = Counter(delivery.user_id for delivery in deliveries if not delivery.is_read)
+    adjust_unread_counts(deltas)
+    publish_events(
+        (user_channel(delivery.user_id), {
+            'type': 'notification',
+            'id': delivery.notification_id,
+            'message': delivery.notification.message,
+            'timestamp': delivery.created_at,
+        })
+        for delivery in deliveries
+    )
+    return len(deliveries)
+
+
+def _deliver(notification, user_ids):
+    return record_deliveries([
+        NotificationDelivery(notification=notification, user_id=user_id, created_at=notification.timestamp)
+        for user_id in user_ids
+    ])
+
+
+def create_notification(message, recipients=None):
+    """
+    Create a notification for a list of tenant user ids, or for every tenant
+    with ``recipients='all_tenants'``.
+
+    A list is delivered right away. Every tenant is too many rows for a
+    request, so that audience is only queued: the notification is stored
+    with ``fanout_pending`` set and :func:`deliver_pending_notifications`
+    inserts the deliveries in chunks from a worker.
+    """
+    with transaction.atomic():
+        if recipients == ALL_TENANTS:
+            return Notification.objects.create(
+                message=message, audience=Notification.ALL_TENANTS, fanout_pending=True
+            )
+        notification = Notification.objects.create(message=message)
+        if recipients:
+            _deliver(notification, list(CustomUser.objects.filter(id__in=recipients, role='tenant').values_list(
+                'id', flat=True
+            )))
+    return notification
+
+
+def fan_out_chunk(notification_id, chunk_size=FANOUT_CHUNK_SIZE):
+    """
+    Deliver a queued notification to the next ``chunk_size`` tenants, in user
+    id order after the notification's cursor, in one short transaction.
+    Tenants who joined after the notification was sent are left out.
+    Returns the number of deliveries inserted, or None once the fan-out has
+    finished.
+    """
+    with transaction.atomic():
+        notification = Notification.objects.select_for_update().filter(
+            pk=notification_id, fanout_pending=True
+        ).first()
+        if notification is None:
+            return None
+        user_ids = list(CustomUser.objects.filter(
+            role='tenant', id__gt=notification.fanout_cursor, date_joined__lte=notification.timestamp
+        ).order_by('id').values_list('id', flat=True)[:chunk_size])
+        _deliver(notification, user_ids)
+        if user_ids:
+            notification.fanout_cursor = user_ids[-1]
+        notification.fanout_pending = len(user_ids) == chunk_size
+        notification.save(update_fields=['fanout_cursor', 'fanout_pending'])
+    return len(user_ids)
+
+
+def deliver_pending_notifications(chunk_size=FANOUT_CHUNK_SIZE):
+    """Finish the fan-out of every queued notification and return the deliveries made."""
+    delivered = 0
+    for notification_id in Notification.objects.filter(fanout_pending=True).order_by('id').values_list(
+        'id', flat=True
+    ):
+        while (count := fan_out_chunk(notification_id, chunk_size)) is not None:
+            delivered += count
+        logger.info(f"Finished the fan-out of notification {notification_id}")
+    return delivered
+
+
+def mark_notifications_read(user, notification_ids=None, before=None):
+    """
+    Mark the user's unread deliveries read with one UPDATE: those of
+    ``notification_ids``, or every one sent at or before ``before``, or all
+    of them. The unread counter drops by the number of rows changed.
+    Returns that number.
+    """
+    deliveries = NotificationDelivery.objects.filter(user=user, is_read=False)
+    if notification_ids is not None:
+        deliveries = deliveries.filter(notification_id__in=notification_ids)
+    if before is not None:
+        deliveries = deliveries.filter(created_at__lte=before)
+    with transaction.atomic():
+        marked = deliveries.update(is_read=True, read_at=timezone.now())
+        adjust_unread_counts({user.pk: -marked})
+    return marked
+
+
+def get_unread_count(user):
+    return UnreadNotificationCount.objects.filter(user=user).values_list('unread', flat=True).first() or 0
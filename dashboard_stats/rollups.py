@@ -0,0 +1,199 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from property.models import Property, Unit
+from tenant.models import Payment
+from .cache import invalidate_property_stats
+from .models import PropertyCollectionRollup
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_FIELDS = ['amount_due', 'amount_paid', 'payment_count', 'updated_at']
+UNIT_FIELDS = ['total_units', 'occupied_units', 'updated_at']
+
+
+def current_billing_period():
+    return timezone.now().strftime('%Y-%m')
+
+
+def _unit_counts(property_ids):
+    """Map property id -> (total_units, occupied_units) for existing properties."""
+    rows = Property.objects.filter(id__in=property_ids).annotate(
+        total_units=Count('units'),
+        occupied_units=Count('units', filter=Q(units__is_occupied=True)),
+    ).values_list('id', 'total_units', 'occupied_units')
+    return {property_id: (total, occupied) for property_id, total, occupied in rows}
+
+
+def refresh_collection_rollups(keys):
+    """
+    Recompute the payment totals of the given (property_id, billing_period)
+    keys with one grouped query and upsert them.
+
+    Rows created here take the property's current unit counts; existing rows
+    keep their unit snapshot.
+    """
+    keys = {(property_id, period) for property_id, period in keys if property_id and period}
+    if not keys:
+        return 0
+    unit_counts = _unit_counts({property_id for property_id, _ in keys})
+    keys = {key for key in keys if key[0] in unit_counts}
+    if not keys:
+        return 0
+
+    totals = Payment.objects.filter(
+        unit__property_id__in={property_id for property_id, _ in keys},
+        billing_period__in={period for _, period in keys},
+    ).values('unit__property_id', 'billing_period').annotate(
+        amount_due=Sum('amount_due'),
+        amount_paid=Sum('amount_paid'),
+        payment_count=Count('id'),
+    ).order_by()
+    totals = {(row['unit__property_id'], row['billing_period']): row for row in totals}
+
+    rollups = []
+    for property_id, period in keys:
+        row = totals.get((property_id, period), {})
+        total_units, occupied_units = unit_counts[property_id]
+        rollups.append(PropertyCollectionRollup(
+            property_id=property_id,
+            billing_period=period,
+            total_units=total_units,
+            occupied_units=occupied_units,
+            amount_due=row.get('amount_due') or 0,
+            amount_paid=row.get('amount_paid') or 0,
+            payment_count=row.get('payment_count') or 0,
+        ))
+    PropertyCollectionRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=['property', 'billing_period'],
+        update_fields=PAYMENT_FIELDS,
+    )
+    return len(rollups)
+
+
+def refresh_unit_rollups(property_ids):
+    """
+    Write the current unit counts of the given properties to their rows for
+    the current and any later billing period, creating the current row if
+    it does not exist yet.
+    """
+    property_ids = {property_id for property_id in property_ids if property_id}
+    if not property_ids:
+        return 0
+    unit_counts = _unit_counts(property_ids)
+    period = current_billing_period()
+    PropertyCollectionRollup.objects.bulk_create(
+        [
+            PropertyCollectionRollup(
+                property_id=property_id,
+                billing_period=period,
+                total_units=total_units,
+                occupied_units=occupied_units,
+            )
+            for property_id, (total_units, occupied_units) in unit_counts.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['property', 'billing_period'],
+        update_fields=UNIT_FIELDS,
+    )
+    units = Unit.objects.filter(property=OuterRef('property')).order_by().values('property')
+    return PropertyCollectionRollup.objects.filter(
+        property_id__in=unit_counts, billing_period__gt=period
+    ).update(
+        total_units=Coalesce(Subquery(units.annotate(c=Count('id')).values('c')), 0),
+        occupied_units=Coalesce(
+            Subquery(units.filter(is_occupied=True).annotate(c=Count('id')).values('c')), 0
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def schedule_collection_refresh(keys=(), property_ids=()):
+    """
+    Refresh the rollups once the surrounding transaction commits, so that
+    cascaded deletes and rolled-back writes never leave rows behind, then
+    invalidate the cached dashboard stats of the affected owners.
+    """
+    keys = set(keys)
+    property_ids = set(property_ids)
+
+    def refresh():
+        refresh_collection_rollups(keys)
+        refresh_unit_rollups(property_ids)
+        invalidate_property_stats(property_ids | {property_id for property_id, _ in keys})
+
+    transaction.on_commit(refresh)
+
+
+def annotate_collection_totals(properties):
+    """
+    Annotate a Property queryset with its unit counts and payment totals read
+    from the rollup table, so the cost depends on the number of properties
+    rather than on the number of payments.
+    """
+    rollups = PropertyCollectionRollup.objects.filter(property=OuterRef('pk'))
+    latest = rollups.order_by('-billing_period')
+    totals = rollups.order_by().values('property')
+    return properties.annotate(
+        total_units=Coalesce(Subquery(latest.values('total_units')[:1]), 0),
+        occupied_units=Coalesce(Subquery(latest.values('occupied_units')[:1]), 0),
+        amount_due=Subquery(totals.annotate(total=Sum('amount_due')).values('total')),
+        amount_paid=Subquery(totals.annotate(total=Sum('amount_paid')).values('total')),
+        payment_count=Coalesce(
+            Subquery(totals.annotate(total=Sum('payment_count')).values('total')), 0
+        ),
+    )
+
+
+def rebuild_collection_rollups(batch_size=1000):
+    """Recompute the whole rollup table from Payment and Unit in bulk."""
+    period = current_billing_period()
+    with transaction.atomic():
+        PropertyCollectionRollup.objects.all().delete()
+        unit_counts = _unit_counts(Property.objects.values('id'))
+        totals = Payment.objects.values('unit__property_id', 'billing_period').annotate(
+            amount_due=Sum('amount_due'),
+            amount_paid=Sum('amount_paid'),
+            payment_count=Count('id'),
+        ).order_by()
+
+        created = 0
+        batch = []
+        current_seen = set()
+        for row in totals.iterator(chunk_size=batch_size):
+            property_id = row['unit__property_id']
+            total_units, occupied_units = unit_counts.get(property_id, (0, 0))
+            if row['billing_period'] == period:
+                current_seen.add(property_id)
+            batch.append(PropertyCollectionRollup(
+                property_id=property_id,
+                billing_period=row['billing_period'],
+                total_units=total_units,
+                occupied_units=occupied_units,
+                amount_due=row['amount_due'] or 0,
+                amount_paid=row['amount_paid'] or 0,
+                payment_count=row['payment_count'],
+            ))
+            if len(batch) >= batch_size:
+                PropertyCollectionRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+
+        for property_id, (total_units, occupied_units) in unit_counts.items():
+            if property_id not in current_seen:
+                batch.append(PropertyCollectionRollup(
+                    property_id=property_id,
+                    billing_period=period,
+                    total_units=total_units,
+                    occupied_units=occupied_units,
+                ))
+        PropertyCollectionRollup.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+    logger.info(f"Rebuilt {created} property collection rollups")
+    return created
@@ -4,7 +4,9 @@ from a_users.serializers import CustomUserSerializer
 
 
 from rest_framework import serializers
-from .models import Notification
+from .models import Notification, NotificationDelivery
+from .rollups import current_billing_period
+from .services import shift_billing_period
 from a_users.models import CustomUser
 
 class PropertyCollectionStatsSerializer(serializers.Serializer):
@@ -41,10 +43,55 @@ class NotificationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Notification
-        fields = ['id', 'message', 'recipients', 'timestamp', 'is_read', ]
-        read_only_fields = ['timestamp', 'is_read']
-class NotificationMarkReadSerializer(serializers.ModelSerializer):
+        fields = ['id', 'message', 'recipients', 'timestamp', 'audience', 'fanout_pending']
+        read_only_fields = ['timestamp', 'audience', 'fanout_pending']
+
+
+class TenantNotificationSerializer(serializers.ModelSerializer):
+    """A notification as its recipient sees it, with their own read state."""
+    id = serializers.IntegerField(source='notification_id', read_only=True)
+    message = serializers.CharField(source='notification.message', read_only=True)
+    timestamp = serializers.DateTimeField(source='created_at', read_only=True)
+
     class Meta:
-        model = Notification
-        fields = ['id', 'message', 'recipients', 'timestamp', 'is_read']
-        read_only_fields = ['id', 'message', 'recipients', 'timestamp']
+        model = NotificationDelivery
+        fields = ['id', 'message', 'timestamp', 'is_read', 'read_at']
+        read_only_fields = fields
+
+
+class NotificationMarkReadSerializer(serializers.Serializer):
+    """Which of the user's notifications to mark read: ``ids``, or all sent up to ``before``."""
+    MAX_IDS = 1000
+
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=MAX_IDS)
+    before = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if 'ids' not in data and 'before' not in data:
+            raise serializers.ValidationError("Give either 'ids' or 'before'.")
+        return data
+
+
+class CollectionTrendQuerySerializer(serializers.Serializer):
+    MAX_PERIODS = 120
+
+    start = serializers.RegexField(r'^\d{4}-(0[1-9]|1[0-2])$', required=False)
+    end = serializers.RegexField(r'^\d{4}-(0[1-9]|1[0-2])$', required=False)
+    property = serializers.CharField(required=False)
+
+    def validate_property(self, value):
+        try:
+            return [int(property_id) for property_id in value.split(',') if property_id.strip()]
+        except ValueError:
+            raise serializers.ValidationError("Property must be a comma-separated list of IDs.")
+
+    def validate(self, data):
+        data.setdefault('end', current_billing_period())
+        data.setdefault('start', shift_billing_period(data['end'], -23))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError({"start": "Start must not be after end."})
+        if shift_billing_period(data['start'], self.MAX_PERIODS - 1) < data['end']:
+            raise serializers.ValidationError(
+                {"start": f"The range cannot span more than {self.MAX_PERIODS} billing periods."}
+            )
+        return data
@@ -0,0 +1,177 @@
+import decimal
+import logging
+
+from property.models import Property
+from .models import PropertyCollectionRollup
+from .rollups import annotate_collection_totals
+
+logger = logging.getLogger(__name__)
+
+
+def get_scoped_properties(user):
+    """Return every property (active or not) whose stats the user may see."""
+    return Property.objects.for_user(user)
+
+
+def _percentage(part, whole):
+    return (part / whole * 100) if whole > 0 else 0.0
+
+
+COLLECTION_STATS_FIELDS = [
+    'property_id', 'property_name', 'total_units', 'occupied_units', 'amount_due',
+    'amount_paid', 'balance', 'collection_percentage', 'payment_count',
+]
+
+
+def _collection_rows(properties):
+    return annotate_collection_totals(properties).values(
+        'id', 'name', 'is_active', 'total_units', 'occupied_units',
+        'amount_due', 'amount_paid', 'payment_count',
+    ).order_by('id')
+
+
+def _property_collection_stats(row):
+    amount_due = decimal.Decimal(str(row['amount_due'] or 0))
+    amount_paid = decimal.Decimal(str(row['amount_paid'] or 0))
+    return {
+        'property_id': row['id'],
+        'property_name': row['name'],
+        'total_units': row['total_units'],
+        'occupied_units': row['occupied_units'],
+        'amount_due': float(amount_due),
+        'amount_paid': float(amount_paid),
+        'balance': float(amount_due - amount_paid),
+        'collection_percentage': round(float(_percentage(amount_paid, amount_due)), 1),
+        'payment_count': row['payment_count'],
+    }
+
+
+def iter_property_collection_stats(user, chunk_size=1000):
+    """
+    Yield the collection stats of every active property in scope one at a
+    time, reading the rows through a server-side cursor where supported.
+    """
+    properties = get_scoped_properties(user).filter(is_active=True)
+    for row in _collection_rows(properties).iterator(chunk_size=chunk_size):
+        yield _property_collection_stats(row)
+
+
+def get_dashboard_stats(user):
+    """
+    Build the dashboard stats payload from the collection rollups.
+
+    One query reads the per-property totals; portfolio totals are summed from
+    those rows in Python, so the cost depends on the number of properties and
+    not on how many payments exist.
+    """
+    properties = get_scoped_properties(user)
+    property_rows = _collection_rows(properties)
+
+    total_properties = 0
+    total_units = 0
+    occupied_units = 0
+    total_payments = 0
+    total_amount_due = decimal.Decimal('0')
+    total_amount_paid = decimal.Decimal('0')
+    property_collection_stats = []
+
+    for row in property_rows:
+        property_amount_due = decimal.Decimal(str(row['amount_due'] or 0))
+        property_amount_paid = decimal.Decimal(str(row['amount_paid'] or 0))
+        property_payment_count = row['payment_count']
+
+        # Portfolio totals cover every unit and payment in scope, including
+        # those of inactive properties; only active ones are listed below.
+        total_units += row['total_units']
+        occupied_units += row['occupied_units']
+        total_payments += property_payment_count
+        total_amount_due += property_amount_due
+        total_amount_paid += property_amount_paid
+
+        if not row['is_active']:
+            continue
+        total_properties += 1
+        property_collection_stats.append(_property_collection_stats(row))
+
+    non_occupied_units = total_units - occupied_units
+    occupancy_percentage = _percentage(occupied_units, total_units)
+    collection_percentage = _percentage(total_amount_paid, total_amount_due)
+    logger.debug(
+        f"Dashboard stats for user {user.email}: properties={total_properties}, "
+        f"units={total_units}, payments={total_payments}"
+    )
+
+    return {
+        'total_properties': total_properties,
+        'total_units': total_units,
+        'occupied_units': occupied_units,
+        'non_occupied_units': non_occupied_units,
+        'occupancy_percentage': round(occupancy_percentage, 1),
+        'total_payments': total_payments,
+        'total_amount_due': float(total_amount_due),
+        'total_amount_paid': float(total_amount_paid),
+        'total_balance': float(total_amount_due - total_amount_paid),
+        'collection_percentage': round(collection_percentage, 1),
+        'property_collection_stats': property_collection_stats,
+    }
+
+
+def shift_billing_period(period, months):
+    year, month = map(int, period.split('-'))
+    index = year * 12 + (month - 1) + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def billing_periods_between(start, end):
+    periods = []
+    period = start
+    while period <= end:
+        periods.append(period)
+        period = shift_billing_period(period, 1)
+    return periods
+
+
+def get_collection_trends(user, start, end, property_ids=None):
+    """
+    Return month-by-month collection curves per property as parallel arrays
+    aligned on a shared ``periods`` axis, read in one ordered scan of the
+    collection rollups.
+
+    Months without a rollup row report zero amounts and a null occupancy;
+    properties without any row in the range are left out.
+    """
+    periods = billing_periods_between(start, end)
+    position = {period: index for index, period in enumerate(periods)}
+
+    properties = get_scoped_properties(user).filter(is_active=True)
+    if property_ids:
+        properties = properties.filter(id__in=property_ids)
+    rows = PropertyCollectionRollup.objects.filter(
+        property__in=properties, billing_period__gte=start, billing_period__lte=end
+    ).order_by('property_id', 'billing_period').values_list(
+        'property_id', 'property__name', 'billing_period', 'amount_due',
+        'amount_paid', 'total_units', 'occupied_units',
+    )
+
+    series = []
+    current = None
+    for property_id, name, period, amount_due, amount_paid, total_units, occupied_units in rows:
+        if current is None or current['property_id'] != property_id:
+            current = {
+                'property_id': property_id,
+                'property_name': name,
+                'amount_due': [0.0] * len(periods),
+                'amount_paid': [0.0] * len(periods),
+                'collection_percentage': [0.0] * len(periods),
+                'occupancy_percentage': [None] * len(periods),
+            }
+            series.append(current)
+        index = position.get(period)
+        if index is None:
+            continue
+        current['amount_due'][index] = float(amount_due)
+        current['amount_paid'][index] = float(amount_paid)
+        current['collection_percentage'][index] = round(float(_percentage(amount_paid, amount_due)), 1)
+        current['occupancy_percentage'][index] = round(_percentage(occupied_units, total_units), 1)
+
+    return {'periods': periods, 'properties': series}
@@ -0,0 +1,113 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from property.models import Property, Unit
+from tenant.models import Payment, Tenant
+from .cache import invalidate_dashboard_stats
+from .models import Notification
+from .notifications import adjust_unread_counts
+from .rollups import schedule_collection_refresh
+
+
+def _unit_property_id(unit_id):
+    if not unit_id:
+        return None
+    return Unit.objects.filter(pk=unit_id).values_list('property_id', flat=True).first()
+
+
+def _payment_rollup_key(payment):
+    if Payment.unit.is_cached(payment):
+        return (payment.unit.property_id, payment.billing_period)
+    return (_unit_property_id(payment.unit_id), payment.billing_period)
+
+
+@receiver(pre_save, sender=Payment)
+def remember_payment_rollup_key(sender, instance, **kwargs):
+    instance._previous_rollup_key = None
+    if instance.pk:
+        instance._previous_rollup_key = Payment.objects.filter(pk=instance.pk).values_list(
+            'unit__property_id', 'billing_period'
+        ).first()
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def refresh_payment_rollups(sender, instance, **kwargs):
+    keys = {_payment_rollup_key(instance)}
+    previous_key = getattr(instance, '_previous_rollup_key', None)
+    if previous_key:
+        keys.add(previous_key)
+    schedule_collection_refresh(keys=keys)
+
+
+@receiver(pre_save, sender=Unit)
+def remember_unit_property(sender, instance, **kwargs):
+    instance._previous_property_id = None
+    if instance.pk:
+        instance._previous_property_id = _unit_property_id(instance.pk)
+
+
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+def refresh_unit_rollups(sender, instance, **kwargs):
+    property_ids = {instance.property_id}
+    keys = set()
+    previous_property_id = getattr(instance, '_previous_property_id', None)
+    if previous_property_id and previous_property_id != instance.property_id:
+        # The unit's payments moved with it, so both properties need new totals.
+        property_ids.add(previous_property_id)
+        periods = set(Payment.objects.filter(unit=instance).values_list('billing_period', flat=True))
+        keys = {(property_id, period) for property_id in property_ids for period in periods}
+    schedule_collection_refresh(keys=keys, property_ids=property_ids)
+
+
+@receiver(pre_save, sender=Tenant)
+def remember_tenant_unit(sender, instance, **kwargs):
+    instance._previous_unit_id = None
+    if instance.pk:
+        instance._previous_unit_id = Tenant.objects.filter(pk=instance.pk).values_list(
+            'unit_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def refresh_tenant_rollups(sender, instance, **kwargs):
+    # Occupancy follows tenant assignment, so refresh the unit counts of the
+    # tenant's current and previous property.
+    unit_ids = {instance.unit_id, getattr(instance, '_previous_unit_id', None)} - {None}
+    if unit_ids:
+        property_ids = Unit.objects.filter(pk__in=unit_ids).values_list('property_id', flat=True)
+        schedule_collection_refresh(property_ids=set(property_ids))
+
+
+@receiver(pre_save, sender=Property)
+def remember_property_assignment(sender, instance, **kwargs):
+    instance._previous_user_ids = ()
+    if instance.pk:
+        instance._previous_user_ids = Property.objects.filter(pk=instance.pk).values_list(
+            'owner_id', 'manager_id'
+        ).first() or ()
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_assignment_stats(sender, instance, **kwargs):
+    user_ids = {instance.owner_id, instance.manager_id, *getattr(instance, '_previous_user_ids', ())}
+    transaction.on_commit(partial(invalidate_dashboard_stats, user_ids))
+
+
+@receiver(pre_delete, sender=Notification)
+def discount_unread_deliveries(sender, instance, **kwargs):
+    # The deliveries go with the notification, so their recipients' unread
+    # counters must drop by as many.
+    adjust_unread_counts({
+        user_id: -unread
+        for user_id, unread in instance.deliveries.filter(is_read=False).values('user_id').annotate(
+            unread=Count('id')
+        ).order_by().values_list('user_id', 'unread')
+    })
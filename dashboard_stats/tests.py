@@ -1,3 +1,488 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from a_users.models import CustomUser
+from property.models import Property, Unit
+from tenant.models import Payment, Tenant
+from utils.events import InProcessEventBroker, RedisEventBroker, get_event_broker
+from .cache import get_cached_dashboard_stats, invalidate_dashboard_stats
+from .models import Notification, NotificationDelivery, PropertyCollectionRollup, UnreadNotificationCount
+from .notifications import create_notification, deliver_pending_notifications
+from .services import COLLECTION_STATS_FIELDS
+from .views import STREAM_TICKET_SALT, _event_stream, issue_stream_ticket
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class DashboardTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create_user(
+            email='admin@example.com', username='admin', password='pass', role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('dashboard-stats')
+        self.tenant_count = 0
+
+    def create_property(self, units=2, occupied=1, rent=Decimal('1000.00'), is_active=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self._create_property(units, occupied, rent, is_active)
+
+    def _create_property(self, units, occupied, rent, is_active):
+        property_obj = Property.objects.create(
+            name=f'Property {Property.objects.count() + 1}',
+            address='Nairobi',
+            owner=self.admin,
+            is_active=is_active,
+        )
+        for index in range(units):
+            unit = Unit.objects.create(
+                property=property_obj,
+                unit_number=str(index + 1),
+                monthly_rent=rent,
+                is_occupied=index < occupied,
+            )
+            if index < occupied:
+                self.tenant_count += 1
+                user = CustomUser.objects.create_user(
+                    email=f'tenant{self.tenant_count}@example.com',
+                    username=f'tenant{self.tenant_count}',
+                    password='pass',
+                )
+                tenant = Tenant.objects.create(user=user, unit=unit)
+                Payment.objects.create(
+                    tenant=tenant, unit=unit, amount_due=rent,
+                    amount_paid=rent / 2, billing_period='2025-05',
+                )
+        return property_obj
+
+    def get_stats(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+
+class DashboardStatsViewTests(DashboardTestCase):
+    def test_stats_are_aggregated_per_property(self):
+        first = self.create_property(units=3, occupied=2)
+        self.create_property(units=1, occupied=0)
+        self.create_property(units=2, occupied=1, is_active=False)
+
+        data, _ = self.get_stats()
+
+        self.assertEqual(data['total_properties'], 2)
+        self.assertEqual(data['total_units'], 6)
+        self.assertEqual(data['occupied_units'], 3)
+        self.assertEqual(data['non_occupied_units'], 3)
+        self.assertEqual(data['total_payments'], 3)
+        self.assertEqual(data['total_amount_due'], 3000.0)
+        self.assertEqual(data['total_amount_paid'], 1500.0)
+        self.assertEqual(data['collection_percentage'], 50.0)
+        self.assertEqual(len(data['property_collection_stats']), 2)
+        first_stats = data['property_collection_stats'][0]
+        self.assertEqual(first_stats['property_id'], first.id)
+        self.assertEqual(first_stats['total_units'], 3)
+        self.assertEqual(first_stats['occupied_units'], 2)
+        self.assertEqual(first_stats['amount_due'], 2000.0)
+        self.assertEqual(first_stats['balance'], 1000.0)
+        self.assertEqual(first_stats['payment_count'], 2)
+
+    def test_query_count_does_not_grow_with_properties(self):
+        for _ in range(2):
+            self.create_property()
+        _, small_count = self.get_stats()
+
+        for _ in range(10):
+            self.create_property()
+        data, large_count = self.get_stats()
+
+        self.assertEqual(len(data['property_collection_stats']), 12)
+        self.assertEqual(small_count, large_count)
+
+
+class PropertyCollectionRollupTests(DashboardTestCase):
+    def rollup_values(self):
+        return list(PropertyCollectionRollup.objects.order_by('property_id', 'billing_period').values_list(
+            'property_id', 'billing_period', 'total_units', 'occupied_units',
+            'amount_due', 'amount_paid', 'payment_count',
+        ))
+
+    def test_payment_writes_update_rollup(self):
+        property_obj = self.create_property(units=2, occupied=1)
+        payment = Payment.objects.get(unit__property=property_obj)
+        rollup = PropertyCollectionRollup.objects.get(property=property_obj, billing_period='2025-05')
+        self.assertEqual((rollup.amount_due, rollup.amount_paid, rollup.payment_count),
+                         (Decimal('1000.00'), Decimal('500.00'), 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.amount_paid = Decimal('1000.00')
+            payment.billing_period = '2025-06'
+            payment.save()
+        rollup.refresh_from_db()
+        self.assertEqual(rollup.payment_count, 0)
+        moved = PropertyCollectionRollup.objects.get(property=property_obj, billing_period='2025-06')
+        self.assertEqual((moved.amount_paid, moved.payment_count), (Decimal('1000.00'), 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.delete()
+        moved.refresh_from_db()
+        self.assertEqual(moved.payment_count, 0)
+
+    def test_unit_writes_update_current_counts(self):
+        property_obj = self.create_property(units=2, occupied=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Unit.objects.create(property=property_obj, unit_number='99', is_occupied=True)
+        data, _ = self.get_stats()
+        self.assertEqual(data['total_units'], 3)
+        self.assertEqual(data['occupied_units'], 2)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        self.create_property(units=3, occupied=2)
+        self.create_property(units=1, occupied=0)
+        incremental = self.rollup_values()
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(self.rollup_values(), incremental)
+
+    def test_deleting_property_removes_rollups(self):
+        property_obj = self.create_property()
+        with self.captureOnCommitCallbacks(execute=True):
+            property_obj.delete()
+        self.assertFalse(PropertyCollectionRollup.objects.exists())
+
+
+class DashboardStatsCacheTests(DashboardTestCase):
+    def test_cached_stats_skip_the_database(self):
+        self.create_property()
+        first, _ = self.get_stats()
+        second, query_count = self.get_stats()
+        self.assertEqual(first, second)
+        self.assertEqual(query_count, 0)
+
+    def test_payment_save_invalidates_owner_entry(self):
+        property_obj = self.create_property()
+        self.get_stats()
+        payment = Payment.objects.get(unit__property=property_obj)
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.amount_paid = payment.amount_due
+            payment.save()
+        data, query_count = self.get_stats()
+        self.assertGreater(query_count, 0)
+        self.assertEqual(data['total_amount_paid'], 1000.0)
+
+    def test_other_owner_entry_survives_invalidation(self):
+        landlord = CustomUser.objects.create_user(
+            email='landlord@example.com', username='landlord', password='pass', role='landlord'
+        )
+        calls = []
+        compute = lambda user: calls.append(user) or {'owner': user.pk}
+        get_cached_dashboard_stats(landlord, compute)
+        self.create_property()
+        get_cached_dashboard_stats(landlord, compute)
+        self.assertEqual(len(calls), 1)
+
+    def test_stale_entry_is_served_while_recompute_runs(self):
+        get_cached_dashboard_stats(self.admin, lambda user: {'version': 1})
+        self.create_property()
+
+        def recompute(user):
+            # A second reader arriving mid-recompute gets the stale value.
+            stale = get_cached_dashboard_stats(user, lambda user: self.fail('recomputed twice'))
+            self.assertEqual(stale, {'version': 1})
+            return {'version': 2}
+
+        self.assertEqual(get_cached_dashboard_stats(self.admin, recompute), {'version': 2})
+        self.assertEqual(get_cached_dashboard_stats(self.admin, self.fail), {'version': 2})
+
+
+class CollectionTrendViewTests(DashboardTestCase):
+    def test_trends_are_columnar_per_property(self):
+        first = self.create_property(units=2, occupied=2)
+        self.create_property(units=1, occupied=1)
+
+        response = self.client.get(
+            reverse('dashboard-stats-trends'),
+            {'start': '2025-04', 'end': '2025-06', 'property': str(first.id)},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['periods'], ['2025-04', '2025-05', '2025-06'])
+        self.assertEqual(len(response.data['properties']), 1)
+        series = response.data['properties'][0]
+        self.assertEqual(series['property_id'], first.id)
+        self.assertEqual(series['amount_due'], [0.0, 2000.0, 0.0])
+        self.assertEqual(series['amount_paid'], [0.0, 1000.0, 0.0])
+        self.assertEqual(series['collection_percentage'], [0.0, 50.0, 0.0])
+
+    def test_invalid_range_is_rejected(self):
+        response = self.client.get(
+            reverse('dashboard-stats-trends'), {'start': '2025-06', 'end': '2025-01'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class CollectionStatsExportViewTests(DashboardTestCase):
+    def export(self, export_format):
+        response = self.client.get(reverse('dashboard-stats-export'), {'export_format': export_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_streams_one_row_per_property(self):
+        first = self.create_property(units=2, occupied=1)
+        self.create_property(units=1, occupied=0)
+        self.create_property(is_active=False)
+
+        lines = self.export('csv').splitlines()
+
+        self.assertEqual(lines[0].split(','), COLLECTION_STATS_FIELDS)
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[1], f'{first.id},{first.name},2,1,1000.0,500.0,500.0,50.0,1')
+
+    def test_ndjson_export_matches_dashboard_stats(self):
+        self.create_property(units=3, occupied=2)
+        dashboard, _ = self.get_stats()
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual(rows, [dict(row) for row in dashboard['property_collection_stats']])
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('dashboard-stats-export'), {'export_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+class NotificationTestCase(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tenants = [
+            CustomUser.objects.create_user(
+                email=f'tenant{number}@example.com', username=f'tenant{number}', password='pass', role='tenant'
+            )
+            for number in range(5)
+        ]
+
+
+class NotificationDeliveryTests(NotificationTestCase):
+
+    def test_all_tenants_is_queued_and_fanned_out_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('create-notification'), {'message': 'Water is off', 'recipients': 'all_tenants'},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['fanout_pending'])
+        self.assertLessEqual(len(queries), 4)
+        self.assertFalse(NotificationDelivery.objects.exists())
+        # Tenants who join later do not get an earlier notification.
+        late = CustomUser.objects.create_user(
+            email='late@example.com', username='late', password='pass', role='tenant'
+        )
+        CustomUser.objects.filter(pk=late.pk).update(
+            date_joined=Notification.objects.get().timestamp + timedelta(seconds=1)
+        )
+
+        out = StringIO()
+        call_command('deliver_notifications', '--once', '--chunk-size', '2', stdout=out)
+
+        self.assertIn('Delivered 5 notifications', out.getvalue())
+        notification = Notification.objects.get()
+        self.assertFalse(notification.fanout_pending)
+        self.assertEqual(
+            set(notification.recipients.values_list('id', flat=True)), {user.id for user in self.tenants}
+        )
+        self.assertEqual(deliver_pending_notifications(), 0)
+
+    def test_read_state_is_per_recipient(self):
+        notification = create_notification('Rent is due', [user.id for user in self.tenants[:2]])
+        first, second = APIClient(), APIClient()
+        first.force_authenticate(self.tenants[0])
+        second.force_authenticate(self.tenants[1])
+
+        response = first.patch(reverse('mark-notification-read', args=[notification.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_read'])
+
+        inbox = second.get(reverse('tenant-list-notifications')).data['results']
+        self.assertEqual([(item['id'], item['is_read']) for item in inbox], [(notification.id, False)])
+        outsider = APIClient()
+        outsider.force_authenticate(self.tenants[2])
+        self.assertEqual(outsider.patch(reverse('mark-notification-read', args=[notification.id])).status_code, 404)
+
+
+class UnreadNotificationCountTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tenant = self.tenants[0]
+        self.tenant_client = APIClient()
+        self.tenant_client.force_authenticate(self.tenant)
+        self.notifications = [create_notification(f'Notice {number}', [self.tenant.id]) for number in range(4)]
+
+    def unread(self):
+        with self.assertNumQueries(1):
+            response = self.tenant_client.get(reverse('tenant-unread-notification-count'))
+        return response.data['unread']
+
+    def test_counter_follows_deliveries(self):
+        self.assertEqual(self.unread(), 4)
+        create_notification('Everyone', 'all_tenants')
+        deliver_pending_notifications(chunk_size=2)
+        self.assertEqual(self.unread(), 5)
+
+        self.notifications[0].delete()
+        self.assertEqual(self.unread(), 4)
+        self.assertEqual(
+            UnreadNotificationCount.objects.get(user=self.tenant).unread,
+            NotificationDelivery.objects.filter(user=self.tenant, is_read=False).count()
+        )
+
+    def test_bulk_mark_read_by_ids_and_before(self):
+        url = reverse('tenant-mark-notifications-read')
+        ids = [notification.id for notification in self.notifications[:2]]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.tenant_client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'marked': 2, 'unread': 2})
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 2)
+
+        # Marking again changes nothing.
+        self.assertEqual(self.tenant_client.post(url, {'ids': ids}, format='json').data['marked'], 0)
+        NotificationDelivery.objects.filter(notification=self.notifications[3]).update(
+            created_at=self.notifications[3].timestamp + timedelta(days=1)
+        )
+        response = self.tenant_client.post(url, {'before': self.notifications[2].timestamp.isoformat()}, format='json')
+        self.assertEqual(response.data, {'marked': 1, 'unread': 1})
+        self.assertEqual(self.tenant_client.post(url, {}, format='json').status_code, 400)
+
+    def test_single_mark_read_updates_counter(self):
+        self.tenant_client.patch(reverse('mark-notification-read', args=[self.notifications[0].id]))
+        self.tenant_client.patch(reverse('mark-notification-read', args=[self.notifications[0].id]))
+        self.assertEqual(self.unread(), 3)
+
+
+class NotificationStreamTests(NotificationTestCase):
+    def stream_url(self, user):
+        return f"{reverse('notification-stream')}?ticket={issue_stream_ticket(user)}"
+
+    def send(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_notification('Water is off', [user.id])
+
+    def invalidate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_dashboard_stats([])
+
+    async def open_stream(self, user):
+        response = await self.async_client.get(self.stream_url(user))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+        return stream
+
+    async def test_stream_requires_a_ticket_or_an_authorization_header(self):
+        url = reverse('notification-stream')
+        for query in ('', '?ticket=invalid', f'?token={AccessToken.for_user(self.admin)}'):
+            with self.subTest(query=query):
+                response = await self.async_client.get(url + query)
+                self.assertEqual(response.status_code, 401)
+        with override_settings(EVENT_STREAM_TICKET_MAX_AGE=-1):
+            response = await self.async_client.get(self.stream_url(self.admin))
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.get(url, headers={'Authorization': f'Bearer {AccessToken.for_user(self.admin)}'})
+        self.assertEqual(response.status_code, 200)
+        await aiter(response.streaming_content).aclose()
+
+    def test_ticket_is_issued_to_authenticated_users(self):
+        response = self.client.post(reverse('notification-stream-ticket'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(signing.loads(response.data['ticket'], salt=STREAM_TICKET_SALT), self.admin.pk)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(reverse('notification-stream-ticket')).status_code, 401)
+
+    def test_stream_is_refused_under_wsgi(self):
+        # The test client goes through the WSGI handler, which would buffer the endless stream.
+        response = self.client.get(self.stream_url(self.admin))
+
+        self.assertEqual(response.status_code, 501)
+
+    async def test_new_notifications_are_pushed_to_their_recipient(self):
+        stream = await self.open_stream(self.tenants[0])
+
+        notification = await sync_to_async(self.send)(self.tenants[0])
+        chunk = (await asyncio.wait_for(anext(stream), 1)).decode()
+
+        event_line, data_line = chunk.strip().split('\n')
+        self.assertEqual(event_line, 'event: notification')
+        event = json.loads(data_line.removeprefix('data: '))
+        self.assertEqual((event['id'], event['message']), (notification.id, 'Water is off'))
+        await stream.aclose()
+
+    async def test_dashboard_invalidations_reach_admins(self):
+        stream = await self.open_stream(self.admin)
+
+        await sync_to_async(self.invalidate)()
+        chunk = await asyncio.wait_for(anext(stream), 1)
+
+        self.assertTrue(chunk.startswith(b'event: dashboard.invalidated\n'))
+        await stream.aclose()
+
+    async def test_closing_a_stream_unsubscribes_it(self):
+        stream = _event_stream(['user:0'])
+        self.assertEqual(await anext(stream), 'retry: 5000\n\n')
+        self.assertIn('user:0', get_event_broker()._subscribers)
+
+        await stream.aclose()
+
+        self.assertNotIn('user:0', get_event_broker()._subscribers)
+
+
+class InProcessEventBrokerTests(TestCase):
+    async def test_events_published_from_other_threads_reach_subscribers(self):
+        broker = InProcessEventBroker(queue_size=1)
+        async with broker.subscribe(['user:1']) as events:
+            thread = threading.Thread(target=broker.publish, args=([
+                ('user:1', {'type': 'first'}), ('user:2', {'type': 'other'}), ('user:1', {'type': 'dropped'}),
+            ],))
+            thread.start()
+            thread.join()
+            self.assertEqual(await asyncio.wait_for(events.get(), 1), {'type': 'first'})
+            # The queue held one event, so the second for this subscriber was dropped.
+            await asyncio.sleep(0)
+            self.assertTrue(events.empty())
+        self.assertEqual(broker._subscribers, {})
+
+
+class RedisEventBrokerTests(TestCase):
+    async def test_finished_listeners_release_their_loop(self):
+        class StubRedisEventBroker(RedisEventBroker):
+            # Skips the redis client; only the per-loop listener bookkeeping runs.
+            def __init__(self):
+                InProcessEventBroker.__init__(self)
+                self._listeners = {}
+
+            async def _listen(self):
+                await asyncio.sleep(0)
+
+        broker = StubRedisEventBroker()
+        await broker._subscribed(['user:1'])
+        self.assertIn(asyncio.get_running_loop(), broker._listeners)
+
+        await broker._listeners[asyncio.get_running_loop()]
+        await asyncio.sleep(0)
+        self.assertEqual(broker._listeners, {})
@@ -1,11 +1,17 @@
 from django.urls import path
-from .views import ( DashboardStatsView, NotificationListView, NotificationMarkReadView, TenantNotificationListView,NotificationCreateView,
+from .views import ( CollectionStatsExportView, CollectionTrendView, DashboardStatsView, NotificationBulkMarkReadView, NotificationListView, NotificationMarkReadView, TenantNotificationListView,NotificationCreateView, UnreadNotificationCountView, NotificationStreamTicketView, notification_stream,
 )
 
 urlpatterns = [
     path('dashboard-stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('dashboard-stats/export/', CollectionStatsExportView.as_view(), name='dashboard-stats-export'),
+    path('dashboard-stats/trends/', CollectionTrendView.as_view(), name='dashboard-stats-trends'),
     path('notifications/', NotificationListView.as_view(), name='list-notifications'),
     path('notifications/create/', NotificationCreateView.as_view(), name='create-notification'),
+    path('notifications/stream/', notification_stream, name='notification-stream'),
+    path('notifications/stream/ticket/', NotificationStreamTicketView.as_view(), name='notification-stream-ticket'),
     path('tenant/notifications/', TenantNotificationListView.as_view(), name='tenant-list-notifications'),
+    path('tenant/notifications/unread-count/', UnreadNotificationCountView.as_view(), name='tenant-unread-notification-count'),
+    path('tenant/notifications/mark-read/', NotificationBulkMarkReadView.as_view(), name='tenant-mark-notifications-read'),
     path('notifications/<int:notification_id>/mark-read/', NotificationMarkReadView.as_view(), name='mark-notification-read'),
 ]
@@ -1,21 +1,38 @@
-
-import decimal
+import asyncio
+import csv
+import json
 from venv import logger
 
-from a_users import models
-from property.models import Property, Unit
-from tenant.models import Payment
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
 from .models import Notification
-from .serializers import DashboardStatsSerializer, NotificationSerializer,NotificationMarkReadSerializer
+from .serializers import (
+    CollectionTrendQuerySerializer, DashboardStatsSerializer, NotificationMarkReadSerializer, NotificationSerializer,
+    TenantNotificationSerializer,
+)
+from .cache import dashboard_scope, get_cached_dashboard_stats
+from .services import (
+    COLLECTION_STATS_FIELDS, get_collection_trends, get_dashboard_stats, iter_property_collection_stats,
+)
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
-from .models import Notification
+from .models import Notification, NotificationDelivery
+from .notifications import create_notification, get_unread_count, mark_notifications_read
 from .serializers import NotificationSerializer
+from utils.pagination import CursorOrPagePagination, TimestampCursorOrPagePagination
+from utils.events import dashboard_channel, encode_event, get_event_broker, user_channel
 from utils.permissions import IsAdminOrPropertyManager
 from a_users.models import CustomUser
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum, Count
 
 
 
@@ -27,109 +44,13 @@ class DashboardStatsView(generics.GenericAPIView):
         try:
             user = self.request.user
             logger.debug(f"Fetching dashboard stats for user {user.email}")
-            if user.role == 'admin':
-                properties = Property.objects.filter(is_active=True)
-                units = Unit.objects.all()
-                payments = Payment.objects.all()
-            else:
-                # Filter by properties owned or managed by the user
-                properties = Property.objects.filter(is_active=True).filter(
-                    models.Q(owner=user) | models.Q(property__manager=user)
-                )
-                units = Unit.objects.filter(
-                    models.Q(property__owner=user) | models.Q(property__manager=user)
-                )
-                payments = Payment.objects.filter(
-                    models.Q(unit__property__owner=user) | models.Q(unit__property__manager=user)
-                )
-
-            # Property metrics
-            total_properties = properties.count()
-            logger.debug(f"Total properties: {total_properties}")
-
-            # Unit metrics
-            total_units = units.count()
-            occupied_units = units.filter(is_occupied=True).count()
-            non_occupied_units = total_units - occupied_units
-            occupancy_percentage = (
-                (occupied_units / total_units * 100) if total_units > 0 else 0.0
-            )
-            logger.debug(f"Unit metrics: total={total_units}, occupied={occupied_units}, non_occupied={non_occupied_units}")
-
-            # Payment metrics with type casting
-            payment_aggregates = payments.aggregate(
-                total_due=Sum('amount_due'),
-                total_paid=Sum('amount_paid'),
-                total_payments=Count('id')
-            )
-            total_amount_due = decimal.Decimal(str(payment_aggregates['total_due'] or 0))
-            total_amount_paid = decimal.Decimal(str(payment_aggregates['total_paid'] or 0))
-            total_payments = payment_aggregates['total_payments'] or 0
-            total_balance = total_amount_due - total_amount_paid
-            collection_percentage = (
-                (total_amount_paid / total_amount_due * 100) if total_amount_due > 0 else 0.0
-            )
-            logger.debug(f"Payment metrics: due={total_amount_due}, paid={total_amount_paid}, balance={total_balance}")
-
-            # Calculate collection percentage for each property
-            property_collection_stats = []
-            for property_obj in properties:
-                # Get units for this property
-                property_units = units.filter(property=property_obj)
-                property_total_units = property_units.count()
-                property_occupied_units = property_units.filter(is_occupied=True).count()
-                
-                # Get payments for this property's units
-                property_payments = payments.filter(unit__property=property_obj)
-                
-                # Calculate payment aggregates for this property
-                property_payment_aggregates = property_payments.aggregate(
-                    property_due=Sum('amount_due'),
-                    property_paid=Sum('amount_paid'),
-                    property_payment_count=Count('id')
-                )
-                
-                property_amount_due = decimal.Decimal(str(property_payment_aggregates['property_due'] or 0))
-                property_amount_paid = decimal.Decimal(str(property_payment_aggregates['property_paid'] or 0))
-                property_payment_count = property_payment_aggregates['property_payment_count'] or 0
-                property_balance = property_amount_due - property_amount_paid
-                
-                # Calculate collection percentage for this property
-                property_collection_percentage = (
-                    (property_amount_paid / property_amount_due * 100) if property_amount_due > 0 else 0.0
-                )
-                
-                property_stats = {
-                    'property_id': property_obj.id,
-                    'property_name': property_obj.name,
-                    'total_units': property_total_units,
-                    'occupied_units': property_occupied_units,
-                    'amount_due': float(property_amount_due),
-                    'amount_paid': float(property_amount_paid),
-                    'balance': float(property_balance),
-                    'collection_percentage': round(property_collection_percentage, 1),
-                    'payment_count': property_payment_count
-                }
-                
-                property_collection_stats.append(property_stats)
-                logger.debug(f"Property {property_obj.name} collection: {property_collection_percentage}%")
-
-            stats = {
-                'total_properties': total_properties,
-                'total_units': total_units,
-                'occupied_units': occupied_units,
-                'non_occupied_units': non_occupied_units,
-                'occupancy_percentage': round(occupancy_percentage, 1),
-                'total_payments': total_payments,
-                'total_amount_due': float(total_amount_due),
-                'total_amount_paid': float(total_amount_paid),
-                'total_balance': float(total_balance),
-                'collection_percentage': round(collection_percentage, 1),
-                'property_collection_stats': property_collection_stats  # New field with per-property stats
-            }
+            stats = get_cached_dashboard_stats(user, get_dashboard_stats)
 
             serializer = self.get_serializer(stats)
-            logger.info(f"Dashboard stats retrieved for user {user.email}: {stats}")
+            logger.info(
+                f"Dashboard stats retrieved for user {user.email}: "
+                f"{len(stats['property_collection_stats'])} properties"
+            )
             
             return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -140,7 +61,70 @@ class DashboardStatsView(generics.GenericAPIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class CollectionTrendView(generics.GenericAPIView):
+    """
+    Month-over-month collection curves per property, returned as parallel
+    arrays aligned on a shared list of billing periods.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
+    serializer_class = CollectionTrendQuerySerializer
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        trends = get_collection_trends(
+            request.user, params['start'], params['end'], params.get('property')
+        )
+        return Response(trends, status=status.HTTP_200_OK)
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+class CollectionStatsExportView(generics.GenericAPIView):
+    """
+    Stream the per-property collection stats as CSV or NDJSON
+    (``?export_format=csv|ndjson``), one row at a time.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
+    EXPORT_FORMATS = {
+        'csv': 'text/csv',
+        'ndjson': 'application/x-ndjson',
+    }
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in self.EXPORT_FORMATS:
+            return Response(
+                {'detail': f"export_format must be one of: {', '.join(self.EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        rows = iter_property_collection_stats(request.user)
+        if export_format == 'csv':
+            content = self._csv_lines(rows)
+        else:
+            content = (json.dumps(row) + '\n' for row in rows)
+        response = StreamingHttpResponse(content, content_type=self.EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="collection-stats.{export_format}"'
+        logger.info(f"Streaming collection stats export ({export_format}) for user {request.user.email}")
+        return response
+
+    def _csv_lines(self, rows):
+        writer = csv.DictWriter(_Echo(), fieldnames=COLLECTION_STATS_FIELDS)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+
 class NotificationCreateView(generics.CreateAPIView):
+    """
+    Send a notification to a list of tenant ids, or to every tenant with
+    ``"recipients": "all_tenants"``. The latter returns before any delivery
+    is made; deliver_notifications fans it out in the background.
+    """
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
@@ -150,44 +134,169 @@ class NotificationCreateView(generics.CreateAPIView):
         message = request.data.get('message', '')
         if not message:
             return Response({"error": "Message is required."}, status=status.HTTP_400_BAD_REQUEST)
-        notification = Notification.objects.create(message=message)
-        if recipients_data == 'all_tenants':
-            tenants = CustomUser.objects.filter(role='tenant')
-            notification.recipients.set(tenants)
-        elif isinstance(recipients_data, list):
-            users = CustomUser.objects.filter(id__in=recipients_data, role='tenant')
-            notification.recipients.set(users)
+        if not isinstance(recipients_data, list) and recipients_data != 'all_tenants':
+            recipients_data = None
+        notification = create_notification(message, recipients_data)
         serializer = self.get_serializer(notification)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 class NotificationListView(generics.ListAPIView):
-    queryset = Notification.objects.all()
+    queryset = Notification.objects.prefetch_related('recipients')
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
+    pagination_class = TimestampCursorOrPagePagination
 
 class TenantNotificationListView(generics.ListAPIView):
-    serializer_class = NotificationSerializer
+    serializer_class = TenantNotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CursorOrPagePagination
 
     def get_queryset(self):
-        # Return notifications where the current user is a recipient
-        return Notification.objects.filter(recipients=self.request.user)
+        # The user's deliveries, newest first, on the (user, created_at, id) index.
+        return NotificationDelivery.objects.filter(user=self.request.user).select_related('notification')
     
 class NotificationMarkReadView(generics.UpdateAPIView):
-    queryset = Notification.objects.all()
-    serializer_class = NotificationMarkReadSerializer
+    serializer_class = TenantNotificationSerializer
     permission_classes = [IsAuthenticated]
+    lookup_field = 'notification_id'
     lookup_url_kwarg = 'notification_id'
 
+    def get_queryset(self):
+        return NotificationDelivery.objects.filter(user=self.request.user).select_related('notification')
+
     def update(self, request, *args, **kwargs):
-        notification = self.get_object()
-        # Ensure the user is a recipient of the notification
-        if request.user not in notification.recipients.all():
-            return Response(
-                {"error": "You are not authorized to mark this notification as read."},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        notification.is_read = True
-        notification.save()
-        serializer = self.get_serializer(notification)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        # Only the user's own delivery can be found, so other users' get a 404.
+        delivery = self.get_object()
+        if mark_notifications_read(request.user, notification_ids=[delivery.notification_id]):
+            delivery.refresh_from_db(fields=['is_read', 'read_at'])
+        serializer = self.get_serializer(delivery)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class NotificationBulkMarkReadView(generics.GenericAPIView):
+    """
+    Mark many of the user's notifications read in one UPDATE, by ``ids`` or
+    everything sent up to ``before``.
+    """
+    serializer_class = NotificationMarkReadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        marked = mark_notifications_read(
+            request.user,
+            notification_ids=serializer.validated_data.get('ids'),
+            before=serializer.validated_data.get('before'),
+        )
+        return Response({"marked": marked, "unread": get_unread_count(request.user)}, status=status.HTTP_200_OK)
+
+
+class UnreadNotificationCountView(generics.GenericAPIView):
+    """The user's unread notification count, read from their counter row, for badge polling."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"unread": get_unread_count(request.user)})
+
+
+# Milliseconds the browser waits before reconnecting a dropped event stream.
+EVENT_STREAM_RETRY = 5000
+
+
+STREAM_TICKET_SALT = 'dashboard_stats.notification-stream'
+
+
+def issue_stream_ticket(user):
+    """A signed ticket that opens the user's event stream for EVENT_STREAM_TICKET_MAX_AGE seconds."""
+    return signing.dumps(user.pk, salt=STREAM_TICKET_SALT)
+
+
+def _ticket_user(ticket):
+    try:
+        user_id = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=settings.EVENT_STREAM_TICKET_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return CustomUser.objects.filter(pk=user_id, is_active=True).first()
+
+
+def _stream_user(request):
+    """
+    The user of an event stream request, from the JWT in the Authorization
+    header or, since EventSource cannot set headers, a stream ticket in the
+    ``ticket`` query parameter. Access tokens are never taken from the URL,
+    where they would end up in access logs and browser history.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        ticket = request.GET.get('ticket')
+        return _ticket_user(ticket) if ticket else None
+    raw_token = authentication.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+class NotificationStreamTicketView(generics.GenericAPIView):
+    """
+    Issue a short-lived ticket for opening the notification event stream
+    from a browser, whose EventSource cannot send the Authorization header.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        return Response({
+            "ticket": issue_stream_ticket(request.user),
+            "expires_in": settings.EVENT_STREAM_TICKET_MAX_AGE,
+        })
+
+
+def _stream_channels(user):
+    channels = [user_channel(user.pk)]
+    if user.role != 'tenant':
+        channels.append(dashboard_channel(dashboard_scope(user)))
+    return channels
+
+
+async def _event_stream(channels):
+    async with get_event_broker().subscribe(channels) as events:
+        yield f'retry: {EVENT_STREAM_RETRY}\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), settings.EVENT_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing the idle connection.
+                yield ': keep-alive\n\n'
+                continue
+            yield f"event: {event['type']}\ndata: {encode_event(event)}\n\n"
+
+
+@require_GET
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of the user's new notifications and, for
+    owners, managers and admins, of dashboard invalidations. Serve it from
+    the ASGI application (``a_core.asgi``): each open stream is then a
+    coroutine waiting on a queue. Under WSGI Django would buffer the endless
+    stream in a worker, so it is refused with 501 there.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "The notification stream is only served by the ASGI application."},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided or are invalid."},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    response = StreamingHttpResponse(_event_stream(_stream_channels(user)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from property.occupancy import reconcile_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Recompute Unit.is_occupied from tenant assignments, one chunk of properties at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100, help='Properties per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted units without fixing them.')
+        parser.add_argument('--diff', action='store_true', help='Print every drifted unit.')
+        parser.add_argument(
+            '--interval', type=int, default=0, help='Repeat every this many seconds (default: run once).'
+        )
+
+    def handle(self, *args, **options):
+        on_change = self._print_change if options['diff'] else None
+        while True:
+            started = time.monotonic()
+            changed = reconcile_occupancy(
+                chunk_size=options['chunk_size'], dry_run=options['dry_run'], on_change=on_change
+            )
+            elapsed = time.monotonic() - started
+            verb = 'Found' if options['dry_run'] else 'Fixed'
+            self.stdout.write(self.style.SUCCESS(f"{verb} {changed} drifted units in {elapsed:.2f}s"))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def _print_change(self, unit_id, property_id, unit_number, is_occupied):
+        self.stdout.write(
+            f"property {property_id} unit {unit_number} (id {unit_id}): "
+            f"is_occupied {not is_occupied} -> {is_occupied}"
+        )
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_owner_access(apps, schema_editor):
+    Property = apps.get_model('property', 'Property')
+    PropertyAccess = apps.get_model('property', 'PropertyAccess')
+    PropertyAccess.objects.bulk_create(
+        (
+            PropertyAccess(user_id=owner_id, property_id=property_id, role='owner')
+            for property_id, owner_id in Property.objects.values_list('id', 'owner_id').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0002_unit_property_un_created_bbc44b_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='manager',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='managed_properties', to=settings.AUTH_USER_MODEL, verbose_name='manager'),
+        ),
+        migrations.CreateModel(
+            name='PropertyAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('owner', 'Owner'), ('manager', 'Manager')], max_length=10, verbose_name='role')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access', to='property.property')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='property_access', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'property access',
+                'verbose_name_plural': 'property access',
+                'indexes': [models.Index(fields=['property', 'user'], name='property_pr_propert_e6a100_idx')],
+                'unique_together': {('user', 'property', 'role')},
+            },
+        ),
+        migrations.RunPython(populate_owner_access, migrations.RunPython.noop),
+    ]
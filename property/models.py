@@ -1,19 +1,63 @@
 from datetime import timezone
 from django.db import models
+from django.db.models.functions import Now
 from a_users.models import CustomUser
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator
 from django.utils.translation import gettext_lazy as _
 
+def accessible_property_ids(user):
+    """Subquery of the ids of the properties a non-admin user owns or manages."""
+    return PropertyAccess.objects.filter(user_id=user.pk).values('property_id')
+
+
+class PropertyQuerySet(models.QuerySet):
+    def for_user(self, user):
+        if user.role == 'admin':
+            return self
+        return self.filter(id__in=accessible_property_ids(user))
+
+
+class UnitQuerySet(models.QuerySet):
+    def for_user(self, user):
+        if user.role == 'admin':
+            return self
+        if user.role == 'tenant':
+            return self.filter(tenants__user_id=user.pk)
+        return self.filter(property_id__in=accessible_property_ids(user))
+
+    def claim(self, unit_id):
+        """
+        Mark a vacant unit occupied with a compare-and-set UPDATE. Returns
+        False when the unit was already occupied, so concurrent assignments
+        of one unit have exactly one winner without locking the row first.
+        """
+        return self.filter(pk=unit_id, is_occupied=False).update(is_occupied=True, updated_at=Now()) == 1
+
+    def release(self, unit_id):
+        """Mark a unit vacant unless a tenant is still assigned to it."""
+        return self.filter(pk=unit_id, tenants__isnull=True).update(is_occupied=False, updated_at=Now()) == 1
+
+
 class Property(models.Model):
     name = models.CharField(_('property name'), max_length=255)
     address = models.TextField(_('address'))
     description = models.TextField(_('description'), blank=True)
     owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='properties')
+    manager = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='managed_properties',
+        verbose_name=_('manager')
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    objects = PropertyQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('property')
         verbose_name_plural = _('properties')
@@ -57,6 +101,8 @@ class Unit(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UnitQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('unit')
         verbose_name_plural = _('units')
@@ -64,8 +110,63 @@ class Unit(models.Model):
         indexes = [
             models.Index(fields=['property', 'unit_number']),
             models.Index(fields=['unit_type']),
+            models.Index(fields=['created_at', 'id']),
         ]
 
     def __str__(self):
         return f"{self.unit_number} ({self.get_unit_type_display()}) - {self.property.name}"
-    
+
+
+class PropertyAccess(models.Model):
+    """
+    Denormalized user -> property visibility, one row per owner or manager
+    assignment. Kept in sync with Property.owner/manager by
+    property.signals, so role scoping is a single indexed semi-join.
+    """
+    ROLE_CHOICES = (
+        ('owner', _('Owner')),
+        ('manager', _('Manager')),
+    )
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='property_access')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='access')
+    role = models.CharField(_('role'), max_length=10, choices=ROLE_CHOICES)
+
+    class Meta:
+        verbose_name = _('property access')
+        verbose_name_plural = _('property access')
+        unique_together = ('user', 'property', 'role')
+        indexes = [
+            models.Index(fields=['property', 'user']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.role} {self.property_id}"
+
+
+def sync_property_access(property_ids):
+    """
+    Rebuild the access rows of the given properties from their owner and
+    manager. Returns the ids of users whose access changed.
+    """
+    wanted = set()
+    for property_id, owner_id, manager_id in Property.objects.filter(id__in=property_ids).values_list(
+        'id', 'owner_id', 'manager_id'
+    ):
+        wanted.add((owner_id, property_id, 'owner'))
+        if manager_id:
+            wanted.add((manager_id, property_id, 'manager'))
+    existing = set(PropertyAccess.objects.filter(property_id__in=property_ids).values_list(
+        'user_id', 'property_id', 'role'
+    ))
+    stale = existing - wanted
+    missing = wanted - existing
+    for user_id, property_id, role in stale:
+        PropertyAccess.objects.filter(user_id=user_id, property_id=property_id, role=role).delete()
+    PropertyAccess.objects.bulk_create(
+        [PropertyAccess(user_id=user_id, property_id=property_id, role=role)
+         for user_id, property_id, role in missing],
+        ignore_conflicts=True,
+    )
+    return {user_id for user_id, _, _ in stale | missing}
+
@@ -0,0 +1,61 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from dashboard_stats.rollups import schedule_collection_refresh
+from tenant.models import Tenant
+from .models import Property, Unit
+
+logger = logging.getLogger(__name__)
+
+
+def _has_tenant():
+    return Exists(Tenant.objects.filter(unit=OuterRef('pk')))
+
+
+def _drifted_units(property_ids):
+    return Unit.objects.filter(property_id__in=property_ids).filter(
+        Q(is_occupied=True) & ~_has_tenant() | Q(is_occupied=False) & _has_tenant()
+    )
+
+
+def reconcile_occupancy(chunk_size=100, dry_run=False, on_change=None):
+    """
+    Make ``Unit.is_occupied`` match whether the unit has a tenant.
+
+    Properties are processed in id chunks of ``chunk_size``. Each chunk runs
+    in its own short transaction, so SQLite's write lock is never held for
+    long. Drifted units are listed first, then fixed with one UPDATE that
+    sets the flag from an EXISTS subquery over Tenant.unit. ``on_change`` is
+    called with ``(unit_id, property_id, unit_number, is_occupied)`` for
+    every drifted unit; ``is_occupied`` is the corrected value. With
+    ``dry_run`` nothing is written. Returns the number of drifted units.
+    """
+    changed = 0
+    last_id = 0
+    while True:
+        property_ids = list(
+            Property.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not property_ids:
+            break
+        last_id = property_ids[-1]
+        with transaction.atomic():
+            drifted = list(_drifted_units(property_ids).order_by('property_id', 'id').values_list(
+                'id', 'property_id', 'unit_number', 'is_occupied'
+            ))
+            if not drifted:
+                continue
+            changed += len(drifted)
+            if on_change is not None:
+                for unit_id, property_id, unit_number, is_occupied in drifted:
+                    on_change(unit_id, property_id, unit_number, not is_occupied)
+            if dry_run:
+                continue
+            _drifted_units(property_ids).update(is_occupied=_has_tenant(), updated_at=timezone.now())
+            # The UPDATE skips the signals that keep the occupancy rollups current.
+            schedule_collection_refresh(property_ids={property_id for _, property_id, _, _ in drifted})
+    logger.info(f"Occupancy reconciliation {'found' if dry_run else 'fixed'} {changed} drifted units")
+    return changed
@@ -8,16 +8,24 @@ from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 class PropertySerializer(serializers.ModelSerializer):
     owner = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all())
+    manager = serializers.PrimaryKeyRelatedField(
+        queryset=CustomUser.objects.all(), required=False, allow_null=True
+    )
 
     class Meta:
         model = Property
-        fields = ['id','name', 'address', 'description', 'owner', 'created_at', 'updated_at', 'is_active']
+        fields = ['id','name', 'address', 'description', 'owner', 'manager', 'created_at', 'updated_at', 'is_active']
         read_only_fields = ['created_at', 'updated_at']
 
     def validate_owner(self, value):
         if value.role not in ['landlord', 'property_manager', 'admin']:
             raise serializers.ValidationError("Owner must be a landlord, property manager, or admin.")
         return value
+
+    def validate_manager(self, value):
+        if value is not None and value.role not in ['property_manager', 'admin']:
+            raise serializers.ValidationError("Manager must be a property manager or admin.")
+        return value
 # Add UnitSerializer
 
 class UnitSerializer(serializers.ModelSerializer):
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Property, sync_property_access
+
+
+@receiver(post_save, sender=Property)
+def sync_access_on_assignment(sender, instance, **kwargs):
+    # Rows of a deleted property go with it through the CASCADE.
+    sync_property_access([instance.pk])
@@ -1,3 +1,135 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from a_users.models import CustomUser
+from tenant.models import Payment, Tenant, Visitor
+from .models import Property, PropertyAccess, Unit
+from .occupancy import reconcile_occupancy
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PropertyAccessTests(TestCase):
+    def setUp(self):
+        self.owner = self.create_user('owner', 'landlord')
+        self.manager = self.create_user('manager', 'property_manager')
+        self.property = Property.objects.create(name='Block A', address='Nairobi', owner=self.owner)
+        self.unit = Unit.objects.create(property=self.property, unit_number='1')
+        self.other = Property.objects.create(name='Block B', address='Mombasa', owner=self.create_user('other', 'landlord'))
+        self.other_unit = Unit.objects.create(property=self.other, unit_number='1')
+
+    def create_user(self, name, role):
+        return CustomUser.objects.create_user(
+            email=f'{name}@example.com', username=name, password='pass', role=role
+        )
+
+    def access(self):
+        return set(PropertyAccess.objects.filter(property=self.property).values_list('user_id', 'role'))
+
+    def test_access_follows_owner_and_manager_assignment(self):
+        self.assertEqual(self.access(), {(self.owner.id, 'owner')})
+
+        self.property.manager = self.manager
+        self.property.save()
+        self.assertEqual(self.access(), {(self.owner.id, 'owner'), (self.manager.id, 'manager')})
+
+        new_owner = self.create_user('new-owner', 'landlord')
+        self.property.owner = new_owner
+        self.property.manager = None
+        self.property.save()
+        self.assertEqual(self.access(), {(new_owner.id, 'owner')})
+
+    def test_for_user_scopes_every_model(self):
+        self.property.manager = self.manager
+        self.property.save()
+        tenant_user = self.create_user('tenant', 'tenant')
+        tenant = Tenant.objects.create(user=tenant_user, unit=self.unit)
+        payment = Payment.objects.create(tenant=tenant, unit=self.unit, amount_due=100, billing_period='2025-06')
+        visitor = Visitor.objects.create(tenant=tenant, unit=self.unit, visitor_name='Guest')
+        other_tenant = Tenant.objects.create(user=self.create_user('other-tenant', 'tenant'), unit=self.other_unit)
+        Payment.objects.create(tenant=other_tenant, unit=self.other_unit, amount_due=100, billing_period='2025-06')
+        Visitor.objects.create(tenant=other_tenant, unit=self.other_unit, visitor_name='Other guest')
+        admin = self.create_user('admin', 'admin')
+
+        for user in (self.owner, self.manager):
+            self.assertEqual(list(Property.objects.for_user(user)), [self.property])
+            self.assertEqual(list(Unit.objects.for_user(user)), [self.unit])
+            self.assertEqual(list(Tenant.objects.for_user(user)), [tenant])
+            self.assertEqual(list(Payment.objects.for_user(user)), [payment])
+            self.assertEqual(list(Visitor.objects.for_user(user)), [visitor])
+        self.assertEqual(list(Unit.objects.for_user(tenant_user)), [self.unit])
+        self.assertEqual(list(Payment.objects.for_user(tenant_user)), [payment])
+        self.assertEqual(list(Visitor.objects.for_user(tenant_user)), [visitor])
+        self.assertEqual(Payment.objects.for_user(admin).count(), 2)
+
+    def test_unit_list_resolves_scope_in_one_query(self):
+        self.property.manager = self.manager
+        self.property.save()
+        client = APIClient()
+        client.force_authenticate(self.manager)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('unit-list-create'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([unit['id'] for unit in response.data['results']], [self.unit.id])
+        self.assertEqual(len(queries), 1)
+        self.assertIn('property_propertyaccess', queries[0]['sql'])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class OccupancyReconciliationTests(TestCase):
+    def setUp(self):
+        owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', password='pass', role='landlord'
+        )
+        self.units = []
+        for number in range(3):
+            property_obj = Property.objects.create(name=f'Block {number}', address='Nairobi', owner=owner)
+            self.units.append(Unit.objects.create(property=property_obj, unit_number='1'))
+        tenant_user = CustomUser.objects.create_user(
+            email='tenant@example.com', username='tenant', password='pass', role='tenant'
+        )
+        Tenant.objects.create(user=tenant_user, unit=self.units[0])
+        # Unit 0 has a tenant but is marked vacant; unit 1 is empty but marked occupied.
+        Unit.objects.filter(id=self.units[1].id).update(is_occupied=True)
+        Unit.objects.filter(id=self.units[0].id).update(is_occupied=False)
+
+    def occupancy(self):
+        return list(Unit.objects.order_by('id').values_list('is_occupied', flat=True))
+
+    def test_dry_run_reports_drift_without_writing(self):
+        changes = []
+        changed = reconcile_occupancy(chunk_size=1, dry_run=True, on_change=lambda *row: changes.append(row))
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(changes, [
+            (self.units[0].id, self.units[0].property_id, '1', True),
+            (self.units[1].id, self.units[1].property_id, '1', False),
+        ])
+        self.assertEqual(self.occupancy(), [False, True, False])
+
+    def test_reconcile_fixes_drift_in_one_update_per_chunk(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                changed = reconcile_occupancy(chunk_size=10)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "property_unit"')]
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.occupancy(), [True, False, False])
+        self.assertEqual(reconcile_occupancy(), 0)
+
+    def test_command_prints_diff(self):
+        out = StringIO()
+        call_command('reconcile_occupancy', '--dry-run', '--diff', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn(f'unit 1 (id {self.units[0].id}): is_occupied False -> True', output)
+        self.assertIn(f'unit 1 (id {self.units[1].id}): is_occupied True -> False', output)
+        self.assertIn('Found 2 drifted units', output)
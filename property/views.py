@@ -9,36 +9,39 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.utils.translation import gettext_lazy as _
 
 from .serializers import PropertySerializer, UnitSerializer
-from utils.pagination import CustomPagination
+from utils.pagination import CursorOrPagePagination
 from rest_framework import generics, filters
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import Property, Unit
 
 class PropertyListCreateView(generics.ListCreateAPIView):
-    queryset = Property.objects.all()
     serializer_class = PropertySerializer
     permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
+
+    def get_queryset(self):
+        return Property.objects.for_user(self.request.user)
+
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
 class PropertyRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Property.objects.all()
     serializer_class = PropertySerializer
     permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
 
+    def get_queryset(self):
+        return Property.objects.for_user(self.request.user)
+
 
 class UnitListCreateView(generics.ListCreateAPIView):
     serializer_class = UnitSerializer
     permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
+    pagination_class = CursorOrPagePagination
     
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'admin':
-            return Unit.objects.all()
-        # Filter units by properties where user is owner/manager
-        return Unit.objects.filter(property__owner=user) | Unit.objects.filter(property__manager=user)
+        # Units of the properties the user owns or manages
+        return Unit.objects.for_user(self.request.user).select_related('property')
 
     def post(self, request, *args, **kwargs):
         print("Request data:", request.data)
@@ -60,7 +63,4 @@ class UnitRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         """
         Restrict access to units for properties owned/managed by the user.
         """
-        user = self.request.user
-        if user.role == 'admin':
-            return Unit.objects.all()
-        return Unit.objects.filter(property__owner=user) | Unit.objects.filter(property__manager=user)
+        return Unit.objects.for_user(self.request.user).select_related('property')
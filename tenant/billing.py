@@ -0,0 +1,59 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from dashboard_stats.rollups import schedule_collection_refresh
+from .ledger import record_new_payments
+from .models import Payment, Tenant
+
+logger = logging.getLogger(__name__)
+
+
+def generate_billing_period(billing_period, properties=None, batch_size=1000):
+    """
+    Create a PENDING payment for the billing period for every occupied unit
+    with a tenant, charging the unit's monthly rent.
+
+    Units that already have a payment for the period are skipped with an
+    anti-join, so the operation can be re-run safely. Candidates are read in
+    unit-id keyset chunks and inserted with bulk_create inside one
+    transaction; when a unit has several tenants the first one is billed.
+    Returns the number of payments created.
+    """
+    candidates = Tenant.objects.filter(unit__isnull=False, unit__is_occupied=True).filter(
+        ~Exists(Payment.objects.filter(unit=OuterRef('unit'), billing_period=billing_period))
+    )
+    if properties is not None:
+        candidates = candidates.filter(unit__property__in=properties)
+    candidates = candidates.order_by('unit_id', 'id').values_list(
+        'id', 'unit_id', 'unit__monthly_rent', 'unit__property_id'
+    )
+
+    created = 0
+    property_ids = set()
+    last_unit_id = 0
+    with transaction.atomic():
+        while True:
+            rows = list(candidates.filter(unit_id__gt=last_unit_id)[:batch_size])
+            if not rows:
+                break
+            payments = []
+            for tenant_id, unit_id, monthly_rent, property_id in rows:
+                if unit_id == last_unit_id:
+                    continue
+                last_unit_id = unit_id
+                property_ids.add(property_id)
+                payments.append(Payment(
+                    tenant_id=tenant_id,
+                    unit_id=unit_id,
+                    amount_due=monthly_rent,
+                    amount_paid=0,
+                    payment_status='PENDING',
+                    billing_period=billing_period,
+                ))
+            record_new_payments(Payment.objects.bulk_create(payments))
+            created += len(payments)
+        schedule_collection_refresh(keys={(property_id, billing_period) for property_id in property_ids})
+    logger.info(f"Generated {created} payments for billing period {billing_period}")
+    return created
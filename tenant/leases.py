@@ -0,0 +1,95 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from dashboard_stats.models import Notification, NotificationDelivery
+from dashboard_stats.notifications import record_deliveries
+from dashboard_stats.rollups import schedule_collection_refresh
+from property.models import Unit
+from .models import LeaseRenewalNotice, Tenant
+
+logger = logging.getLogger(__name__)
+
+RENEWAL_MESSAGE = 'Your lease ends on {date}. Please contact your property manager to renew it.'
+
+
+def send_renewal_notices(today, window_days):
+    """
+    Notify tenants whose lease ends within ``window_days`` of today, once per
+    end date.
+
+    Every run scans the whole window on the lease_end_date index and skips
+    tenants with a LeaseRenewalNotice for their current end date, so a lease
+    added or changed after a run is still picked up by the next one. One
+    notification is created per end date, with its recipients and markers
+    inserted in bulk.
+    """
+    window_end = today + timedelta(days=window_days)
+    due = Tenant.objects.filter(
+        lease_end_date__gt=today, lease_end_date__lte=window_end, unit__isnull=False
+    ).filter(
+        ~Exists(LeaseRenewalNotice.objects.filter(tenant=OuterRef('pk'), lease_end_date=OuterRef('lease_end_date')))
+    )
+    recipients = {}
+    for end_date, tenant_id, user_id in due.order_by('lease_end_date', 'id').values_list(
+        'lease_end_date', 'id', 'user_id'
+    ).iterator():
+        recipients.setdefault(end_date, []).append((tenant_id, user_id))
+
+    notifications = Notification.objects.bulk_create([
+        Notification(message=RENEWAL_MESSAGE.format(date=end_date.isoformat())) for end_date in recipients
+    ])
+    record_deliveries([
+        NotificationDelivery(notification=notification, user_id=user_id, created_at=notification.timestamp)
+        for notification, tenants in zip(notifications, recipients.values())
+        for _, user_id in tenants
+    ])
+    # The unique constraint fails a concurrent run that notified the same tenants first.
+    LeaseRenewalNotice.objects.bulk_create(
+        [
+            LeaseRenewalNotice(tenant_id=tenant_id, lease_end_date=end_date, notification=notification)
+            for notification, (end_date, tenants) in zip(notifications, recipients.items())
+            for tenant_id, _ in tenants
+        ],
+        batch_size=1000,
+    )
+    return sum(len(tenants) for tenants in recipients.values())
+
+
+def vacate_expired_leases(today):
+    """
+    Free the units of tenants whose lease ended before today.
+
+    Expired tenants are detached from their unit and the units marked vacant
+    with one UPDATE each, which drops them from the partial lease_end_date
+    index of tenants holding a unit. Each run scans that index up to
+    yesterday, so it also catches leases shortened to a past date since the
+    previous run.
+    """
+    expired = Tenant.objects.filter(lease_end_date__lt=today, unit__isnull=False)
+
+    units = dict(expired.values_list('unit_id', 'unit__property_id'))
+    if not units:
+        return 0
+    now = timezone.now()
+    vacated = expired.update(unit=None, updated_at=now)
+    # A unit shared with a tenant whose lease continues stays occupied.
+    Unit.objects.filter(id__in=units).filter(~Exists(Tenant.objects.filter(unit=OuterRef('pk')))).update(
+        is_occupied=False, updated_at=now
+    )
+    # Set-based updates skip the signals that keep the occupancy rollups current.
+    schedule_collection_refresh(property_ids=set(units.values()))
+    return vacated
+
+
+def process_lease_expiries(today=None, window_days=30):
+    """Run one pass of the lease scheduler and return what it did."""
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        notified = send_renewal_notices(today, window_days)
+        vacated = vacate_expired_leases(today)
+    logger.info(f"Lease scheduler for {today}: notified {notified} tenants, vacated {vacated} units")
+    return {'notified': notified, 'vacated': vacated}
@@ -0,0 +1,157 @@
+import logging
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import LedgerEntry, Payment, Tenant, TenantBalance
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+BALANCE_UPDATE_CHUNK = 500
+BALANCE_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _amount(value):
+    return Decimal(str(value or 0)).quantize(ZERO)
+
+
+def payment_state(payment):
+    """The part of a payment the ledger tracks: (tenant_id, amount_due, amount_paid)."""
+    return (payment.tenant_id, _amount(payment.amount_due), _amount(payment.amount_paid))
+
+
+def _entries_for_change(payment_id, previous, current):
+    if previous and current and previous[0] == current[0]:
+        changes = [(current[0], current[1] - previous[1], current[2] - previous[2])]
+    else:
+        changes = []
+        if previous:
+            changes.append((previous[0], -previous[1], -previous[2]))
+        if current:
+            changes.append((current[0], current[1], current[2]))
+
+    entries = []
+    for tenant_id, charged, received in changes:
+        if charged:
+            entries.append(LedgerEntry(
+                tenant_id=tenant_id, payment_id=payment_id, entry_type=LedgerEntry.CHARGE, amount=charged
+            ))
+        if received:
+            entries.append(LedgerEntry(
+                tenant_id=tenant_id, payment_id=payment_id, entry_type=LedgerEntry.RECEIPT, amount=received
+            ))
+    return entries
+
+
+def _apply_balance_deltas(deltas):
+    deltas = {tenant_id: delta for tenant_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    TenantBalance.objects.bulk_create(
+        [TenantBalance(tenant_id=tenant_id) for tenant_id in deltas], ignore_conflicts=True
+    )
+    items = iter(deltas.items())
+    now = timezone.now()
+    while chunk := list(islice(items, BALANCE_UPDATE_CHUNK)):
+        TenantBalance.objects.filter(tenant_id__in=[tenant_id for tenant_id, _ in chunk]).update(
+            balance=F('balance') + Case(
+                *[When(tenant_id=tenant_id, then=Value(delta)) for tenant_id, delta in chunk],
+                output_field=BALANCE_FIELD,
+            ),
+            updated_at=now,
+        )
+
+
+def record_payment_changes(changes):
+    """
+    Append ledger entries for ``(payment_id, previous_state, current_state)``
+    changes and move the affected balances by the same amounts.
+
+    A state is a :func:`payment_state` tuple, or None when the payment did
+    not exist before or no longer exists. Must run inside the transaction
+    that writes the payments; the cost is a constant number of queries per
+    500 tenants, however many payments changed.
+    """
+    entries = []
+    for payment_id, previous, current in changes:
+        entries.extend(_entries_for_change(payment_id, previous, current))
+    if not entries:
+        return 0
+    LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+    deltas = {}
+    for entry in entries:
+        deltas[entry.tenant_id] = deltas.get(entry.tenant_id, ZERO) + entry.balance_delta
+    _apply_balance_deltas(deltas)
+    return len(entries)
+
+
+def record_new_payments(payments):
+    """Ledger entries for payments inserted with bulk_create."""
+    return record_payment_changes((payment.pk, None, payment_state(payment)) for payment in payments)
+
+
+def get_tenant_balance(tenant):
+    balance = TenantBalance.objects.filter(tenant=tenant).values_list('balance', 'updated_at').first()
+    return balance or (ZERO, None)
+
+
+def verify_balances(chunk_size=1000, fix=False):
+    """
+    Recompute every tenant's balance from their payments and compare it with
+    the stored balance and the ledger, in tenant-id chunks of a few grouped
+    queries each. Yields ``(tenant_id, expected, stored, ledger)`` for every
+    tenant that drifted; with ``fix`` the stored balance is corrected and an
+    ADJUSTMENT entry appended so the ledger agrees again.
+    """
+    last_id = 0
+    while True:
+        tenant_ids = list(
+            Tenant.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not tenant_ids:
+            break
+        last_id = tenant_ids[-1]
+        expected = dict(
+            Payment.objects.filter(tenant_id__in=tenant_ids).values('tenant_id').annotate(
+                total=Sum(F('amount_due') - F('amount_paid'), output_field=BALANCE_FIELD)
+            ).order_by().values_list('tenant_id', 'total')
+        )
+        stored = dict(TenantBalance.objects.filter(tenant_id__in=tenant_ids).values_list('tenant_id', 'balance'))
+        ledger = {}
+        for tenant_id, entry_type, total in LedgerEntry.objects.filter(tenant_id__in=tenant_ids).values(
+            'tenant_id', 'entry_type'
+        ).annotate(total=Coalesce(Sum('amount'), ZERO)).order_by().values_list('tenant_id', 'entry_type', 'total'):
+            signed = -total if entry_type == LedgerEntry.RECEIPT else total
+            ledger[tenant_id] = ledger.get(tenant_id, ZERO) + signed
+
+        drifted = []
+        for tenant_id in tenant_ids:
+            row = (
+                tenant_id,
+                _amount(expected.get(tenant_id)),
+                _amount(stored.get(tenant_id)),
+                ledger.get(tenant_id, ZERO),
+            )
+            if row[1] != row[2] or row[1] != row[3]:
+                drifted.append(row)
+                yield row
+
+        if fix and drifted:
+            with transaction.atomic():
+                LedgerEntry.objects.bulk_create([
+                    LedgerEntry(
+                        tenant_id=tenant_id, entry_type=LedgerEntry.ADJUSTMENT, amount=expected_total - ledger_total
+                    )
+                    for tenant_id, expected_total, _, ledger_total in drifted
+                    if expected_total != ledger_total
+                ])
+                _apply_balance_deltas({
+                    tenant_id: expected_total - stored_total
+                    for tenant_id, expected_total, stored_total, _ in drifted
+                })
+            logger.warning(f"Corrected the balances of {len(drifted)} tenants")
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tenant.billing import generate_billing_period
+from tenant.serializers import GenerateBillingPeriodSerializer
+
+
+class Command(BaseCommand):
+    help = 'Create PENDING payments for a billing period (YYYY-MM) for every occupied unit.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('billing_period')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        serializer = GenerateBillingPeriodSerializer(data={'billing_period': options['billing_period']})
+        if not serializer.is_valid():
+            raise CommandError(serializer.errors['billing_period'][0])
+        billing_period = serializer.validated_data['billing_period']
+        started = time.monotonic()
+        created = generate_billing_period(billing_period, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} payments for {billing_period} in {elapsed:.2f}s"
+        ))
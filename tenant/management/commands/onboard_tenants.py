@@ -0,0 +1,40 @@
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tenant.onboarding import FAILED, onboard_tenants, read_onboarding_csv
+
+
+class Command(BaseCommand):
+    help = 'Create tenant users and profiles in bulk from a CSV or JSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row, or a JSON file holding a list of objects.')
+        parser.add_argument('--report', help='Write the failed rows and their errors to this CSV file.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes (default: CPU count).')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with open(options['path'], newline='', encoding='utf-8-sig') as source:
+            if options['path'].endswith('.json'):
+                rows = json.load(source)
+                if not isinstance(rows, list):
+                    raise CommandError('The JSON file must hold a list of tenants.')
+            else:
+                rows = read_onboarding_csv(source)
+        summary = onboard_tenants(rows, batch_size=options['batch_size'], workers=options['workers'])
+        if options['report']:
+            with open(options['report'], 'w', newline='') as report_file:
+                writer = csv.DictWriter(report_file, fieldnames=['line', 'errors'])
+                writer.writeheader()
+                for entry in summary['report']:
+                    if entry['status'] == FAILED:
+                        writer.writerow({'line': entry['line'], 'errors': json.dumps(entry['errors'])})
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Onboarded {summary['created']} of {summary['rows']} tenants in {elapsed:.2f}s, "
+            f"{summary['failed']} rows failed"
+        ))
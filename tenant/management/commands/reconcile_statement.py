@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tenant.reconciliation import DEFAULT_COLUMNS, reconcile_statement
+
+
+class Command(BaseCommand):
+    help = (
+        'Match an M-Pesa/bank CSV statement against pending payments and mark '
+        'matched payments as completed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement', help='Path to the CSV statement file.')
+        parser.add_argument('--report', help='Write unmatched, ambiguous and invalid rows to this CSV file.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Match rows without updating payments.')
+        for field, column in DEFAULT_COLUMNS.items():
+            parser.add_argument(
+                f"--{field.replace('_', '-')}-column", dest=f'{field}_column', default=column,
+                help=f'Statement column holding the {field.replace("_", " ")} (default: "{column}").'
+            )
+
+    def handle(self, *args, **options):
+        columns = {field: options[f'{field}_column'] for field in DEFAULT_COLUMNS}
+        started = time.monotonic()
+        report_file = open(options['report'], 'w', newline='') if options['report'] else None
+        try:
+            with open(options['statement'], newline='', encoding='utf-8-sig') as statement:
+                summary = reconcile_statement(
+                    statement,
+                    report_file=report_file,
+                    columns=columns,
+                    chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'],
+                )
+        finally:
+            if report_file is not None:
+                report_file.close()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {summary['rows']} rows in {elapsed:.2f}s: {summary['matched']} matched, "
+            f"{summary['unmatched']} unmatched, {summary['ambiguous']} ambiguous, {summary['invalid']} invalid"
+            + (' (dry run)' if options['dry_run'] else '')
+        ))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tenant.leases import process_lease_expiries
+
+
+class Command(BaseCommand):
+    help = (
+        'Send renewal notices for leases ending soon and vacate the units of expired leases, '
+        'repeating every --interval seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-days', type=int, default=30, help='Notify tenants this many days ahead.')
+        parser.add_argument('--interval', type=int, default=3600, help='Seconds between runs.')
+        parser.add_argument('--once', action='store_true', help='Run a single pass and exit.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            result = process_lease_expiries(window_days=options['window_days'])
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"Notified {result['notified']} tenants and vacated {result['vacated']} leases in {elapsed:.2f}s"
+            ))
+            if options['once']:
+                break
+            time.sleep(options['interval'])
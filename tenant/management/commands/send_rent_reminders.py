@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tenant.reminders import send_rent_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        'Remind tenants who have not paid the current billing period in full, once per period, '
+        'repeating every --interval seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', help='Billing period (YYYY-MM); defaults to the current one.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Tenants per transaction.')
+        parser.add_argument(
+            '--time-budget', type=float, default=300, help='Seconds a run may take before it stops between chunks.'
+        )
+        parser.add_argument('--interval', type=int, default=3600, help='Seconds between runs.')
+        parser.add_argument('--once', action='store_true', help='Run a single pass and exit.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            result = send_rent_reminders(
+                billing_period=options['period'],
+                chunk_size=options['chunk_size'],
+                time_budget=options['time_budget'],
+            )
+            elapsed = time.monotonic() - started
+            message = f"Reminded {result['reminded']} tenants about {result['billing_period']} in {elapsed:.2f}s"
+            if result['complete']:
+                self.stdout.write(self.style.SUCCESS(message))
+            else:
+                self.stdout.write(self.style.WARNING(f"{message}; stopped at the time budget"))
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tenant.ledger import verify_balances
+
+
+class Command(BaseCommand):
+    help = 'Recompute tenant balances from payments and report drift in the stored balances and ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--fix', action='store_true', help='Correct drifted balances with adjustment entries.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        drifted = 0
+        for tenant_id, expected, stored, ledger in verify_balances(
+            chunk_size=options['chunk_size'], fix=options['fix']
+        ):
+            drifted += 1
+            self.stdout.write(f"Tenant {tenant_id}: expected {expected}, stored {stored}, ledger {ledger}")
+        elapsed = time.monotonic() - started
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(f"All balances match ({elapsed:.2f}s)"))
+        elif options['fix']:
+            self.stdout.write(self.style.WARNING(f"Corrected {drifted} drifted balances in {elapsed:.2f}s"))
+        else:
+            self.stdout.write(self.style.ERROR(f"Found {drifted} drifted balances in {elapsed:.2f}s"))
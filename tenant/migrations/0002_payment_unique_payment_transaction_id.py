@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+def blank_transaction_ids_to_null(apps, schema_editor):
+    Payment = apps.get_model('tenant', 'Payment')
+    Payment.objects.filter(transaction_id='').update(transaction_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0001_initial'),
+        ('tenant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_transaction_ids_to_null, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('transaction_id__isnull', False), models.Q(('transaction_id', ''), _negated=True)), fields=('transaction_id',), name='unique_payment_transaction_id'),
+        ),
+    ]
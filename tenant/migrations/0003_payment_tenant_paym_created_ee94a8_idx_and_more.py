@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0002_unit_property_un_created_bbc44b_idx'),
+        ('tenant', '0002_payment_unique_payment_transaction_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['created_at', 'id'], name='tenant_paym_created_ee94a8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tenant',
+            index=models.Index(fields=['created_at', 'id'], name='tenant_tena_created_75e7f1_idx'),
+        ),
+    ]
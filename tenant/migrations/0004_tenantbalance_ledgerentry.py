@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_ledger(apps, schema_editor):
+    Payment = apps.get_model('tenant', 'Payment')
+    LedgerEntry = apps.get_model('tenant', 'LedgerEntry')
+    TenantBalance = apps.get_model('tenant', 'TenantBalance')
+    balances = {}
+    entries = []
+    for payment_id, tenant_id, amount_due, amount_paid in Payment.objects.order_by('id').values_list(
+        'id', 'tenant_id', 'amount_due', 'amount_paid'
+    ).iterator():
+        if amount_due:
+            entries.append(LedgerEntry(
+                tenant_id=tenant_id, payment_id=payment_id, entry_type='CHARGE', amount=amount_due
+            ))
+        if amount_paid:
+            entries.append(LedgerEntry(
+                tenant_id=tenant_id, payment_id=payment_id, entry_type='RECEIPT', amount=amount_paid
+            ))
+        balances[tenant_id] = balances.get(tenant_id, 0) + amount_due - amount_paid
+        if len(entries) >= 1000:
+            LedgerEntry.objects.bulk_create(entries)
+            entries = []
+    LedgerEntry.objects.bulk_create(entries)
+    TenantBalance.objects.bulk_create(
+        [TenantBalance(tenant_id=tenant_id, balance=balance) for tenant_id, balance in balances.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenant', '0003_payment_tenant_paym_created_ee94a8_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantBalance',
+            fields=[
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance', serialize=False, to='tenant.tenant', verbose_name='tenant')),
+                ('balance', models.DecimalField(decimal_places=2, default=0, help_text='Amount the tenant owes; negative when in credit', max_digits=14, verbose_name='balance')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'tenant balance',
+                'verbose_name_plural': 'tenant balances',
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('CHARGE', 'Charge'), ('RECEIPT', 'Receipt'), ('ADJUSTMENT', 'Adjustment')], max_length=10, verbose_name='entry type')),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Signed amount; negative values reverse an earlier entry', max_digits=14, verbose_name='amount')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='ledger_entries', to='tenant.payment', verbose_name='payment')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='tenant.tenant', verbose_name='tenant')),
+            ],
+            options={
+                'verbose_name': 'ledger entry',
+                'verbose_name_plural': 'ledger entries',
+                'indexes': [models.Index(fields=['tenant', 'id'], name='tenant_ledg_tenant__8f1cd3_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
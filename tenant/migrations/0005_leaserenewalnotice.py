@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_stats', '0001_initial'),
+        ('property', '0003_property_manager_propertyaccess'),
+        ('tenant', '0004_tenantbalance_ledgerentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaseRenewalNotice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lease_end_date', models.DateField(verbose_name='lease end date')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notification', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='renewal_notices', to='dashboard_stats.notification')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renewal_notices', to='tenant.tenant')),
+            ],
+            options={
+                'verbose_name': 'lease renewal notice',
+                'verbose_name_plural': 'lease renewal notices',
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'lease_end_date'), name='unique_renewal_notice_per_end_date')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tenant',
+            index=models.Index(condition=models.Q(('unit__isnull', False)), fields=['lease_end_date', 'id'], name='tenant_active_lease_end_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0003_property_manager_propertyaccess'),
+        ('tenant', '0005_leaserenewalnotice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisitEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.UUIDField(unique=True, verbose_name='event id')),
+                ('event_type', models.CharField(choices=[('CHECK_IN', 'Check-in'), ('CHECK_OUT', 'Check-out')], max_length=10, verbose_name='event type')),
+                ('occurred_at', models.DateTimeField(verbose_name='occurred at')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'visit event',
+                'verbose_name_plural': 'visit events',
+            },
+        ),
+        migrations.AddField(
+            model_name='visitor',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='visitor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='visitor',
+            index=models.Index(fields=['created_at', 'id'], name='tenant_visi_created_f91f0f_idx'),
+        ),
+        migrations.AddField(
+            model_name='visitevent',
+            name='unit',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visit_events', to='property.unit', verbose_name='unit'),
+        ),
+        migrations.AddField(
+            model_name='visitevent',
+            name='visitor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='tenant.visitor', verbose_name='visitor'),
+        ),
+        migrations.AddIndex(
+            model_name='visitevent',
+            index=models.Index(fields=['occurred_at', 'id'], name='tenant_visi_occurre_ae9212_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitevent',
+            index=models.Index(fields=['unit', 'occurred_at'], name='tenant_visi_unit_id_97942d_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_stats', '0005_unreadnotificationcount'),
+        ('tenant', '0006_visitevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('billing_period', models.CharField(max_length=7, verbose_name='billing period')),
+                ('amount_outstanding', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='amount outstanding')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notification', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rent_reminders', to='dashboard_stats.notification')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rent_reminders', to='tenant.tenant')),
+            ],
+            options={
+                'verbose_name': 'rent reminder',
+                'verbose_name_plural': 'rent reminders',
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'billing_period'), name='unique_rent_reminder_per_period')],
+            },
+        ),
+    ]
@@ -1,10 +1,30 @@
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
 from a_users.models import CustomUser
-from property.models import Unit
+from property.models import Unit, accessible_property_ids
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator
 
+class TenantQuerySet(models.QuerySet):
+    def for_user(self, user):
+        if user.role == 'admin':
+            return self
+        if user.role == 'tenant':
+            return self.filter(user_id=user.pk)
+        return self.filter(unit__property_id__in=accessible_property_ids(user))
+
+
+class UnitScopedQuerySet(models.QuerySet):
+    """Role scoping for records that belong to a tenant and a unit."""
+
+    def for_user(self, user):
+        if user.role == 'admin':
+            return self
+        if user.role == 'tenant':
+            return self.filter(tenant__user_id=user.pk)
+        return self.filter(unit__property_id__in=accessible_property_ids(user))
+
+
 class Tenant(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, limit_choices_to={'role': 'tenant'}, related_name='tenant_profile')
     unit = models.ForeignKey(Unit, on_delete=models.SET_NULL, null=True, blank=True, related_name='tenants')
@@ -13,9 +33,19 @@ class Tenant(models.Model):
     lease_end_date = models.DateField(_('lease end date'), null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TenantQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('tenant')
         verbose_name_plural = _('tenants')
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            # Leases that still hold a unit, scanned by the lease scheduler.
+            models.Index(
+                fields=['lease_end_date', 'id'], condition=models.Q(unit__isnull=False), name='tenant_active_lease_end_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.unit.unit_number if self.unit else 'No Unit'}"
@@ -37,14 +67,66 @@ class Visitor(models.Model):
     )
     visitor_name = models.CharField(_('visitor name'), max_length=255)
     email = models.EmailField(_('email address'), blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = UnitScopedQuerySet.as_manager()
 
     class Meta:
         verbose_name = _('visitor')
         verbose_name_plural = _('visitors')
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.visitor_name} (ID: {self.id})"
-    
+
+
+class VisitEventQuerySet(models.QuerySet):
+    def for_user(self, user):
+        if user.role == 'admin':
+            return self
+        if user.role == 'tenant':
+            return self.filter(visitor__tenant__user_id=user.pk)
+        return self.filter(unit__property_id__in=accessible_property_ids(user))
+
+
+class VisitEvent(models.Model):
+    """
+    A check-in or check-out logged by a gate device. ``event_id`` is
+    generated on the device, so re-sending a batch after a lost response or
+    an offline period does not log the same event twice.
+    """
+    CHECK_IN = 'CHECK_IN'
+    CHECK_OUT = 'CHECK_OUT'
+    EVENT_TYPES = (
+        (CHECK_IN, _('Check-in')),
+        (CHECK_OUT, _('Check-out')),
+    )
+
+    event_id = models.UUIDField(_('event id'), unique=True)
+    visitor = models.ForeignKey(Visitor, on_delete=models.CASCADE, related_name='events', verbose_name=_('visitor'))
+    # Copied from the visitor so events can be scoped and ranged by unit without a join.
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='visit_events', verbose_name=_('unit'))
+    event_type = models.CharField(_('event type'), max_length=10, choices=EVENT_TYPES)
+    occurred_at = models.DateTimeField(_('occurred at'))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = VisitEventQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('visit event')
+        verbose_name_plural = _('visit events')
+        indexes = [
+            models.Index(fields=['occurred_at', 'id']),
+            models.Index(fields=['unit', 'occurred_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_event_type_display()} of visitor {self.visitor_id} at {self.occurred_at}"
+
+
 class Payment(models.Model):
     PAYMENT_METHODS = (
         ('CASH', _('Cash')),
@@ -122,6 +204,8 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UnitScopedQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('payment')
         verbose_name_plural = _('payments')
@@ -129,6 +213,7 @@ class Payment(models.Model):
             models.Index(fields=['tenant', 'billing_period']),
             models.Index(fields=['unit', 'billing_period']),
             models.Index(fields=['payment_status']),
+            models.Index(fields=['created_at', 'id']),
         ]
         constraints = [
             models.CheckConstraint(
@@ -139,6 +224,11 @@ class Payment(models.Model):
                 check=models.Q(amount_paid__gte=0),
                 name='amount_paid_non_negative'
             ),
+            models.UniqueConstraint(
+                fields=['transaction_id'],
+                condition=models.Q(transaction_id__isnull=False) & ~models.Q(transaction_id=''),
+                name='unique_payment_transaction_id'
+            ),
         ]
 
     def __str__(self):
@@ -148,9 +238,147 @@ class Payment(models.Model):
     
     
 
-    def save(self, *args, **kwargs):
+    def set_payment_date(self):
         if self.payment_status == 'COMPLETED' and not self.payment_date:
             self.payment_date = timezone.now()
         elif self.payment_status != 'COMPLETED':
             self.payment_date = None
-        super().save(*args, **kwargs)
\ No newline at end of file
+
+    def save(self, *args, **kwargs):
+        self.set_payment_date()
+        # The ledger entries written by the post_save signal commit or roll
+        # back together with the payment.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class LedgerEntry(models.Model):
+    """
+    Append-only record of what a tenant was charged and what they paid.
+
+    Every change to a payment's amounts appends the difference, so the sum of
+    a tenant's charges minus receipts always equals their balance.
+    """
+    CHARGE = 'CHARGE'
+    RECEIPT = 'RECEIPT'
+    ADJUSTMENT = 'ADJUSTMENT'
+    ENTRY_TYPES = (
+        (CHARGE, _('Charge')),
+        (RECEIPT, _('Receipt')),
+        (ADJUSTMENT, _('Adjustment')),
+    )
+
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        related_name='ledger_entries',
+        verbose_name=_('tenant')
+    )
+    # Entries outlive the payment they were written for.
+    payment = models.ForeignKey(
+        Payment,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='ledger_entries',
+        verbose_name=_('payment')
+    )
+    entry_type = models.CharField(_('entry type'), max_length=10, choices=ENTRY_TYPES)
+    amount = models.DecimalField(
+        _('amount'),
+        max_digits=14,
+        decimal_places=2,
+        help_text=_('Signed amount; negative values reverse an earlier entry')
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('ledger entry')
+        verbose_name_plural = _('ledger entries')
+        indexes = [
+            models.Index(fields=['tenant', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.entry_type} {self.amount} for tenant {self.tenant_id}"
+
+    @property
+    def balance_delta(self):
+        return -self.amount if self.entry_type == self.RECEIPT else self.amount
+
+
+class TenantBalance(models.Model):
+    """Running balance of a tenant, maintained alongside the ledger."""
+    tenant = models.OneToOneField(
+        Tenant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='balance',
+        verbose_name=_('tenant')
+    )
+    balance = models.DecimalField(
+        _('balance'),
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text=_('Amount the tenant owes; negative when in credit')
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('tenant balance')
+        verbose_name_plural = _('tenant balances')
+
+    def __str__(self):
+        return f"Tenant {self.tenant_id}: {self.balance}"
+
+
+class LeaseRenewalNotice(models.Model):
+    """Marks a tenant as notified about a lease end date, so each end date is notified once."""
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='renewal_notices')
+    lease_end_date = models.DateField(_('lease end date'))
+    notification = models.ForeignKey(
+        'dashboard_stats.Notification',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='renewal_notices'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('lease renewal notice')
+        verbose_name_plural = _('lease renewal notices')
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'lease_end_date'], name='unique_renewal_notice_per_end_date'),
+        ]
+
+    def __str__(self):
+        return f"Tenant {self.tenant_id} notified of the lease ending {self.lease_end_date}"
+
+
+
+class RentReminder(models.Model):
+    """Marks a tenant as reminded about a billing period, so each period is reminded once."""
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='rent_reminders')
+    billing_period = models.CharField(_('billing period'), max_length=7)
+    notification = models.ForeignKey(
+        'dashboard_stats.Notification',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='rent_reminders'
+    )
+    amount_outstanding = models.DecimalField(_('amount outstanding'), max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('rent reminder')
+        verbose_name_plural = _('rent reminders')
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'billing_period'], name='unique_rent_reminder_per_period'),
+        ]
+
+    def __str__(self):
+        return f"Tenant {self.tenant_id} reminded for {self.billing_period}"
@@ -0,0 +1,224 @@
+import csv
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models.functions import Now
+from rest_framework import serializers
+
+from a_users.models import CustomUser
+from dashboard_stats.rollups import schedule_collection_refresh
+from property.models import Unit
+from .models import Tenant
+
+logger = logging.getLogger(__name__)
+
+ONBOARDING_FIELDS = [
+    'username', 'email', 'password', 'first_name', 'last_name', 'phone_number',
+    'unit', 'lease_start_date', 'lease_end_date',
+]
+CREATED = 'created'
+# Password hashing processes an onboarding request may start; the
+# onboard_tenants command uses every CPU.
+ONBOARDING_REQUEST_WORKERS = 2
+FAILED = 'failed'
+
+
+class TenantOnboardingRowSerializer(serializers.Serializer):
+    """Field-level checks of one onboarding row; they run without queries."""
+    username = serializers.CharField(max_length=150)
+    email = serializers.EmailField()
+    password = serializers.CharField()
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    phone_number = serializers.CharField(max_length=15, required=False, allow_blank=True, allow_null=True, default=None)
+    unit = serializers.IntegerField(required=False, allow_null=True, default=None)
+    lease_start_date = serializers.DateField(required=False, allow_null=True, default=None)
+    lease_end_date = serializers.DateField(required=False, allow_null=True, default=None)
+
+    def to_internal_value(self, data):
+        # CSV cells are always strings, so treat empty cells as missing.
+        data = {key: value for key, value in data.items() if value not in ('', None)}
+        return super().to_internal_value(data)
+
+    def validate(self, data):
+        data['email'] = CustomUser.objects.normalize_email(data['email'])
+        data['phone_number'] = data['phone_number'] or None
+        start, end = data['lease_start_date'], data['lease_end_date']
+        if start and end and end < start:
+            raise serializers.ValidationError({'lease_end_date': 'Lease end date is before the start date.'})
+        return data
+
+
+def _init_hasher():
+    # Spawned workers start without Django configured; forked ones already are.
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None, pool_threshold=2):
+    """
+    Hash passwords with the configured hasher. PBKDF2 is CPU-bound, so lists
+    of at least ``pool_threshold`` passwords are hashed in a pool of worker
+    processes; below that, starting the pool costs more than it saves.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < max(pool_threshold, 2):
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hasher) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def read_onboarding_csv(file_obj):
+    return list(csv.DictReader(file_obj))
+
+
+class TenantOnboarding:
+    """
+    Create tenant users and their tenant profiles from a list of row dicts.
+
+    Rows are validated in memory against values loaded with one query per
+    unique field and one ``in_bulk`` for the units. Invalid rows are reported
+    and skipped instead of failing the import. Passwords of the valid rows
+    are hashed in a process pool once there are at least ``batch_size`` of
+    them. Users and tenants are inserted with
+    ``bulk_create`` in batches, and the assigned units are claimed with a
+    single compare-and-set UPDATE, all in one transaction. Rows whose unit
+    was taken by a concurrent assignment in the meantime are reported.
+    """
+
+    def __init__(self, units=None, batch_size=500, workers=None):
+        self.units = units if units is not None else Unit.objects.all()
+        self.batch_size = batch_size
+        self.workers = workers
+
+    def run(self, rows):
+        report = []
+        valid = []
+        for line, raw in enumerate(rows, start=1):
+            serializer = TenantOnboardingRowSerializer(data=raw if isinstance(raw, dict) else {})
+            if serializer.is_valid():
+                valid.append((line, serializer.validated_data))
+            else:
+                report.append({'line': line, 'status': FAILED, 'errors': serializer.errors})
+
+        valid = self._check_conflicts(valid, report)
+        created = self._create(valid, report) if valid else []
+        report.sort(key=lambda entry: entry['line'])
+        summary = {'rows': len(report), CREATED: len(created), FAILED: len(report) - len(created), 'report': report}
+        logger.info(f"Onboarded {len(created)} tenants, {summary[FAILED]} rows failed")
+        return summary
+
+    def _check_conflicts(self, valid, report):
+        taken = {
+            field: set(CustomUser.objects.filter(**{f'{field}__in': values}).values_list(field, flat=True))
+            for field in ('email', 'username', 'phone_number')
+            if (values := {data[field] for _, data in valid if data[field]})
+        }
+        units = self.units.in_bulk({data['unit'] for _, data in valid if data['unit']})
+
+        accepted = []
+        for line, data in valid:
+            errors = {}
+            for field, values in taken.items():
+                if data[field] and data[field] in values:
+                    errors[field] = [f'A user with this {field.replace("_", " ")} already exists.']
+            unit = units.get(data['unit']) if data['unit'] else None
+            if data['unit'] and unit is None:
+                errors['unit'] = [f'Invalid pk "{data["unit"]}" - object does not exist.']
+            elif unit is not None and unit.is_occupied:
+                errors['unit'] = ['This unit is already occupied.']
+            if errors:
+                report.append({'line': line, 'status': FAILED, 'errors': errors})
+                continue
+            # Later rows must not reuse what an earlier row of the file claimed.
+            for field in ('email', 'username', 'phone_number'):
+                if data[field]:
+                    taken.setdefault(field, set()).add(data[field])
+            if unit is not None:
+                unit.is_occupied = True
+            data['unit'] = unit
+            accepted.append((line, data))
+        return accepted
+
+    def _create(self, valid, report):
+        hashes = hash_passwords(
+            [data['password'] for _, data in valid], workers=self.workers, pool_threshold=self.batch_size
+        )
+        with transaction.atomic():
+            lost = self._claim_units([data['unit'] for _, data in valid if data['unit'] is not None])
+            if lost:
+                accepted = []
+                for (line, data), password_hash in zip(valid, hashes):
+                    if data['unit'] is not None and data['unit'].id in lost:
+                        report.append({'line': line, 'status': FAILED, 'errors': {
+                            'unit': ['This unit is already occupied.'],
+                        }})
+                    else:
+                        accepted.append(((line, data), password_hash))
+                valid = [row for row, _ in accepted]
+                hashes = [password_hash for _, password_hash in accepted]
+            tenants = self._insert(valid, hashes)
+
+        for (line, _), tenant in zip(valid, tenants):
+            report.append({'line': line, 'status': CREATED, 'tenant': tenant.id, 'user': tenant.user_id})
+        return tenants
+
+    def _claim_units(self, units):
+        """
+        Mark the units occupied, only where they are still vacant, and return
+        the ids of those a concurrent assignment took since they were checked.
+
+        One UPDATE claims them all. If it matches fewer rows than there are
+        units it is rolled back to a savepoint, and the units are claimed one
+        by one with ``Unit.objects.claim`` to find the ones that were lost.
+        """
+        if not units:
+            return set()
+        unit_ids = [unit.id for unit in units]
+        savepoint = transaction.savepoint()
+        claimed = Unit.objects.filter(id__in=unit_ids, is_occupied=False).update(is_occupied=True, updated_at=Now())
+        if claimed == len(unit_ids):
+            transaction.savepoint_commit(savepoint)
+            lost = set()
+        else:
+            transaction.savepoint_rollback(savepoint)
+            lost = {unit_id for unit_id in unit_ids if not Unit.objects.claim(unit_id)}
+        # Bulk writes skip the signals that keep the occupancy rollups current.
+        schedule_collection_refresh(property_ids={unit.property_id for unit in units})
+        return lost
+
+    def _insert(self, valid, hashes):
+        users = [
+            CustomUser(
+                email=data['email'],
+                username=data['username'],
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                phone_number=data['phone_number'],
+                role='tenant',
+                password=password_hash,
+            )
+            for (_, data), password_hash in zip(valid, hashes)
+        ]
+        tenants = []
+        for start in range(0, len(users), self.batch_size):
+            batch = CustomUser.objects.bulk_create(users[start:start + self.batch_size])
+            tenants.extend(Tenant.objects.bulk_create([
+                Tenant(
+                    user=user,
+                    unit=data['unit'],
+                    lease_start_date=data['lease_start_date'],
+                    lease_end_date=data['lease_end_date'],
+                )
+                for user, (_, data) in zip(batch, valid[start:start + self.batch_size])
+            ]))
+        return tenants
+
+
+def onboard_tenants(rows, **options):
+    """Onboard tenants from row dicts (parsed CSV or JSON) and return the summary."""
+    return TenantOnboarding(**options).run(rows)
@@ -0,0 +1,195 @@
+import csv
+import logging
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from dashboard_stats.rollups import schedule_collection_refresh
+from .ledger import payment_state, record_payment_changes
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+# Column names of an M-Pesa statement export; override per bank as needed.
+DEFAULT_COLUMNS = {
+    'transaction_id': 'Receipt No.',
+    'amount': 'Paid In',
+    'phone': 'Phone Number',
+    'date': 'Completion Time',
+}
+DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%Y-%m-%d')
+REPORT_FIELDS = ['line', 'status', 'reason', 'transaction_id', 'amount', 'phone', 'date']
+
+MATCHED = 'matched'
+UNMATCHED = 'unmatched'
+AMBIGUOUS = 'ambiguous'
+INVALID = 'invalid'
+
+
+def normalize_phone(value):
+    """Return a phone number in the local 07XXXXXXXX form used by CustomUser."""
+    digits = re.sub(r'\D', '', value or '')
+    if digits.startswith('254') and len(digits) == 12:
+        return '0' + digits[3:]
+    if len(digits) == 9:
+        return '0' + digits
+    return digits or None
+
+
+def _parse_amount(value):
+    try:
+        return Decimal((value or '').replace(',', '').strip())
+    except InvalidOperation:
+        return None
+
+
+def _parse_date(value):
+    value = (value or '').strip()
+    for date_format in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+    return None
+
+
+class StatementReconciler:
+    """
+    Match statement rows to PENDING payments, one bounded chunk at a time.
+
+    Rows are matched on transaction_id first, then on the tenant's phone
+    number plus the outstanding amount. Each chunk costs a constant number of
+    queries (two lookups and one bulk update) and runs in its own short
+    transaction; unmatched, ambiguous and invalid rows are written to the
+    report writer as they are found.
+    """
+
+    def __init__(self, columns=None, chunk_size=1000, report_writer=None, dry_run=False):
+        self.columns = {**DEFAULT_COLUMNS, **(columns or {})}
+        self.chunk_size = chunk_size
+        self.report_writer = report_writer
+        self.dry_run = dry_run
+        self.summary = {'rows': 0, MATCHED: 0, UNMATCHED: 0, AMBIGUOUS: 0, INVALID: 0}
+
+    def reconcile(self, file_obj):
+        reader = csv.DictReader(file_obj)
+        # Line 1 is the header.
+        lines = enumerate(reader, start=2)
+        while True:
+            chunk = list(islice(lines, self.chunk_size))
+            if not chunk:
+                break
+            self._reconcile_chunk(chunk)
+        logger.info(f"Statement reconciliation finished: {self.summary}")
+        return self.summary
+
+    def _parse(self, line, raw):
+        row = {
+            'line': line,
+            'transaction_id': (raw.get(self.columns['transaction_id']) or '').strip() or None,
+            'amount': _parse_amount(raw.get(self.columns['amount'])),
+            'phone': normalize_phone(raw.get(self.columns['phone'])),
+            'date': _parse_date(raw.get(self.columns['date'])),
+        }
+        if row['amount'] is None or row['amount'] <= 0 or row['date'] is None:
+            return row, 'Missing or unreadable amount or date'
+        if not row['transaction_id'] and not row['phone']:
+            return row, 'Row has neither a transaction ID nor a phone number'
+        return row, None
+
+    def _report(self, row, status, reason):
+        self.summary[status] += 1
+        if self.report_writer is not None:
+            self.report_writer.writerow({
+                'line': row['line'],
+                'status': status,
+                'reason': reason,
+                'transaction_id': row['transaction_id'] or '',
+                'amount': '' if row['amount'] is None else row['amount'],
+                'phone': row['phone'] or '',
+                'date': row['date'].isoformat() if row['date'] else '',
+            })
+
+    def _reconcile_chunk(self, chunk):
+        rows = []
+        for line, raw in chunk:
+            self.summary['rows'] += 1
+            row, error = self._parse(line, raw)
+            if error:
+                self._report(row, INVALID, error)
+            else:
+                rows.append(row)
+
+        transaction_ids = {row['transaction_id'] for row in rows if row['transaction_id']}
+        by_transaction_id = {
+            payment.transaction_id: payment
+            for payment in Payment.objects.filter(transaction_id__in=transaction_ids).select_related('unit')
+        }
+        phones = {row['phone'] for row in rows if row['phone']}
+        by_phone_amount = {}
+        for payment in Payment.objects.filter(
+            tenant__user__phone_number__in=phones, payment_status='PENDING'
+        ).select_related('unit').annotate(phone=F('tenant__user__phone_number')):
+            key = (payment.phone, payment.amount_due - payment.amount_paid)
+            by_phone_amount.setdefault(key, []).append(payment)
+
+        matched = {}
+        updated = []
+        previous_states = {}
+        for row in rows:
+            payment = by_transaction_id.get(row['transaction_id'])
+            if payment is not None and payment.payment_status != 'PENDING':
+                self._report(row, UNMATCHED, f'Payment {payment.pk} is already {payment.payment_status}')
+                continue
+            if payment is None:
+                candidates = [
+                    candidate for candidate in by_phone_amount.get((row['phone'], row['amount']), [])
+                    if candidate.pk not in matched
+                ]
+                if len(candidates) > 1:
+                    self._report(row, AMBIGUOUS, f'{len(candidates)} pending payments match phone and amount')
+                    continue
+                payment = candidates[0] if candidates else None
+            if payment is None:
+                self._report(row, UNMATCHED, 'No pending payment matches')
+                continue
+            if payment.pk in matched:
+                self._report(row, AMBIGUOUS, f'Payment {payment.pk} already matched on line {matched[payment.pk]}')
+                continue
+            matched[payment.pk] = row['line']
+            updated.append(payment)
+            previous_states[payment.pk] = payment_state(payment)
+            payment.amount_paid += row['amount']
+            payment.payment_status = 'COMPLETED'
+            payment.payment_method = 'MPESA'
+            payment.payment_date = row['date']
+            payment.transaction_id = payment.transaction_id or row['transaction_id']
+            self.summary[MATCHED] += 1
+
+        if updated and not self.dry_run:
+            with transaction.atomic():
+                Payment.objects.bulk_update(
+                    updated,
+                    ['amount_paid', 'payment_status', 'payment_method', 'payment_date', 'transaction_id'],
+                )
+                record_payment_changes(
+                    (payment.pk, previous_states[payment.pk], payment_state(payment)) for payment in updated
+                )
+                schedule_collection_refresh(
+                    keys={(payment.unit.property_id, payment.billing_period) for payment in updated}
+                )
+
+
+def reconcile_statement(file_obj, report_file=None, **options):
+    """Reconcile a CSV statement file, optionally writing a CSV report."""
+    report_writer = None
+    if report_file is not None:
+        report_writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS)
+        report_writer.writeheader()
+    return StatementReconciler(report_writer=report_writer, **options).reconcile(file_obj)
@@ -0,0 +1,100 @@
+import logging
+import time
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, Exists, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from dashboard_stats.models import Notification, NotificationDelivery
+from dashboard_stats.notifications import record_deliveries
+from dashboard_stats.rollups import current_billing_period
+from .models import Payment, RentReminder, Tenant
+
+logger = logging.getLogger(__name__)
+
+REMINDER_MESSAGE = 'Your rent for {period} is due. Amount outstanding: Ksh {amount:,.2f}.'
+AMOUNT_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+
+def unpaid_tenants(billing_period):
+    """
+    Tenants with a unit who owe rent for the billing period and have not
+    been reminded about it, annotated with ``outstanding``.
+
+    What a tenant owes is the sum of amount_due - amount_paid of their
+    payments for the period, from one correlated aggregate on the
+    (tenant, billing_period) index. A tenant without a payment for the period
+    owes the unit's rent, unless the unit was billed to a co-tenant.
+    """
+    balance = Payment.objects.filter(tenant=OuterRef('pk'), billing_period=billing_period).order_by().values(
+        'tenant'
+    ).annotate(total=Sum(F('amount_due') - F('amount_paid'), output_field=AMOUNT_FIELD)).values('total')
+    unit_billed = Exists(Payment.objects.filter(unit=OuterRef('unit'), billing_period=billing_period))
+    return Tenant.objects.filter(unit__isnull=False).filter(
+        ~Exists(RentReminder.objects.filter(tenant=OuterRef('pk'), billing_period=billing_period))
+    ).annotate(
+        outstanding=Coalesce(
+            Subquery(balance, output_field=AMOUNT_FIELD),
+            Case(When(unit_billed, then=Value(0)), default=F('unit__monthly_rent'), output_field=AMOUNT_FIELD),
+        )
+    ).filter(outstanding__gt=0)
+
+
+def _remind(billing_period, rows):
+    # Tenants who owe the same amount share one notification.
+    by_amount = {}
+    for tenant_id, user_id, outstanding in rows:
+        by_amount.setdefault(outstanding, []).append((tenant_id, user_id))
+    notifications = Notification.objects.bulk_create([
+        Notification(message=REMINDER_MESSAGE.format(period=billing_period, amount=amount)) for amount in by_amount
+    ])
+    record_deliveries([
+        NotificationDelivery(notification=notification, user_id=user_id, created_at=notification.timestamp)
+        for notification, tenants in zip(notifications, by_amount.values())
+        for _, user_id in tenants
+    ])
+    RentReminder.objects.bulk_create(
+        [
+            RentReminder(
+                tenant_id=tenant_id, billing_period=billing_period,
+                notification=notification, amount_outstanding=amount,
+            )
+            for notification, (amount, tenants) in zip(notifications, by_amount.items())
+            for tenant_id, _ in tenants
+        ],
+        batch_size=1000,
+    )
+
+
+def send_rent_reminders(billing_period=None, chunk_size=1000, time_budget=None):
+    """
+    Remind every tenant who has not paid the billing period in full, once.
+
+    Unpaid tenants are read in tenant-id keyset chunks of ``chunk_size``,
+    and each chunk's notifications, deliveries and RentReminder rows are
+    written in bulk in one short transaction. When ``time_budget`` seconds
+    have passed the run stops between chunks; since reminded tenants drop
+    out of :func:`unpaid_tenants`, the next run carries on where it left off.
+    """
+    billing_period = billing_period or current_billing_period()
+    deadline = time.monotonic() + time_budget if time_budget else None
+    candidates = unpaid_tenants(billing_period).order_by('id').values_list('id', 'user_id', 'outstanding')
+    reminded = 0
+    complete = True
+    last_id = 0
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            complete = False
+            break
+        rows = list(candidates.filter(id__gt=last_id)[:chunk_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        with transaction.atomic():
+            _remind(billing_period, rows)
+        reminded += len(rows)
+    logger.info(
+        f"Sent rent reminders for {billing_period} to {reminded} tenants"
+        f"{'' if complete else ', stopped at the time budget'}"
+    )
+    return {'billing_period': billing_period, 'reminded': reminded, 'complete': complete}
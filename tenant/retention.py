@@ -0,0 +1,59 @@
+import csv
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Visitor
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = ['id', 'tenant_id', 'unit_id', 'visitor_name', 'email', 'created_at', 'updated_at']
+
+
+def visitor_retention_cutoff(now=None, days=None):
+    days = settings.VISITOR_RETENTION_DAYS if days is None else days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def purge_visitors(cutoff=None, chunk_size=1000, archive=None, dry_run=False):
+    """
+    Delete visitors created before ``cutoff`` along with their gate events.
+
+    The expired rows are walked in primary-key ranges of ``chunk_size`` ids,
+    each deleted in its own short transaction, so other writers only ever
+    wait for one chunk. With ``archive`` (a text file) every row is written
+    to it as CSV in the same transaction, before it is deleted. With
+    ``dry_run`` the rows are only counted. Returns the number of visitors
+    purged and the rate in rows per second.
+    """
+    cutoff = cutoff or visitor_retention_cutoff()
+    expired = Visitor.objects.filter(created_at__lt=cutoff)
+    bounds = expired.aggregate(first=Min('id'), last=Max('id'))
+    writer = None
+    if archive is not None:
+        writer = csv.writer(archive)
+        if archive.tell() == 0:
+            writer.writerow(ARCHIVE_FIELDS)
+
+    started = time.monotonic()
+    purged = 0
+    if bounds['first'] is not None:
+        for start in range(bounds['first'], bounds['last'] + 1, chunk_size):
+            chunk = expired.filter(id__gte=start, id__lt=start + chunk_size)
+            if dry_run:
+                purged += chunk.count()
+                continue
+            with transaction.atomic():
+                if writer is not None:
+                    writer.writerows(chunk.order_by('id').values_list(*ARCHIVE_FIELDS))
+                _, deleted = chunk.delete()
+            purged += deleted.get(Visitor._meta.label, 0)
+    elapsed = time.monotonic() - started
+    rate = purged / elapsed if elapsed else 0.0
+    logger.info(f"{'Found' if dry_run else 'Purged'} {purged} visitors created before {cutoff:%Y-%m-%d} ({rate:.0f} rows/s)")
+    return {'purged': purged, 'rows_per_second': rate}
@@ -1,16 +1,18 @@
 from django.db import models
 from rest_framework import serializers
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from a_users.models import CustomUser
 from property.models import Unit
 from tenant.models import Payment, Tenant, Visitor
 from django.utils.translation import gettext_lazy as _
-from .models import Payment, Tenant, Unit
+from .models import Payment, Tenant, TenantBalance, Unit, VisitEvent
 import re
 
 from rest_framework import serializers
 from .models import Visitor
 from django.contrib.auth import get_user_model
+from dashboard_stats.rollups import schedule_collection_refresh
+from .ledger import record_new_payments
 
 CustomUser = get_user_model()
 
@@ -38,7 +40,10 @@ class TenantSerializer(serializers.ModelSerializer):
     def validate(self, data):
         unit = data.get('unit')
         instance = self.instance
-        if unit and instance and unit != instance.unit and unit.is_occupied:
+        # A quick check for a clear error; the assignment itself is a
+        # compare-and-set in create/update, which is what stops two requests
+        # from taking the same unit.
+        if unit and (instance is None or unit != instance.unit) and unit.is_occupied:
             raise serializers.ValidationError({"unit": "This unit is already occupied."})
         if self.context['request'].method == 'POST':
             user_data = self.context['request'].data.get('user')
@@ -46,8 +51,17 @@ class TenantSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError({"user": "User data with username, email, and password is required."})
         return data
 
+    def _claim_unit(self, unit):
+        if not Unit.objects.claim(unit.pk):
+            raise serializers.ValidationError({"unit": "This unit is already occupied."})
+        unit.is_occupied = True
+
+    @transaction.atomic
     def create(self, validated_data):
         user_data = self.context['request'].data.get('user', {})
+        unit = validated_data.get('unit')
+        if unit:
+            self._claim_unit(unit)
         try:
             user = CustomUser.objects.create_user(
                 email=user_data.get('email'),
@@ -67,31 +81,26 @@ class TenantSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError({"phone_number": "A user with this phone number already exists."})
             raise serializers.ValidationError({"non_field_errors": "Failed to create user due to a database error."})
 
-        tenant = Tenant.objects.create(
+        # Tenant's post_save refreshes the occupancy rollups for the claimed unit.
+        return Tenant.objects.create(
             user=user,
-            unit=validated_data.get('unit'),
+            unit=unit,
             lease_start_date=validated_data.get('lease_start_date'),
             lease_end_date=validated_data.get('lease_end_date')
         )
 
-        if tenant.unit:
-            tenant.unit.is_occupied = True
-            tenant.unit.save()
-        return tenant
-
+    @transaction.atomic
     def update(self, instance, validated_data):
         old_unit = instance.unit
         unit = validated_data.get('unit')
+        if unit and unit != old_unit:
+            self._claim_unit(unit)
         instance.unit = unit
         instance.lease_start_date = validated_data.get('lease_start_date', instance.lease_start_date)
         instance.lease_end_date = validated_data.get('lease_end_date', instance.lease_end_date)
         instance.save()
-        if old_unit and old_unit != unit:
+        if old_unit and old_unit != unit and Unit.objects.release(old_unit.pk):
             old_unit.is_occupied = False
-            old_unit.save()
-        if unit and unit != old_unit:
-            unit.is_occupied = True
-            unit.save()
         return instance
 
     def to_representation(self, instance):
@@ -114,8 +123,8 @@ class VisitorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Visitor
         tenant_name = serializers.PrimaryKeyRelatedField(queryset=Tenant.objects.all(), allow_null=True)
-        fields = ['id', 'tenant', 'unit', 'visitor_name', 'email']
-        read_only_fields = ['id', 'tenant', 'tenant_name']
+        fields = ['id', 'tenant', 'unit', 'visitor_name', 'email', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'tenant', 'tenant_name', 'created_at', 'updated_at']
 
     def validate(self, data):
         request = self.context.get('request')
@@ -141,9 +150,90 @@ class VisitorSerializer(serializers.ModelSerializer):
         visitor = Visitor.objects.create(**validated_data)
         return visitor
 
+def _bulk_key(value):
+    """Return the primary key a related-field payload refers to, if it is one."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolve the primary key from the instances a list serializer loaded in
+    bulk, falling back to the usual per-item query otherwise.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = getattr(self.parent, 'bulk_lookups', {}).get(self.field_name)
+        pk = _bulk_key(data)
+        if preloaded is None or pk is None:
+            return super().to_internal_value(data)
+        if pk not in preloaded:
+            self.fail('does_not_exist', pk_value=data)
+        return preloaded[pk]
+
+
+class VisitEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VisitEvent
+        fields = ['id', 'event_id', 'visitor', 'unit', 'event_type', 'occurred_at', 'created_at']
+        read_only_fields = fields
+
+
+class PaymentListSerializer(serializers.ListSerializer):
+    """
+    Validate and create a list of payments with a constant number of queries.
+
+    Referenced tenants and units are fetched with one ``in_bulk`` query each
+    and taken transaction IDs with one more, so items are validated in
+    memory; the payments are then inserted with ``bulk_create``.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+        lookups = {}
+        for field_name in ('tenant', 'unit'):
+            pks = {
+                _bulk_key(item.get(field_name)) for item in data if isinstance(item, dict)
+            } - {None}
+            lookups[field_name] = self.child.fields[field_name].get_queryset().in_bulk(pks)
+        transaction_ids = {
+            item.get('transaction_id') for item in data
+            if isinstance(item, dict) and isinstance(item.get('transaction_id'), str)
+        } - {''}
+        lookups['transaction_id'] = set(
+            Payment.objects.filter(transaction_id__in=transaction_ids).values_list('transaction_id', flat=True)
+        )
+        self.child.bulk_lookups = lookups
+        try:
+            return super().to_internal_value(data)
+        finally:
+            del self.child.bulk_lookups
+
+    def create(self, validated_data):
+        payments = [Payment(**item) for item in validated_data]
+        for payment in payments:
+            payment.set_payment_date()
+        with transaction.atomic():
+            payments = Payment.objects.bulk_create(payments, batch_size=1000)
+            record_new_payments(payments)
+            # bulk_create skips the post_save signals that maintain the rollups.
+            schedule_collection_refresh(
+                keys={(payment.unit.property_id, payment.billing_period) for payment in payments}
+            )
+        return payments
+
+
 class PaymentSerializer(serializers.ModelSerializer):
-    tenant = serializers.PrimaryKeyRelatedField(queryset=Tenant.objects.all())
-    unit = serializers.PrimaryKeyRelatedField(queryset=Unit.objects.all())
+    tenant = PreloadedPrimaryKeyRelatedField(queryset=Tenant.objects.all())
+    unit = PreloadedPrimaryKeyRelatedField(queryset=Unit.objects.all())
+    transaction_id = serializers.CharField(
+        max_length=100, required=False, allow_blank=True, allow_null=True,
+        help_text=Payment._meta.get_field('transaction_id').help_text
+    )
 
     class Meta:
         model = Payment
@@ -153,16 +243,7 @@ class PaymentSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at', 'payment_date']
-
-    def validate_tenant(self, value):
-        if not Tenant.objects.filter(id=value.id).exists():
-            raise serializers.ValidationError(_('Invalid tenant ID'))
-        return value
-
-    def validate_unit(self, value):
-        if not Unit.objects.filter(id=value.id).exists():
-            raise serializers.ValidationError(_('Invalid unit ID'))
-        return value
+        list_serializer_class = PaymentListSerializer
 
     def validate_billing_period(self, value):
         if not re.match(r'^\d{4}-\d{2}$', value):
@@ -175,6 +256,24 @@ class PaymentSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(_('Billing period must be in YYYY-MM format'))
         return value
 
+    def validate_transaction_id(self, value):
+        # Blank IDs are stored as NULL so they stay outside the unique index.
+        if not value:
+            return None
+        taken = getattr(self, 'bulk_lookups', {}).get('transaction_id')
+        if taken is None:
+            payments = Payment.objects.filter(transaction_id=value)
+            if self.instance is not None:
+                payments = payments.exclude(pk=self.instance.pk)
+            exists = payments.exists()
+        else:
+            exists = value in taken
+            # Claim the ID so a duplicate later in the same list is rejected.
+            taken.add(value)
+        if exists:
+            raise serializers.ValidationError(_('A payment with this transaction ID already exists.'))
+        return value
+
     def validate_payment_method(self, value):
         if value not in dict(Payment.PAYMENT_METHODS).keys():
             raise serializers.ValidationError(_('Invalid payment method'))
@@ -205,4 +304,17 @@ class PaymentSerializer(serializers.ModelSerializer):
                 )
         return data
     
-    
\ No newline at end of file
+    
+
+class GenerateBillingPeriodSerializer(serializers.Serializer):
+    billing_period = serializers.CharField(max_length=7)
+
+    validate_billing_period = PaymentSerializer.validate_billing_period
+
+
+class TenantBalanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TenantBalance
+        fields = ['tenant', 'balance', 'updated_at']
+        read_only_fields = fields
+
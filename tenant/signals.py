@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .ledger import payment_state, record_payment_changes
+from .models import LedgerEntry, Payment, Tenant, TenantBalance
+
+
+@receiver(pre_save, sender=Payment)
+def remember_payment_ledger_state(sender, instance, **kwargs):
+    instance._previous_ledger_state = None
+    if instance.pk:
+        instance._previous_ledger_state = Payment.objects.filter(pk=instance.pk).values_list(
+            'tenant_id', 'amount_due', 'amount_paid'
+        ).first()
+
+
+@receiver(post_save, sender=Payment)
+def record_payment_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_ledger_state', None)
+    record_payment_changes([(instance.pk, previous, payment_state(instance))])
+
+
+@receiver(post_delete, sender=Payment)
+def record_payment_delete(sender, instance, **kwargs):
+    record_payment_changes([(instance.pk, payment_state(instance), None)])
+
+
+@receiver(post_delete, sender=Tenant)
+def remove_tenant_ledger(sender, instance, **kwargs):
+    # Deleting a tenant cascades to their payments, whose reversing entries
+    # are written after the ledger rows were collected for deletion.
+    LedgerEntry.objects.filter(tenant_id=instance.pk).delete()
+    TenantBalance.objects.filter(tenant_id=instance.pk).delete()
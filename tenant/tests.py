@@ -1,3 +1,831 @@
-from django.test import TestCase
+import csv
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from a_users.models import CustomUser
+from dashboard_stats.models import Notification, NotificationDelivery
+from property.models import Property, Unit
+from .billing import generate_billing_period
+from .leases import process_lease_expiries
+from .models import LedgerEntry, Payment, RentReminder, Tenant, TenantBalance, VisitEvent, Visitor
+from .onboarding import TenantOnboarding, hash_passwords
+from .reconciliation import reconcile_statement
+from .reminders import send_rent_reminders
+from .retention import ARCHIVE_FIELDS, purge_visitors
+from .visits import MAX_VISIT_EVENT_BATCH
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TenantTestCase(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', password='pass', role='property_manager'
+        )
+        self.property = Property.objects.create(name='Block A', address='Nairobi', owner=self.owner)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.user_count = 0
+
+    def create_user(self, **extra_fields):
+        self.user_count += 1
+        return CustomUser.objects.create_user(
+            email=f'user{self.user_count}@example.com',
+            username=f'user{self.user_count}',
+            password='pass',
+            **extra_fields
+        )
+
+    def create_unit(self, number, rent=Decimal('1000.00'), occupied=False, property_obj=None):
+        return Unit.objects.create(
+            property=property_obj or self.property,
+            unit_number=str(number),
+            monthly_rent=rent,
+            is_occupied=occupied,
+        )
+
+    def create_tenant(self, unit=None, **extra_fields):
+        return Tenant.objects.create(user=self.create_user(), unit=unit, **extra_fields)
+
+
+class GenerateBillingPeriodTests(TenantTestCase):
+    def test_bills_occupied_units_once(self):
+        billed = self.create_unit(1, rent=Decimal('1500.00'), occupied=True)
+        tenant = self.create_tenant(billed)
+        already_billed = self.create_unit(2, occupied=True)
+        existing = Payment.objects.create(
+            tenant=self.create_tenant(already_billed), unit=already_billed,
+            amount_due=Decimal('1000.00'), billing_period='2025-06',
+        )
+        self.create_tenant(self.create_unit(3, occupied=False))
+        self.create_unit(4, occupied=True)
+
+        created = generate_billing_period('2025-06', batch_size=1)
+
+        self.assertEqual(created, 1)
+        payment = Payment.objects.exclude(pk=existing.pk).get()
+        self.assertEqual((payment.tenant, payment.unit), (tenant, billed))
+        self.assertEqual(payment.amount_due, Decimal('1500.00'))
+        self.assertEqual(payment.payment_status, 'PENDING')
+        self.assertEqual(generate_billing_period('2025-06'), 0)
+
+    def test_endpoint_is_scoped_to_owned_properties(self):
+        self.create_tenant(self.create_unit(1, occupied=True))
+        other = Property.objects.create(name='Block B', address='Mombasa', owner=self.create_user())
+        self.create_tenant(self.create_unit(1, occupied=True, property_obj=other))
+
+        response = self.client.post(reverse('payment-generate'), {'billing_period': '2025-06'}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertFalse(Payment.objects.filter(unit__property=other).exists())
+
+    def test_command_rejects_invalid_period(self):
+        with self.assertRaises(CommandError):
+            call_command('generate_billing_period', '2025-13', stdout=StringIO())
+
+
+class StatementReconciliationTests(TenantTestCase):
+    HEADER = 'Receipt No.,Completion Time,Paid In,Phone Number\n'
+
+    def create_payment(self, tenant, unit, **extra_fields):
+        return Payment.objects.create(
+            tenant=tenant, unit=unit, amount_due=unit.monthly_rent,
+            billing_period='2025-06', **extra_fields
+        )
+
+    def reconcile(self, lines, **options):
+        report = StringIO()
+        summary = reconcile_statement(StringIO(self.HEADER + ''.join(lines)), report_file=report, **options)
+        return summary, list(csv.DictReader(StringIO(report.getvalue())))
+
+    def test_matches_on_transaction_id_then_phone(self):
+        unit = self.create_unit(1, occupied=True)
+        by_code = self.create_payment(self.create_tenant(unit), unit, transaction_id='QAB123')
+        phone_tenant = Tenant.objects.create(user=self.create_user(phone_number='0712345678'), unit=unit)
+        by_phone = self.create_payment(phone_tenant, unit)
+
+        summary, report = self.reconcile([
+            'QAB123,2025-06-03 10:00:00,1000.00,254700000000\n',
+            'QXY999,2025-06-04 11:30:00,"1,000.00",254712345678\n',
+            'QZZ000,2025-06-05 09:00:00,500.00,254799999999\n',
+        ])
+
+        self.assertEqual((summary['matched'], summary['unmatched']), (2, 1))
+        by_code.refresh_from_db()
+        by_phone.refresh_from_db()
+        self.assertEqual(by_code.payment_status, 'COMPLETED')
+        self.assertEqual(by_code.amount_paid, Decimal('1000.00'))
+        self.assertEqual(by_phone.transaction_id, 'QXY999')
+        self.assertEqual(by_phone.payment_date.day, 4)
+        self.assertEqual([row['line'] for row in report], ['4'])
+
+    def test_reports_ambiguous_phone_matches(self):
+        user = self.create_user(phone_number='0712345678')
+        first_unit, second_unit = self.create_unit(1), self.create_unit(2)
+        tenant = Tenant.objects.create(user=user, unit=first_unit)
+        self.create_payment(tenant, first_unit)
+        self.create_payment(tenant, second_unit)
+
+        summary, report = self.reconcile(['QXY999,2025-06-04 11:30:00,1000,0712345678\n'])
+
+        self.assertEqual(summary['ambiguous'], 1)
+        self.assertEqual(report[0]['status'], 'ambiguous')
+        self.assertFalse(Payment.objects.filter(payment_status='COMPLETED').exists())
+
+    def test_query_count_is_constant_per_chunk(self):
+        unit = self.create_unit(1)
+        tenant = self.create_tenant(unit)
+        lines = []
+        for index in range(20):
+            self.create_payment(tenant, unit, transaction_id=f'Q{index:05d}')
+            lines.append(f'Q{index:05d},2025-06-03 10:00:00,1000,07000000{index:02d}\n')
+        lines.append('bad,not-a-date,,\n')
+
+        # Two lookups, then the bulk update and the ledger writes in one savepoint.
+        with self.assertNumQueries(8):
+            summary, _ = self.reconcile(lines, chunk_size=len(lines))
+
+        self.assertEqual((summary['matched'], summary['invalid']), (20, 1))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class IdempotentPaymentCreateTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', password='pass', role='admin'
+        )
+        property_obj = Property.objects.create(name='Block A', address='Nairobi', owner=self.owner)
+        self.unit = Unit.objects.create(property=property_obj, unit_number='1', monthly_rent=Decimal('1000.00'))
+        tenant_user = CustomUser.objects.create_user(email='tenant@example.com', username='tenant', password='pass')
+        self.tenant = Tenant.objects.create(user=tenant_user, unit=self.unit)
+        self.payload = {
+            'tenant': self.tenant.id, 'unit': self.unit.id, 'amount_due': '1000.00',
+            'billing_period': '2025-06', 'transaction_id': 'QAB123',
+        }
+
+    def post(self, key='retry-1', payload=None):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        return client.post(
+            reverse('payment-list-create'), payload or self.payload, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_replay_returns_original_response(self):
+        first = self.post()
+        with self.assertNumQueries(0):
+            replay = self.post()
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay.data, first.data)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_key_reuse_with_different_body_is_rejected(self):
+        self.post()
+        response = self.post(payload={**self.payload, 'transaction_id': 'QAB999'})
+        self.assertEqual(response.status_code, 422)
+
+    def test_duplicate_transaction_id_is_rejected_without_key(self):
+        self.post(key='')
+        response = self.post(key='')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_parallel_retries_create_one_payment(self):
+        barrier = threading.Barrier(8)
+        responses = []
+
+        def fire():
+            barrier.wait()
+            try:
+                responses.append(self.post())
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=fire) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(Payment.objects.count(), 1)
+        self.assertTrue(all(response.status_code in (201, 409) for response in responses))
+        self.assertEqual(self.post().status_code, 201)
+        self.assertEqual(Payment.objects.count(), 1)
+
+
+class PaymentPaginationTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner.role = 'admin'
+        self.owner.save()
+        unit = self.create_unit(1)
+        tenant = self.create_tenant(unit)
+        Payment.objects.bulk_create([
+            Payment(tenant=tenant, unit=unit, amount_due=unit.monthly_rent, billing_period=f'20{year:02d}-01')
+            for year in range(25)
+        ])
+        self.url = reverse('payment-list-create')
+
+    def test_cursor_pages_walk_every_payment_without_counting(self):
+        seen = []
+        url = self.url + '?page_size=10'
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('count', response.data)
+                seen.extend(payment['id'] for payment in response.data['results'])
+                url = response.data['next']
+
+        self.assertEqual(sorted(seen), sorted(Payment.objects.values_list('id', flat=True)))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+
+    def test_page_number_mode_is_opt_in(self):
+        response = self.client.get(self.url, {'page': 2, 'page_size': 10})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(response.data['current_page'], 2)
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class BulkPaymentCreateTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('payment-list-create')
+
+    def payloads(self, count):
+        items = []
+        for number in range(count):
+            unit = self.create_unit(f'{count}-{number}')
+            items.append({
+                'tenant': self.create_tenant(unit).id, 'unit': unit.id, 'amount_due': '1000.00',
+                'billing_period': '2025-06', 'transaction_id': f'TX{count}-{number}',
+            })
+        return items
+
+    def post_counting_queries(self, items):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, items, format='json')
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_list_size(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            small, small_queries = self.post_counting_queries(self.payloads(2))
+        with self.captureOnCommitCallbacks(execute=True):
+            large, large_queries = self.post_counting_queries(self.payloads(20))
+
+        self.assertEqual((small.status_code, large.status_code), (201, 201))
+        self.assertEqual(len(large.data), 20)
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(Payment.objects.count(), 22)
+        rollup = self.property.collection_rollups.get(billing_period='2025-06')
+        self.assertEqual((rollup.payment_count, rollup.amount_due), (22, Decimal('22000.00')))
+
+    def test_invalid_items_reject_the_whole_list(self):
+        items = self.payloads(3)
+        items[1]['unit'] = 999999
+        items[2]['transaction_id'] = items[0]['transaction_id']
+
+        response = self.client.post(self.url, items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(0, response.data)
+        self.assertIn('unit', response.data[1])
+        self.assertIn('transaction_id', response.data[2])
+        self.assertFalse(Payment.objects.exists())
+
+    def test_rent_mismatch_is_checked_in_memory(self):
+        items = self.payloads(1)
+        items[0]['amount_due'] = '900.00'
+
+        response = self.client.post(self.url, items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.data[0])
+
+
+class TenantLedgerTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.unit = self.create_unit(1)
+        self.tenant = self.create_tenant(self.unit)
+
+    def balance(self, tenant=None):
+        return TenantBalance.objects.get(tenant=tenant or self.tenant).balance
+
+    def test_payment_writes_move_the_balance(self):
+        payment = Payment.objects.create(
+            tenant=self.tenant, unit=self.unit, amount_due=Decimal('1000.00'), billing_period='2025-06'
+        )
+        self.assertEqual(self.balance(), Decimal('1000.00'))
+
+        payment.amount_paid = Decimal('400.00')
+        payment.save()
+        self.assertEqual(self.balance(), Decimal('600.00'))
+
+        other = self.create_tenant(self.create_unit(2))
+        payment.tenant = other
+        payment.save()
+        self.assertEqual((self.balance(), self.balance(other)), (Decimal('0.00'), Decimal('600.00')))
+
+        payment_id = payment.id
+        payment.delete()
+        self.assertEqual(self.balance(other), Decimal('0.00'))
+        self.assertEqual(LedgerEntry.objects.filter(payment_id=payment_id).count(), 8)
+
+    def test_bulk_paths_record_ledger_entries(self):
+        self.unit.is_occupied = True
+        self.unit.save()
+        generate_billing_period('2025-06')
+        self.assertEqual(self.balance(), Decimal('1000.00'))
+
+        reconcile_statement(StringIO(
+            'Receipt No.,Completion Time,Paid In,Phone Number\n'
+            'QX1,2025-06-03 10:00:00,1000,\n'
+        ))
+        self.assertEqual(self.balance(), Decimal('1000.00'))
+        Payment.objects.update(transaction_id='QX1')
+        reconcile_statement(StringIO(
+            'Receipt No.,Completion Time,Paid In,Phone Number\n'
+            'QX1,2025-06-03 10:00:00,1000,\n'
+        ))
+        self.assertEqual(self.balance(), Decimal('0.00'))
+
+    def test_balance_endpoint_is_scoped(self):
+        Payment.objects.create(tenant=self.tenant, unit=self.unit, amount_due=Decimal('1000.00'), billing_period='2025-06')
+        hidden = self.create_tenant()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('tenant-balance', args=[self.tenant.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['balance'], '1000.00')
+        self.assertEqual(self.client.get(reverse('tenant-balance', args=[hidden.id])).status_code, 404)
+
+    def test_tenant_delete_removes_its_ledger(self):
+        Payment.objects.create(tenant=self.tenant, unit=self.unit, amount_due=Decimal('1000.00'), billing_period='2025-06')
+
+        self.tenant.delete()
+
+        self.assertFalse(LedgerEntry.objects.exists())
+        self.assertFalse(TenantBalance.objects.exists())
+
+    def test_verify_balances_reports_and_fixes_drift(self):
+        Payment.objects.create(tenant=self.tenant, unit=self.unit, amount_due=Decimal('1000.00'), billing_period='2025-06')
+        TenantBalance.objects.update(balance=Decimal('10.00'))
+        Payment.objects.update(amount_paid=Decimal('100.00'))
+
+        out = StringIO()
+        call_command('verify_balances', stdout=out)
+        self.assertIn(f'Tenant {self.tenant.id}: expected 900.00, stored 10.00, ledger 1000.00', out.getvalue())
+
+        call_command('verify_balances', '--fix', stdout=StringIO())
+        self.assertEqual(self.balance(), Decimal('900.00'))
+        out = StringIO()
+        call_command('verify_balances', stdout=out)
+        self.assertIn('All balances match', out.getvalue())
+
+
+
+class TenantAccessTests(TenantTestCase):
+    def test_owners_only_see_tenants_of_their_properties(self):
+        mine = self.create_tenant(self.create_unit(1, occupied=True))
+        other_owner = self.create_user(role='property_manager')
+        other_property = Property.objects.create(name='Block B', address='Mombasa', owner=other_owner)
+        theirs = self.create_tenant(self.create_unit(1, occupied=True, property_obj=other_property))
+
+        response = self.client.get(reverse('tenant-list-create'))
+        self.assertEqual([tenant['id'] for tenant in response.data['results']], [mine.id])
+        self.assertEqual(self.client.get(reverse('tenant-detail', args=[theirs.id])).status_code, 404)
+        response = self.client.patch(
+            reverse('tenant-detail', args=[theirs.id]), {'lease_end_date': '2030-01-01'}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(Tenant.objects.get(pk=theirs.pk).lease_end_date)
+
+        self.client.force_authenticate(other_owner)
+        response = self.client.get(reverse('tenant-list-create'))
+        self.assertEqual([tenant['id'] for tenant in response.data['results']], [theirs.id])
+
+
+class TenantOnboardingTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('tenant-onboard')
+        self.units = [self.create_unit(number) for number in range(3)]
+
+    def row(self, number, **overrides):
+        return {
+            'username': f'new{number}', 'email': f'new{number}@example.com', 'password': f'secret-{number}',
+            'phone_number': f'07110000{number:02d}', 'unit': self.units[number].id, **overrides,
+        }
+
+    def test_valid_rows_are_created_and_invalid_rows_reported(self):
+        existing = self.create_user()
+        self.create_unit(9, occupied=True)
+        rows = [
+            self.row(0),
+            self.row(1, email=existing.email),
+            self.row(2, unit=self.units[0].id),
+            {'username': 'nopassword', 'email': 'nopassword@example.com'},
+            self.row(2, username='new2b', email='new2b@example.com', phone_number='', lease_start_date='2025-01-01'),
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, rows, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 3))
+        statuses = {entry['line']: entry for entry in response.data['report']}
+        self.assertEqual(statuses[1]['status'], 'created')
+        self.assertIn('email', statuses[2]['errors'])
+        self.assertEqual(statuses[3]['errors']['unit'], ['This unit is already occupied.'])
+        self.assertIn('password', statuses[4]['errors'])
+        tenant = Tenant.objects.get(pk=statuses[1]['tenant'])
+        self.assertTrue(tenant.user.check_password('secret-0'))
+        self.assertEqual((tenant.user.role, tenant.unit), ('tenant', self.units[0]))
+        self.assertEqual(
+            list(Unit.objects.filter(property=self.property, is_occupied=True).order_by('unit_number').values_list(
+                'unit_number', flat=True
+            )),
+            ['0', '2', '9'],
+        )
+        rollup = self.property.collection_rollups.get()
+        self.assertEqual(rollup.occupied_units, 3)
+
+    def test_units_outside_the_users_properties_are_rejected(self):
+        other = Property.objects.create(name='Block B', address='Mombasa', owner=self.create_user())
+        foreign = self.create_unit(1, property_obj=other)
+
+        response = self.client.post(self.url, [self.row(0, unit=foreign.id)], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('unit', response.data['report'][0]['errors'])
+        self.assertFalse(CustomUser.objects.filter(username='new0').exists())
+
+    def test_units_claimed_after_the_check_are_reported(self):
+        taken = self.units[1]
+
+        class RacingOnboarding(TenantOnboarding):
+            def _check_conflicts(self, valid, report):
+                accepted = super()._check_conflicts(valid, report)
+                # A concurrent TenantSerializer claims the unit between the check and the insert.
+                self.concurrent_claim = Unit.objects.claim(taken.id)
+                return accepted
+
+        onboarding = RacingOnboarding(workers=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = onboarding.run([self.row(0), self.row(1), self.row(2)])
+
+        self.assertTrue(onboarding.concurrent_claim)
+        self.assertEqual((summary['created'], summary['failed']), (2, 1))
+        self.assertEqual(summary['report'][1]['errors']['unit'], ['This unit is already occupied.'])
+        self.assertFalse(CustomUser.objects.filter(username='new1').exists())
+        self.assertEqual(
+            set(Tenant.objects.filter(user__username__in=['new0', 'new2']).values_list('unit', flat=True)),
+            {self.units[0].id, self.units[2].id},
+        )
+        self.assertEqual(Unit.objects.filter(pk__in=[unit.id for unit in self.units], is_occupied=True).count(), 3)
+
+    def test_csv_upload_and_command(self):
+        header = 'username,email,password,phone_number,unit\n'
+        upload = StringIO(header + ''.join(
+            f"{row['username']},{row['email']},{row['password']},{row['phone_number']},{row['unit']}\n"
+            for row in (self.row(0), self.row(1))
+        ))
+        upload.name = 'tenants.csv'
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        self.assertEqual(response.data['created'], 2)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write(header + 'new2,new2@example.com,secret-2,,\n')
+        out = StringIO()
+        call_command('onboard_tenants', source.name, '--workers', '2', stdout=out)
+        os.unlink(source.name)
+
+        self.assertIn('Onboarded 1 of 1 tenants', out.getvalue())
+        self.assertTrue(CustomUser.objects.get(username='new2').check_password('secret-2'))
+
+
+    def test_large_imports_hash_in_a_process_pool(self):
+        hashes = hash_passwords(['secret-0', 'secret-1', 'secret-2'], workers=2, pool_threshold=3)
+
+        self.assertTrue(all(check_password(f'secret-{number}', value) for number, value in enumerate(hashes)))
+
+
+class LeaseSchedulerTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = date(2025, 6, 15)
+
+    def lease(self, number, end_date, unit=None):
+        unit = unit or self.create_unit(number, occupied=True)
+        return self.create_tenant(unit, lease_end_date=end_date)
+
+    def run_scheduler(self, today=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return process_lease_expiries(today=today or self.today, window_days=10)
+
+    def test_expired_leases_are_vacated_once(self):
+        self.lease(1, date(2025, 6, 14))
+        self.lease(2, date(2024, 1, 1))
+        current = self.lease(3, date(2025, 6, 15))
+        # Shares unit 3 with a lease that is still running.
+        self.lease(4, date(2025, 6, 1), unit=current.unit)
+
+        self.assertEqual(self.run_scheduler()['vacated'], 3)
+
+        self.assertFalse(Unit.objects.get(unit_number='1').is_occupied)
+        self.assertFalse(Unit.objects.get(unit_number='2').is_occupied)
+        self.assertTrue(Unit.objects.get(unit_number='3').is_occupied)
+        self.assertEqual(
+            list(Tenant.objects.filter(unit__isnull=False).values_list('id', flat=True)), [current.id]
+        )
+        self.assertEqual(self.property.collection_rollups.get().occupied_units, 1)
+        self.assertEqual(self.run_scheduler()['vacated'], 0)
+
+        self.assertEqual(self.run_scheduler(self.today + timedelta(days=1))['vacated'], 1)
+        self.assertIsNone(Tenant.objects.get(pk=current.pk).unit)
+        self.assertFalse(Unit.objects.get(unit_number='3').is_occupied)
+
+    def test_renewal_notices_cover_each_end_date_once(self):
+        soon = self.lease(1, date(2025, 6, 20))
+        same_day = self.lease(2, date(2025, 6, 20))
+        later = self.lease(3, date(2025, 6, 30))
+        self.lease(4, date(2025, 6, 15))
+
+        self.assertEqual(self.run_scheduler()['notified'], 2)
+        notification = Notification.objects.get()
+        self.assertIn('2025-06-20', notification.message)
+        self.assertEqual(
+            set(notification.recipients.values_list('id', flat=True)), {soon.user_id, same_day.user_id}
+        )
+
+        self.assertEqual(self.run_scheduler()['notified'], 0)
+        self.assertEqual(self.run_scheduler(date(2025, 6, 21))['notified'], 1)
+        self.assertTrue(Notification.objects.filter(recipients=later.user).exists())
+
+    def test_leases_added_or_shortened_after_a_run_are_processed(self):
+        self.lease(1, date(2025, 6, 25))
+        self.assertEqual(self.run_scheduler(), {'notified': 1, 'vacated': 0})
+
+        late = self.lease(2, date(2025, 6, 20))
+        shortened = self.lease(3, date(2025, 12, 31))
+        Tenant.objects.filter(pk=shortened.pk).update(lease_end_date=date(2025, 6, 1))
+
+        self.assertEqual(self.run_scheduler(), {'notified': 1, 'vacated': 1})
+        self.assertTrue(Notification.objects.filter(recipients=late.user, message__contains='2025-06-20').exists())
+        self.assertIsNone(Tenant.objects.get(pk=shortened.pk).unit)
+
+        # A renewal to a new end date inside the window is notified again.
+        Tenant.objects.filter(pk=late.pk).update(lease_end_date=date(2025, 6, 24))
+        self.assertEqual(self.run_scheduler()['notified'], 1)
+        self.assertEqual(self.run_scheduler()['notified'], 0)
+
+    def test_command_runs_once(self):
+        self.lease(1, timezone.localdate() - timedelta(days=1))
+        out = StringIO()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('run_lease_scheduler', '--once', stdout=out)
+
+        self.assertIn('vacated 1 leases', out.getvalue())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UnitAssignmentContentionTests(TransactionTestCase):
+    threads = 8
+
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', password='pass', role='admin'
+        )
+        self.property = Property.objects.create(name='Block A', address='Nairobi', owner=self.owner)
+
+    def race(self, target):
+        barrier = threading.Barrier(self.threads)
+        results = []
+
+        def run(index):
+            barrier.wait()
+            try:
+                results.extend(target(index))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def assign(self, index, unit):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        return [client.post(reverse('tenant-list-create'), {
+            'unit': unit.id,
+            'user': {'username': f'tenant{index}', 'email': f'tenant{index}@example.com', 'password': 'pass'},
+        }, format='json')]
+
+    def test_concurrent_assignments_have_one_winner(self):
+        unit = Unit.objects.create(property=self.property, unit_number='1')
+
+        responses = self.race(lambda index: self.assign(index, unit))
+
+        statuses = sorted(response.status_code for response in responses)
+        self.assertEqual(statuses, [201] + [400] * (self.threads - 1))
+        self.assertEqual(Tenant.objects.filter(unit=unit).count(), 1)
+        # The losers' users were rolled back with their failed assignment.
+        self.assertEqual(CustomUser.objects.filter(role='tenant').count(), 1)
+        self.assertTrue(Unit.objects.get(pk=unit.pk).is_occupied)
+
+    def test_sustained_contention_claims_every_unit_once(self):
+        units = [Unit.objects.create(property=self.property, unit_number=str(number)) for number in range(40)]
+        unit_ids = [unit.id for unit in units]
+
+        def claim_all(index):
+            # Each thread walks the units from a different starting point.
+            order = unit_ids[index * 5:] + unit_ids[:index * 5]
+            return [unit_id for unit_id in order if Unit.objects.claim(unit_id)]
+
+        started = time.monotonic()
+        claimed = self.race(claim_all)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(sorted(claimed), unit_ids)
+        self.assertEqual(Unit.objects.filter(is_occupied=True).count(), len(units))
+        # Losing a compare-and-set costs one UPDATE, so contention cannot stall the run.
+        self.assertLess(elapsed, 30)
+
+    def test_moving_and_deleting_a_tenant_frees_the_unit(self):
+        first = Unit.objects.create(property=self.property, unit_number='1')
+        second = Unit.objects.create(property=self.property, unit_number='2')
+        response = self.assign(0, first)[0]
+        client = APIClient()
+        client.force_authenticate(self.owner)
+
+        client.patch(reverse('tenant-detail', args=[response.data['id']]), {'unit': second.id}, format='json')
+        self.assertEqual(list(Unit.objects.order_by('id').values_list('is_occupied', flat=True)), [False, True])
+
+        client.delete(reverse('tenant-detail', args=[response.data['id']]))
+        self.assertFalse(Unit.objects.filter(is_occupied=True).exists())
+
+
+class VisitEventIngestTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        unit = self.create_unit(1, occupied=True)
+        self.visitor = Visitor.objects.create(tenant=self.create_tenant(unit), unit=unit, visitor_name='Guest')
+        other_property = Property.objects.create(
+            name='Block B', address='Mombasa', owner=self.create_user(role='landlord')
+        )
+        other_unit = self.create_unit(1, property_obj=other_property)
+        self.other_visitor = Visitor.objects.create(unit=other_unit, visitor_name='Other guest')
+        self.url = reverse('visit-event-list-create')
+
+    def event(self, minute, visitor=None, event_type='CHECK_IN'):
+        return {
+            'event_id': str(uuid.uuid4()),
+            'visitor': (visitor or self.visitor).id,
+            'event_type': event_type,
+            'occurred_at': f'2025-06-01T08:{minute:02d}:00Z',
+        }
+
+    def test_batch_is_inserted_with_constant_queries_and_deduplicated(self):
+        events = [self.event(minute % 60, event_type=('CHECK_IN', 'CHECK_OUT')[minute % 2]) for minute in range(300)]
+        batch = events + [events[0], self.event(0, visitor=self.other_visitor), {'event_id': 'not-a-uuid'}]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, batch, format='json')
+        query_count = len(queries)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['duplicates']), (300, 1))
+        self.assertEqual([entry['index'] for entry in response.data['rejected']], [301, 302])
+        self.assertLessEqual(query_count, 6)
+        self.assertEqual(VisitEvent.objects.filter(unit=self.visitor.unit).count(), 300)
+
+        resent = self.client.post(self.url, events, format='json')
+        self.assertEqual(resent.status_code, 200)
+        self.assertEqual((resent.data['created'], resent.data['duplicates']), (0, 300))
+        self.assertEqual(VisitEvent.objects.count(), 300)
+
+    def test_events_are_listed_newest_first(self):
+        self.client.post(self.url, [self.event(5), self.event(30, event_type='CHECK_OUT')], format='json')
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            [event['event_type'] for event in response.data['results']], ['CHECK_OUT', 'CHECK_IN']
+        )
+
+    def test_rejects_oversized_batches(self):
+        response = self.client.post(self.url, [self.event(0)] * (MAX_VISIT_EVENT_BATCH + 1), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(VisitEvent.objects.exists())
+
+
+class VisitorRetentionTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.unit = self.create_unit(1)
+        self.now = timezone.now()
+        self.visitors = [
+            Visitor.objects.create(unit=self.unit, visitor_name=f'Guest {number}') for number in range(7)
+        ]
+        # Every visitor but the last two is past the retention window.
+        Visitor.objects.filter(id__in=[visitor.id for visitor in self.visitors[:5]]).update(
+            created_at=self.now - timedelta(days=400)
+        )
+        VisitEvent.objects.create(
+            event_id=uuid.uuid4(), visitor=self.visitors[0], unit=self.unit,
+            event_type=VisitEvent.CHECK_IN, occurred_at=self.now - timedelta(days=400),
+        )
+
+    def test_purges_expired_visitors_in_chunks_and_archives_them(self):
+        archive = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            result = purge_visitors(cutoff=self.now - timedelta(days=365), chunk_size=2, archive=archive)
+        deletes = [query['sql'] for query in queries if query['sql'].startswith('DELETE FROM "tenant_visitor"')]
+
+        self.assertEqual(result['purged'], 5)
+        self.assertEqual(len(deletes), 3)
+        self.assertEqual(
+            list(Visitor.objects.order_by('id').values_list('id', flat=True)),
+            [visitor.id for visitor in self.visitors[5:]]
+        )
+        self.assertFalse(VisitEvent.objects.exists())
+        rows = list(csv.reader(StringIO(archive.getvalue())))
+        self.assertEqual(rows[0], ARCHIVE_FIELDS)
+        self.assertEqual([int(row[0]) for row in rows[1:]], [visitor.id for visitor in self.visitors[:5]])
+
+    @override_settings(VISITOR_RETENTION_DAYS=365)
+    def test_command_dry_run_only_counts(self):
+        out = StringIO()
+        call_command('purge_visitors', '--dry-run', stdout=out)
+
+        self.assertIn('Found 5 visitors', out.getvalue())
+        self.assertEqual(Visitor.objects.count(), 7)
+
+
+class RentReminderTests(TenantTestCase):
+    period = '2025-06'
+
+    def setUp(self):
+        super().setUp()
+        self.unpaid = self.create_tenant(self.create_unit(1, rent=Decimal('1200.00'), occupied=True))
+        self.partial = self.create_tenant(self.create_unit(2, occupied=True))
+        self.paid = self.create_tenant(self.create_unit(3, occupied=True))
+        self.co_tenant = self.create_tenant(self.partial.unit)
+        self.create_tenant()
+        for tenant, paid in ((self.partial, Decimal('400.00')), (self.paid, Decimal('1000.00'))):
+            Payment.objects.create(
+                tenant=tenant, unit=tenant.unit, amount_due=Decimal('1000.00'), amount_paid=paid,
+                billing_period=self.period,
+            )
+
+    def remind(self, **options):
+        with self.captureOnCommitCallbacks(execute=True):
+            return send_rent_reminders(billing_period=self.period, **options)
+
+    def test_reminds_tenants_who_owe_once_per_period(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = self.remind()
+        query_count = len(queries)
+
+        self.assertEqual(result, {'billing_period': self.period, 'reminded': 2, 'complete': True})
+        self.assertEqual(
+            dict(RentReminder.objects.values_list('tenant_id', 'amount_outstanding')),
+            {self.unpaid.id: Decimal('1200.00'), self.partial.id: Decimal('600.00')}
+        )
+        messages = dict(NotificationDelivery.objects.values_list('user_id', 'notification__message'))
+        self.assertIn('Ksh 600.00', messages[self.partial.user_id])
+        self.assertIn('Ksh 1,200.00', messages[self.unpaid.user_id])
+        self.assertLessEqual(query_count, 12)
+        self.assertEqual(self.remind()['reminded'], 0)
+
+    def test_time_budget_stops_between_chunks_and_the_next_run_resumes(self):
+        self.assertEqual(self.remind(time_budget=1e-9), {
+            'billing_period': self.period, 'reminded': 0, 'complete': False
+        })
+
+        self.assertEqual(self.remind(chunk_size=1)['reminded'], 2)
+        self.assertEqual(RentReminder.objects.count(), 2)
@@ -1,17 +1,21 @@
 from django.urls import path, include  # ✅ correct import
 from .views import (
-    PaymentListCreateView, PaymentRetrieveUpdateDestroyView, TenantListCreateView, TenantRetrieveUpdateDestroyView, TenantVisitorListCreateView,VisitorRetrieveUpdateDestroyView, 
+    GenerateBillingPeriodView, PaymentListCreateView, PaymentRetrieveUpdateDestroyView, TenantBalanceView, TenantListCreateView, TenantOnboardingView, TenantRetrieveUpdateDestroyView, TenantVisitorListCreateView, VisitEventListCreateView, VisitorRetrieveUpdateDestroyView,
 )
 
 urlpatterns = [
     
     path('tenants/', TenantListCreateView.as_view(), name='tenant-list-create'),
+    path('tenants/onboard/', TenantOnboardingView.as_view(), name='tenant-onboard'),
     # path('tenants/me/', get_current_tenant, name='current_tenant'),
     path('tenants/<int:pk>/', TenantRetrieveUpdateDestroyView.as_view(), name='tenant-detail'),
+    path('tenants/<int:pk>/balance/', TenantBalanceView.as_view(), name='tenant-balance'),
     
     path('payments/', PaymentListCreateView.as_view(), name='payment-list-create'),
+    path('payments/generate/', GenerateBillingPeriodView.as_view(), name='payment-generate'),
     path('payments/<int:pk>/', PaymentRetrieveUpdateDestroyView.as_view(), name='payment-detail'),
     
     path('visitors/', TenantVisitorListCreateView.as_view(), name='visitor-list-create'),
+    path('visitors/events/', VisitEventListCreateView.as_view(), name='visit-event-list-create'),
     path('visitors/<int:pk>/', VisitorRetrieveUpdateDestroyView.as_view(), name='visitor-retrieve-update-destroy'),
 ]
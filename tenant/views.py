@@ -1,12 +1,22 @@
 from django.shortcuts import render
+from django.db import transaction
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 from a_users import serializers
-from .models import Payment, Tenant, Visitor
+from .models import Payment, Tenant, TenantBalance, VisitEvent, Visitor
 from django.utils.translation import gettext_lazy as _
-from .serializers import PaymentSerializer, TenantSerializer, VisitorSerializer
+from .serializers import (
+    GenerateBillingPeriodSerializer, PaymentSerializer, TenantBalanceSerializer, TenantSerializer,
+    VisitEventSerializer, VisitorSerializer,
+)
+from .billing import generate_billing_period
+from .onboarding import ONBOARDING_REQUEST_WORKERS, onboard_tenants, read_onboarding_csv
+from .visits import MAX_VISIT_EVENT_BATCH, ingest_visit_events
+from property.models import Property, Unit
+from utils.idempotency import idempotent_response
+from utils.pagination import CursorOrPagePagination
 from utils.permissions import IsAdminOrPropertyManager
 
 from rest_framework import generics, status
@@ -15,6 +25,7 @@ from rest_framework.response import Response
 from django.utils.translation import gettext_lazy as _
 from .models import Payment, Tenant
 from .serializers import PaymentSerializer
+import io
 import logging
 from rest_framework import permissions
 from rest_framework.decorators import api_view, permission_classes
@@ -24,9 +35,12 @@ logger = logging.getLogger(__name__)
 
 
 class TenantListCreateView(generics.ListCreateAPIView):
-    queryset = Tenant.objects.all()
     serializer_class = TenantSerializer
     permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
+    pagination_class = CursorOrPagePagination
+
+    def get_queryset(self):
+        return Tenant.objects.for_user(self.request.user).select_related('user', 'unit__property')
 
     def create(self, request, *args, **kwargs):
         print("Create tenant request data:", request.data)
@@ -45,35 +59,84 @@ class TenantListCreateView(generics.ListCreateAPIView):
 
 
 class TenantRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Tenant.objects.all()
     serializer_class = TenantSerializer
     permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
 
+    def get_queryset(self):
+        return Tenant.objects.for_user(self.request.user).select_related('user', 'unit__property')
+
     def update(self, request, *args, **kwargs):
         print("Update tenant request data:", request.data)
         response = super().update(request, *args, **kwargs)
         print("Update tenant response:", response.data)
         return response
 
+    @transaction.atomic
     def perform_destroy(self, instance):
-        if instance.unit:  # Check if the tenant has a unit
-            instance.unit.is_occupied = False
-            instance.unit.save()
+        unit_id = instance.unit_id
         instance.delete()
+        if unit_id:
+            Unit.objects.release(unit_id)
+
+
+class TenantOnboardingView(generics.GenericAPIView):
+    """
+    Onboard many tenants at once from a JSON list or an uploaded CSV file
+    (``file``), answering with a per-row report. Invalid rows are skipped
+    and reported while the valid ones are created.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
+
+    def post(self, request, *args, **kwargs):
+        user = request.user
+        if user.role == 'tenant':
+            return Response(
+                {"error": "Tenants cannot onboard tenants."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        upload = request.FILES.get('file')
+        if upload is not None:
+            rows = read_onboarding_csv(io.TextIOWrapper(upload.file, encoding='utf-8-sig'))
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            return Response(
+                {"error": "Send a JSON list of tenants or a CSV file in the 'file' field."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        summary = onboard_tenants(rows, units=Unit.objects.for_user(user), workers=ONBOARDING_REQUEST_WORKERS)
+        logger.info(f"User {user.email} onboarded {summary['created']} of {summary['rows']} tenants")
+        return Response(
+            summary,
+            status=status.HTTP_201_CREATED if summary['created'] else status.HTTP_400_BAD_REQUEST
+        )
+
+
+class TenantBalanceView(generics.RetrieveAPIView):
+    """
+    Current balance of a tenant, read from the denormalized TenantBalance row
+    instead of summing their payments.
+    """
+    serializer_class = TenantBalanceSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Tenant.objects.for_user(self.request.user)
+
+    def get_object(self):
+        tenant = super().get_object()
+        # Tenants without any payment yet have no balance row.
+        return TenantBalance.objects.filter(tenant=tenant).first() or TenantBalance(tenant=tenant)
+
+
 class TenantVisitorListCreateView(generics.ListCreateAPIView):
     serializer_class = VisitorSerializer
     permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
+    pagination_class = CursorOrPagePagination
     def get_queryset(self):
-        user = self.request.user
-        # Admins and property managers see all visitors
-        if user.role in ['admin', 'property_manager']:
-            return Visitor.objects.all()
-        # Tenants only see their own visitors
-        if user.role == 'tenant':
-            if not hasattr(user, 'unit') or not user.unit:
-                return Visitor.objects.none()  # Return empty queryset if no unit
-            return Visitor.objects.filter(tenant=user)
-        return Visitor.objects.none()  # Default to empty for other roles
+        # Admins see all visitors, owners and property managers those of
+        # their properties, tenants only their own.
+        return Visitor.objects.for_user(self.request.user)
 
         # Visitors = Visitor.objects.all() 
         # serializer = self.get_serializer(Visitors, many=True)
@@ -81,7 +144,6 @@ class TenantVisitorListCreateView(generics.ListCreateAPIView):
        
         # Allow all visitors for now, can be filtered later
     def create(self, request, *args, **kwargs):
-        print("Tenant visitor request data:", request.data)
         # Automatically set tenant to the authenticated user for tenants
         data = request.data.copy()
         if request.user.role == 'tenant':
@@ -97,7 +159,6 @@ class TenantVisitorListCreateView(generics.ListCreateAPIView):
         if serializer.is_valid():
             self.perform_create(serializer)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        print("Tenant visitor serializer errors:", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def perform_create(self, serializer):
@@ -109,7 +170,6 @@ class VisitorRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
 
     def update(self, request, *args, **kwargs):
-        print("Update visitor request data:", request.data)
         # Prevent tenants from modifying the tenant field
         if request.user.role == 'tenant':
             if 'tenant' in request.data and request.data['tenant'] != request.user.id:
@@ -117,41 +177,91 @@ class VisitorRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
                     {"error": "You cannot modify the tenant field."},
                     status=status.HTTP_403_FORBIDDEN
                 )
-        response = super().update(request, *args, **kwargs)
-        print("Update visitor response:", response.data)
-        return response
+        return super().update(request, *args, **kwargs)
 
     def perform_destroy(self, instance):
         instance.delete()
 
+
+class VisitEventPagination(CursorOrPagePagination):
+    ordering = ('-occurred_at', '-id')
+
+
+class VisitEventListCreateView(generics.ListCreateAPIView):
+    """
+    Gate check-ins and check-outs, newest first. POST takes a list of events
+    from a gate device and logs them in bulk, skipping events whose
+    ``event_id`` was already logged, so a batch can be re-sent safely.
+    """
+    serializer_class = VisitEventSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
+    pagination_class = VisitEventPagination
+
+    def get_queryset(self):
+        return VisitEvent.objects.for_user(self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        user = request.user
+        if user.role == 'tenant':
+            return Response(
+                {"error": "Tenants cannot log gate events."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if not isinstance(request.data, list):
+            return Response(
+                {"error": "Send a JSON list of events."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > MAX_VISIT_EVENT_BATCH:
+            return Response(
+                {"error": f"Send at most {MAX_VISIT_EVENT_BATCH} events per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        summary = ingest_visit_events(request.data, visitors=Visitor.objects.for_user(user))
+        logger.info(f"User {user.email} logged {summary['created']} of {summary['received']} visit events")
+        return Response(
+            summary,
+            status=status.HTTP_201_CREATED if summary['created'] else status.HTTP_200_OK
+        )
+
 class PaymentListCreateView(generics.ListCreateAPIView):
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CursorOrPagePagination
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'admin':
-            return Payment.objects.all()
-        return Payment.objects.filter(
-            unit__property__owner=user
-        ) | Payment.objects.filter(
-            unit__property__manager=user
-        )
+        return Payment.objects.for_user(self.request.user)
 
     def post(self, request, *args, **kwargs):
-        logger.info(f"Payment request data: {request.data}, User: {request.user.email}, Role: {request.user.role}")
+        return idempotent_response(request, 'payment-create', lambda: self._create(request, *args, **kwargs))
+
+    def get_serializer(self, *args, **kwargs):
+        # A list body creates the payments in bulk through PaymentListSerializer.
+        if isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
+    def _create(self, request, *args, **kwargs):
+        items = request.data if isinstance(request.data, list) else [request.data]
+        if isinstance(request.data, list):
+            logger.info(f"Bulk payment request with {len(items)} items, User: {request.user.email}, Role: {request.user.role}")
+        else:
+            logger.info(f"Payment request data: {request.data}, User: {request.user.email}, Role: {request.user.role}")
         user = self.request.user
         if user.role == 'tenant':
             if not hasattr(user, 'tenant_profile'):
                 logger.error(f"Tenant user {user.email} has no tenant profile")
                 raise serializers.ValidationError(_('User does not have a tenant profile'))
-            if request.data.get('tenant') != user.tenant_profile.id:
+            if any(not isinstance(item, dict) or item.get('tenant') != user.tenant_profile.id for item in items):
                 logger.error(f"Tenant {user.email} attempted to create payment for another tenant")
                 raise serializers.ValidationError(_('Tenants can only create payments for themselves'))
         return super().post(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        logger.info(f"Validated payment data: {serializer.validated_data}")
+        if isinstance(serializer.validated_data, list):
+            logger.info(f"Validated {len(serializer.validated_data)} payments")
+        else:
+            logger.info(f"Validated payment data: {serializer.validated_data}")
         try:
             serializer.save()
         except Exception as e:
@@ -166,18 +276,10 @@ class PaymentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         """
         Restrict access to payments based on user role.
         - Tenants: Only their own payments.
-        - Admins/Property Managers: Payments for their properties.
+        - Admins: All payments.
+        - Owners/Property Managers: Payments for their properties.
         """
-        user = self.request.user
-        if user.role == 'tenant':
-            return Payment.objects.filter(tenant__user=user)
-        elif user.role in ['admin', 'property_manager']:
-            return Payment.objects.filter(
-                unit__property__owner=user
-            ) | Payment.objects.filter(
-                unit__property__manager=user
-            )
-        return Payment.objects.none()
+        return Payment.objects.for_user(self.request.user)
 
     def perform_update(self, serializer):
         """
@@ -195,3 +297,30 @@ class PaymentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
                 _('Amount due must match the unit\'s monthly rent: {}').format(unit.monthly_rent)
             )
         serializer.save()
+
+
+class GenerateBillingPeriodView(generics.GenericAPIView):
+    """
+    Create PENDING payments for a billing period for every occupied unit the
+    user manages, in bulk.
+    """
+    serializer_class = GenerateBillingPeriodSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrPropertyManager]
+
+    def post(self, request, *args, **kwargs):
+        user = request.user
+        if user.role == 'tenant':
+            return Response(
+                {"error": "Tenants cannot generate billing periods."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        billing_period = serializer.validated_data['billing_period']
+        properties = None if user.role == 'admin' else Property.objects.for_user(user)
+        created = generate_billing_period(billing_period, properties=properties)
+        logger.info(f"User {user.email} generated {created} payments for {billing_period}")
+        return Response(
+            {"billing_period": billing_period, "created": created},
+            status=status.HTTP_201_CREATED
+        )
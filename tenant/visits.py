@@ -0,0 +1,71 @@
+import logging
+
+from rest_framework import serializers
+
+from .models import VisitEvent, Visitor
+
+logger = logging.getLogger(__name__)
+
+MAX_VISIT_EVENT_BATCH = 1000
+
+
+class VisitEventRowSerializer(serializers.Serializer):
+    """Field-level checks of one gate event; they run without queries."""
+    event_id = serializers.UUIDField()
+    visitor = serializers.IntegerField()
+    event_type = serializers.ChoiceField(choices=VisitEvent.EVENT_TYPES)
+    occurred_at = serializers.DateTimeField()
+
+
+def ingest_visit_events(events, visitors=None):
+    """
+    Log a batch of gate events and return a summary with a report of the
+    rejected ones.
+
+    Events are validated in memory against the visitors loaded with one
+    ``in_bulk``, and event ids already stored are found with one query.
+    Events repeated within the batch or sent before count as duplicates
+    rather than errors, so a device can always re-send a whole batch. The
+    rest are inserted with one ``bulk_create``; ``ignore_conflicts`` covers
+    a concurrent upload of the same events.
+    """
+    visitors = visitors if visitors is not None else Visitor.objects.all()
+    rejected = []
+    valid = []
+    for index, raw in enumerate(events):
+        serializer = VisitEventRowSerializer(data=raw if isinstance(raw, dict) else {})
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            rejected.append({'index': index, 'errors': serializer.errors})
+
+    known = visitors.only('id', 'unit_id').in_bulk({data['visitor'] for _, data in valid})
+    stored = set(VisitEvent.objects.filter(
+        event_id__in={data['event_id'] for _, data in valid}
+    ).values_list('event_id', flat=True))
+
+    new_events = []
+    duplicates = 0
+    for index, data in valid:
+        visitor = known.get(data['visitor'])
+        if visitor is None:
+            rejected.append({'index': index, 'errors': {'visitor': [f'Invalid pk "{data["visitor"]}" - object does not exist.']}})
+            continue
+        if data['event_id'] in stored:
+            duplicates += 1
+            continue
+        stored.add(data['event_id'])
+        new_events.append(VisitEvent(
+            event_id=data['event_id'],
+            visitor_id=visitor.id,
+            unit_id=visitor.unit_id,
+            event_type=data['event_type'],
+            occurred_at=data['occurred_at'],
+        ))
+    if new_events:
+        VisitEvent.objects.bulk_create(new_events, batch_size=500, ignore_conflicts=True)
+
+    rejected.sort(key=lambda entry: entry['index'])
+    summary = {'received': len(events), 'created': len(new_events), 'duplicates': duplicates, 'rejected': rejected}
+    logger.info(f"Logged {len(new_events)} visit events, {duplicates} duplicates, {len(rejected)} rejected")
+    return summary
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def dashboard_channel(scope):
+    return f'dashboard:{scope}'
+
+
+def encode_event(event):
+    return json.dumps(event, cls=DjangoJSONEncoder)
+
+
+class InProcessEventBroker:
+    """
+    Pub/sub between the code that changes data and the streaming responses
+    of one process.
+
+    Every subscriber is an ``asyncio.Queue`` on its own event loop, so an
+    idle connection costs a queue and a suspended coroutine rather than a
+    thread. ``publish`` may be called from any thread. A subscriber whose
+    queue is full drops new events instead of slowing the publisher.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, messages):
+        """Send ``(channel, event)`` pairs to the subscribers of each channel."""
+        self._dispatch(messages)
+
+    def _dispatch(self, messages):
+        with self._lock:
+            targets = [
+                (subscriber, event)
+                for channel, event in messages
+                for subscriber in self._subscribers.get(channel, ())
+            ]
+        for (loop, queue), event in targets:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; its subscription is being torn down.
+                pass
+
+    @staticmethod
+    def _offer(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning(f"Dropped a {event.get('type')} event for a subscriber that is not keeping up")
+
+    def subscribe(self, channels):
+        """
+        Async context manager yielding a queue that receives the events
+        published to ``channels`` until the block exits.
+        """
+        return Subscription(self, channels)
+
+    def _add(self, channels, subscriber):
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscriber)
+
+    def _discard(self, channels, subscriber):
+        with self._lock:
+            for channel in channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    async def _subscribed(self, channels):
+        pass
+
+
+class Subscription:
+    """
+    A subscriber's queue, registered with the broker while the ``async
+    with`` block runs. Leaving the block never awaits, so a stream that is
+    abandoned and later closed by garbage collection, in whatever order
+    against other generators on its loop, still unsubscribes cleanly.
+    """
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = list(channels)
+        self.subscriber = None
+
+    async def __aenter__(self):
+        self.subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.broker.queue_size))
+        self.broker._add(self.channels, self.subscriber)
+        try:
+            await self.broker._subscribed(self.channels)
+        except BaseException:
+            self.broker._discard(self.channels, self.subscriber)
+            raise
+        return self.subscriber[1]
+
+    async def __aexit__(self, *exc_info):
+        self.broker._discard(self.channels, self.subscriber)
+
+
+class RedisEventBroker(InProcessEventBroker):
+    """
+    Shares events between worker processes through Redis pub/sub.
+
+    Events are published to Redis only. Each process keeps one pattern
+    subscription, started on the first local subscriber, and hands what it
+    receives to its local subscribers, so a worker holds a single Redis
+    connection however many clients it streams to. Needs the ``redis``
+    package.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='property-hub', queue_size=100):
+        super().__init__(queue_size=queue_size)
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured('RedisEventBroker requires the redis package.') from exc
+        self.url = url
+        self.prefix = f'{prefix}:events:'
+        self._client = redis.Redis.from_url(url)
+        self._listeners = {}
+
+    def publish(self, messages):
+        pipeline = self._client.pipeline(transaction=False)
+        for channel, event in messages:
+            pipeline.publish(self.prefix + channel, encode_event(event))
+        pipeline.execute()
+
+    async def _subscribed(self, channels):
+        loop = asyncio.get_running_loop()
+        listener = self._listeners.get(loop)
+        if listener is None or listener.done():
+            listener = self._listeners[loop] = loop.create_task(self._listen())
+            # Forget the loop once its listener ends, so closed loops are not kept alive.
+            listener.add_done_callback(lambda task: self._forget_listener(loop, task))
+
+    def _forget_listener(self, loop, task):
+        if self._listeners.get(loop) is task:
+            del self._listeners[loop]
+
+    async def _listen(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.psubscribe(self.prefix + '*')
+        try:
+            async for message in pubsub.listen():
+                if message['type'] != 'pmessage':
+                    continue
+                channel = message['channel'].decode()[len(self.prefix):]
+                self._dispatch([(channel, json.loads(message['data']))])
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+@lru_cache(maxsize=None)
+def get_event_broker():
+    """The broker named by the EVENT_BROKER setting, built once per process."""
+    broker_class = import_string(settings.EVENT_BROKER)
+    return broker_class(**settings.EVENT_BROKER_OPTIONS)
+
+
+def publish_events(messages):
+    """
+    Publish ``(channel, event)`` pairs once the current transaction commits,
+    so that clients are never told about data they cannot read yet.
+    """
+    messages = list(messages)
+    if messages:
+        # A broker that is down must not fail the request that already committed.
+        transaction.on_commit(lambda: get_event_broker().publish(messages), robust=True)
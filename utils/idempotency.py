@@ -0,0 +1,64 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+# Upper bound on how long a request may hold a key before a retry is let through.
+LOCK_TIMEOUT = 60
+
+
+def _fingerprint(request):
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def idempotent_response(request, scope, handler):
+    """
+    Run ``handler()`` at most once per user, scope and ``Idempotency-Key``.
+
+    The first successful (2xx) response is stored in the cache and replayed
+    for every retry carrying the same key, without calling the handler
+    again. A retry that arrives while the original is still running gets a
+    409, and reusing a key with a different body gets a 422. Requests
+    without the header run normally.
+    """
+    key = request.META.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return handler()
+
+    cache_key = f'idempotency:{scope}:{request.user.pk}:{hashlib.sha256(key.encode()).hexdigest()}'
+    fingerprint = _fingerprint(request)
+    stored = cache.get(cache_key)
+    if stored is None:
+        lock_key = f'{cache_key}:lock'
+        if not cache.add(lock_key, fingerprint, LOCK_TIMEOUT):
+            return Response(
+                {"detail": "A request with this Idempotency-Key is already in progress."},
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            # Re-read under the lock in case the original finished meanwhile.
+            stored = cache.get(cache_key)
+            if stored is None:
+                response = handler()
+                if not status.is_success(response.status_code):
+                    return response
+                stored = {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                }
+                cache.set(cache_key, stored, settings.IDEMPOTENCY_KEY_TIMEOUT)
+                return response
+        finally:
+            cache.delete(lock_key)
+
+    if stored['fingerprint'] != fingerprint:
+        return Response(
+            {"detail": "This Idempotency-Key was already used with a different request body."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(stored['data'], status=stored['status'], headers={REPLAYED_HEADER: 'true'})
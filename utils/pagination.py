@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 from collections import OrderedDict
 
@@ -18,4 +18,45 @@ class CustomPagination(PageNumberPagination):
             ('has_next', self.page.has_next()),
             ('has_previous', self.page.has_previous()),
             ('results', data)
-        ]))
\ No newline at end of file
+        ]))
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination on a stable ordering. Fetching a page is one indexed
+    range query however deep the cursor is, and no COUNT(*) is run.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class CursorOrPagePagination(BasePagination):
+    """
+    Cursor pagination by default. Passing ``?page=`` opts into page-number
+    pagination (with counts) over the same ordering.
+    """
+    ordering = CreatedAtCursorPagination.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if CustomPagination.page_query_param in request.query_params:
+            self.paginator = CustomPagination()
+            queryset = queryset.order_by(*self.ordering)
+        else:
+            self.paginator = CreatedAtCursorPagination()
+            self.paginator.ordering = self.ordering
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return CreatedAtCursorPagination().get_schema_operation_parameters(view) + [
+            parameter for parameter in CustomPagination().get_schema_operation_parameters(view)
+            if parameter['name'] == CustomPagination.page_query_param
+        ]
+
+
+class TimestampCursorOrPagePagination(CursorOrPagePagination):
+    ordering = ('-timestamp', '-id')
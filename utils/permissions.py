@@ -35,14 +35,14 @@ class IsAdminOrPropertyManager(permissions.BasePermission):
         # Admins have full access
         if request.user.role == 'admin':
             return True
-        # Property managers can access if they own the property
+        # Property managers can access if they own or manage the property
         if request.user.role == 'property_manager':
             if isinstance(obj, Unit):
-                return request.user == obj.property.owner
+                return request.user.id in (obj.property.owner_id, obj.property.manager_id)
             if isinstance(obj, Tenant) and obj.unit:
-                return request.user == obj.unit.property.owner
+                return request.user.id in (obj.unit.property.owner_id, obj.unit.property.manager_id)
             if isinstance(obj, Visitor) and obj.unit:
-                return request.user == obj.unit.property.owner
+                return request.user.id in (obj.unit.property.owner_id, obj.unit.property.manager_id)
         # Tenants can only access their own visitors
         if request.user.role == 'tenant':
             if isinstance(obj, Visitor):